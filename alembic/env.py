@@ -38,6 +38,18 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# Columnas administradas fuera del ORM (por triggers de migraciones manuales);
+# autogenerate no debe proponer borrarlas.
+COLUMNAS_FUERA_DEL_ORM = {("ca_licitacion", "texto_busqueda")}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "column" and (obj.table.name, name) in COLUMNAS_FUERA_DEL_ORM:
+        return False
+    if type_ == "index" and name == "ix_ca_licitacion_texto_busqueda":
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -62,6 +74,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -83,7 +96,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,34 @@
+"""marcas_actualizacion
+
+Revision ID: 3c9d1e7a5b42
+Revises: fb243299a62c
+Create Date: 2025-11-28 09:41:03.512870
+
+Columna 'actualizado_en' en ca_licitacion y ca_seguimiento para la exportación
+incremental. Las filas existentes quedan con la fecha de la migración.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d1e7a5b42'
+down_revision: Union[str, Sequence[str], None] = 'fb243299a62c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabla in ('ca_licitacion', 'ca_seguimiento'):
+        op.add_column(tabla, sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True))
+        op.create_index(op.f(f'ix_{tabla}_actualizado_en'), tabla, ['actualizado_en'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabla in ('ca_seguimiento', 'ca_licitacion'):
+        op.drop_index(op.f(f'ix_{tabla}_actualizado_en'), table_name=tabla)
+        op.drop_column(tabla, 'actualizado_en')
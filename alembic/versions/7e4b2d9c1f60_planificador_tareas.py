@@ -0,0 +1,65 @@
+"""planificador_tareas
+
+Revision ID: 7e4b2d9c1f60
+Revises: 3c9d1e7a5b42
+Create Date: 2025-11-29 11:02:47.118204
+
+Tablas del planificador: definiciones de tareas diarias (ca_tarea_programada)
+e historial de ejecuciones con métricas (ca_ejecucion_tarea).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4b2d9c1f60'
+down_revision: Union[str, Sequence[str], None] = '3c9d1e7a5b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ca_tarea_programada',
+    sa.Column('tarea_id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('hora', sa.String(length=5), nullable=False),
+    sa.Column('parametros', sa.JSON(), nullable=True),
+    sa.Column('prioridad', sa.Integer(), nullable=False),
+    sa.Column('recurso', sa.String(length=50), nullable=False),
+    sa.Column('activa', sa.Boolean(), nullable=False),
+    sa.Column('recuperar_perdidas', sa.Boolean(), nullable=False),
+    sa.Column('ultimo_horario', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('tarea_id')
+    )
+    op.create_index(op.f('ix_ca_tarea_programada_nombre'), 'ca_tarea_programada', ['nombre'], unique=True)
+    op.create_table('ca_ejecucion_tarea',
+    sa.Column('ejecucion_id', sa.Integer(), nullable=False),
+    sa.Column('tarea_id', sa.Integer(), nullable=False),
+    sa.Column('programada_para', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('origen', sa.String(length=20), nullable=False),
+    sa.Column('estado', sa.Enum('EN_COLA', 'EN_CURSO', 'OK', 'ERROR', 'OMITIDA', name='estado_ejecucion_enum', native_enum=False), nullable=False),
+    sa.Column('encolada_en', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('iniciada_en', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finalizada_en', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('espera_s', sa.Float(), nullable=True),
+    sa.Column('duracion_s', sa.Float(), nullable=True),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['tarea_id'], ['ca_tarea_programada.tarea_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ejecucion_id')
+    )
+    op.create_index(op.f('ix_ca_ejecucion_tarea_tarea_id'), 'ca_ejecucion_tarea', ['tarea_id'], unique=False)
+    op.create_index(op.f('ix_ca_ejecucion_tarea_estado'), 'ca_ejecucion_tarea', ['estado'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ca_ejecucion_tarea_estado'), table_name='ca_ejecucion_tarea')
+    op.drop_index(op.f('ix_ca_ejecucion_tarea_tarea_id'), table_name='ca_ejecucion_tarea')
+    op.drop_table('ca_ejecucion_tarea')
+    op.drop_index(op.f('ix_ca_tarea_programada_nombre'), table_name='ca_tarea_programada')
+    op.drop_table('ca_tarea_programada')
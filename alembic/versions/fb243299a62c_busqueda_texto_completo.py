@@ -0,0 +1,84 @@
+"""busqueda_texto_completo
+
+Revision ID: fb243299a62c
+Revises: 604dbfb2b0a5
+Create Date: 2025-11-27 10:12:41.208311
+
+Índice de texto completo (PostgreSQL) sobre ca_licitacion:
+columna tsvector 'texto_busqueda' mantenida por trigger + índice GIN,
+con configuración 'es_unaccent' (español sin acentos).
+En otros motores (SQLite de pruebas) no hace nada: DbService usa FTS5.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fb243299a62c'
+down_revision: Union[str, Sequence[str], None] = '604dbfb2b0a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FUNCION_TRIGGER = """
+CREATE OR REPLACE FUNCTION ca_licitacion_texto_busqueda_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.texto_busqueda :=
+        setweight(to_tsvector('es_unaccent', coalesce(NEW.codigo_ca, '') || ' ' || coalesce(NEW.nombre, '')), 'A') ||
+        setweight(to_tsvector('es_unaccent', coalesce((SELECT nombre FROM ca_organismo WHERE organismo_id = NEW.organismo_id), '')), 'B') ||
+        setweight(to_tsvector('es_unaccent', coalesce(NEW.descripcion, '')), 'C') ||
+        setweight(to_tsvector('es_unaccent', coalesce((
+            SELECT string_agg(coalesce(p->>'nombre', '') || ' ' || coalesce(p->>'descripcion', ''), ' ')
+            FROM json_array_elements(
+                CASE WHEN json_typeof(NEW.productos_solicitados) = 'array'
+                     THEN NEW.productos_solicitados ELSE '[]'::json END) AS p
+        ), '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = pg_catalog.spanish);
+                ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+            END IF;
+        END $$;
+    """)
+
+    op.add_column('ca_licitacion', sa.Column('texto_busqueda', postgresql.TSVECTOR(), nullable=True))
+    op.execute(FUNCION_TRIGGER)
+    op.execute("""
+        CREATE TRIGGER ca_licitacion_texto_busqueda_upd
+        BEFORE INSERT OR UPDATE OF codigo_ca, nombre, descripcion, productos_solicitados, organismo_id
+        ON ca_licitacion
+        FOR EACH ROW EXECUTE FUNCTION ca_licitacion_texto_busqueda_trigger()
+    """)
+
+    # Relleno inicial: el trigger calcula el vector al "tocar" cada fila.
+    op.execute("UPDATE ca_licitacion SET nombre = nombre")
+    op.create_index('ix_ca_licitacion_texto_busqueda', 'ca_licitacion', ['texto_busqueda'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index('ix_ca_licitacion_texto_busqueda', table_name='ca_licitacion', postgresql_using='gin')
+    op.execute("DROP TRIGGER IF EXISTS ca_licitacion_texto_busqueda_upd ON ca_licitacion")
+    op.execute("DROP FUNCTION IF EXISTS ca_licitacion_texto_busqueda_trigger()")
+    op.drop_column('ca_licitacion', 'texto_busqueda')
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent")
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks de rendimiento (ver benchmarks/suite.py)."""
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga del scraper contra la API simulada (benchmarks/mock_api.py).
+
+Levanta el servidor simulado, apunta el scraper a él (MP_URL_BASE_API) y corre
+EtlService.run_etl_live_to_db de punta a punta (listado, carga, puntajes y
+fichas de Fase 2) sobre una BD temporal. Informa el tiempo total, el de cada
+fase y las peticiones por segundo, con el desglose de 401/429 que vio el servidor
+y la tasa a la que llegó el limitador adaptativo (src/scraper/rate_limiter.py).
+Al final reprocesa los payloads guardados (run_replay_payloads) para comparar con
+el tiempo de la API.
+
+EJECUCIÓN:
+    python -m benchmarks.carga_scraper
+    python -m benchmarks.carga_scraper --paginas 30 --latencia-ms 150 --prob-429 0.05 --token-s 20
+    python -m benchmarks.carga_scraper --fase2 --salida /tmp/carga.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from benchmarks import generadores as gen
+from benchmarks import mock_api
+
+
+def _autenticador(url_base: str):
+    """Token del servidor simulado, en lugar de capturarlo con el navegador."""
+    import requests
+    def autenticar(progress_callback):
+        progress_callback("Obteniendo token del servidor simulado...")
+        token = requests.get(f"{url_base}/__token", timeout=10).json()["token"]
+        return {"authorization": f"Bearer {token}", "accept": "application/json, text/plain, */*"}
+    return autenticar
+
+
+def correr_carga(servidor: mock_api.ServidorMock, fase2: bool = False, verboso: bool = False) -> dict:
+    # Se importa después de fijar MP_URL_BASE_API: config la lee al importarse
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import sessionmaker
+    from src.db.db_models import Base, CaKeyword
+    from src.db.db_service import DbService
+    from src.logic.etl_service import EtlService
+    from src.logic.score_engine import ScoreEngine
+    from src.scraper.almacen_payloads import AlmacenPayloads
+    from src.scraper.cache_http import CacheFichas
+    from src.scraper.scraper_service import ScraperService
+    from src.utils import tracing
+    from src.utils.tracing import ultimo_reporte
+
+    dir_temporal = tempfile.mkdtemp(prefix="carga_ca_")
+    engine = create_engine(f"sqlite:///{Path(dir_temporal) / 'carga.db'}")
+    almacen = AlmacenPayloads(Path(dir_temporal) / "payloads")
+    cache = CacheFichas(Path(dir_temporal) / "cache_fichas.sqlite")
+    dir_reportes, tracing.DIR_REPORTES = tracing.DIR_REPORTES, Path(dir_temporal) / "runs"  # El resultado ya trae el reporte
+    try:
+        Base.metadata.create_all(engine)
+        db_service = DbService(sessionmaker(bind=engine, autoflush=False))
+        with db_service.session_factory() as session:
+            session.execute(insert(CaKeyword), gen.generar_keywords(300)); session.commit()
+        etl = EtlService(db_service, ScraperService(autenticador=_autenticador(servidor.url), almacen=almacen, cache=cache), ScoreEngine(db_service))
+
+        marcas = {}
+        def progreso(msg: str):
+            if msg.startswith("Iniciando Fase 2"): marcas.setdefault("fase2", time.perf_counter())
+            if msg.startswith("Guardando"): marcas.setdefault("carga", time.perf_counter())
+            if verboso: print(f"  {msg}", flush=True)
+
+        hoy = datetime.date.today()
+        t0 = time.perf_counter()
+        etl.run_etl_live_to_db(progress_callback_text=progreso, config={"mode": "to_db", "date_from": hoy, "date_to": hoy, "max_paginas": 0})
+        t_etl = time.perf_counter()
+        reporte = ultimo_reporte()
+        t_fase2, datos_fase2 = None, {}
+        if fase2:
+            etl.run_fase2_update(progress_callback_text=progreso, scopes=["candidatas"])
+            t_fase2 = time.perf_counter() - t_etl
+            datos_fase2 = (ultimo_reporte() or {}).get("datos", {})
+        total = time.perf_counter() - t0
+        t_replay = time.perf_counter()
+        etl.run_replay_payloads()
+        t_replay = time.perf_counter() - t_replay
+
+        stats = servidor.stats.resumen()
+        peticiones_api = stats["por_ruta"].get("listado", 0) + stats["por_ruta"].get("ficha", 0)
+        fin_listado = marcas.get("carga", t_etl)
+        fin_fase1 = marcas.get("fase2", t_etl)
+        return {
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "config_servidor": vars(servidor.config),
+            "licitaciones": len(db_service.obtener_datos_exportacion_tab("tab1")[1]),
+            "tiempos_s": {"total": round(total, 3), "listado": round(fin_listado - t0, 3),
+                          "carga_y_puntajes": round(fin_fase1 - fin_listado, 3), "fase2_automatica": round(t_etl - fin_fase1, 3),
+                          "actualizacion_fase2": round(t_fase2, 3) if t_fase2 is not None else None,
+                          "replay_payloads": round(t_replay, 3)},
+            "peticiones": stats["por_ruta"], "respuestas": stats["por_estado"], "tokens_emitidos": stats["tokens_emitidos"],
+            "peticiones_api_por_s": round(peticiones_api / total, 2) if total else None,
+            "reporte_etl": {k: v for k, v in reporte.items() if k != "spans"} if reporte else None,
+            "payloads": almacen.estadisticas()["tipos"],
+            # Segunda pasada sobre las mismas fichas: deberían venir como 304 / sin cambios
+            "actualizacion_fichas": {k: datos_fase2.get(k) for k in ("fichas_solicitadas", "fichas_sin_cambios")} if fase2 else None,
+            "limitador": (reporte or {}).get("datos", {}).get("limitador"),
+        }
+    finally:
+        almacen.cerrar(); cache.cerrar()
+        tracing.DIR_REPORTES = dir_reportes
+        engine.dispose()
+        shutil.rmtree(dir_temporal, ignore_errors=True)
+
+
+def formatear(resultado: dict) -> str:
+    from src.utils.tracing import formatear_resumen
+    t = resultado["tiempos_s"]
+    lineas = [f"Licitaciones en BD: {resultado['licitaciones']}", "",
+              f"{'fase':<22} {'segundos':>9}"]
+    lineas += [f"{k:<22} {v:9.2f}" for k, v in t.items() if v is not None]
+    lineas += ["", f"Peticiones: {resultado['peticiones']}", f"Respuestas: {resultado['respuestas']}",
+               f"Tokens emitidos: {resultado['tokens_emitidos']}", f"Payloads guardados: {resultado['payloads']}",
+               f"Actualización de fichas: {resultado['actualizacion_fichas']}",
+               f"Peticiones API por segundo: {resultado['peticiones_api_por_s']}"]
+    if resultado["limitador"]:
+        limitador = {k: v for k, v in resultado["limitador"].items() if k != "eventos_bajada"}
+        lineas += [f"Limitador: {limitador}", f"Bajadas de tasa: {resultado['limitador']['eventos_bajada'][:10]}"]
+    if resultado["reporte_etl"]:
+        lineas += ["", "Etapas de run_etl_live_to_db:", formatear_resumen(resultado["reporte_etl"])]
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del scraper contra la API simulada.")
+    mock_api.agregar_argumentos(parser)
+    parser.add_argument("--fase2", action="store_true", help="Además corre run_fase2_update sobre las candidatas.")
+    parser.add_argument("--salida", type=Path, help="Guarda el resultado en este JSON.")
+    parser.add_argument("--verboso", action="store_true", help="Muestra el avance del ETL.")
+    args = parser.parse_args(argv)
+
+    servidor = mock_api.crear_servidor(mock_api.config_desde_args(args))
+    servidor.iniciar_en_hilo()
+    os.environ["MP_URL_BASE_API"] = servidor.url
+    # La BD es propia de la prueba; esta URL solo permite importar src.db sin .env
+    os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+    if not args.verboso: logging.disable(logging.INFO)
+    print(f"API simulada en {servidor.url}", flush=True)
+    try:
+        resultado = correr_carga(servidor, args.fase2, args.verboso)
+    finally:
+        servidor.shutdown(); servidor.server_close()
+    print(formatear(resultado))
+    if args.salida:
+        args.salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultado: {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
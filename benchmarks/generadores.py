@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Generadores de datos sintéticos para los benchmarks.
+
+Producen la misma forma que entrega el scraper (Fase 1: lista de compras de la
+API; Fase 2: ficha con descripción y productos) y son deterministas para una
+semilla dada, así dos commits miden exactamente los mismos datos.
+"""
+
+import datetime
+import random
+from typing import Dict, List
+
+ESCALAS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+ESTADOS = ["Publicada", "Publicada - Segundo llamado", "Cerrada", "Desierta", "Cancelada", "OC Emitida"]
+
+_RUBROS = ["servicio", "adquisición", "suministro", "mantención", "arriendo", "reparación", "compra", "instalación"]
+_OBJETOS = ["computadores", "impresoras", "toner", "sillas", "escritorios", "papel", "artículos de aseo", "guantes",
+            "mascarillas", "medicamentos", "alimentos", "combustible", "neumáticos", "repuestos", "cámaras",
+            "luminarias", "cables", "licencias de software", "uniformes", "herramientas", "vidrios", "pintura"]
+_DETALLES = ["para el hospital", "para oficinas centrales", "según bases", "región de Valparaíso", "urgente",
+             "con despacho incluido", "marca referencial", "para liceo municipal", "programa 2025", "segundo semestre"]
+_TIPOS_ORG = ["Municipalidad de", "Hospital", "Servicio de Salud", "Liceo", "Dirección Regional", "Gobierno Regional de"]
+_LUGARES = ["Arica", "Iquique", "Antofagasta", "Copiapó", "La Serena", "Valparaíso", "Rancagua", "Talca", "Chillán",
+            "Concepción", "Temuco", "Valdivia", "Osorno", "Puerto Montt", "Coyhaique", "Punta Arenas", "Santiago"]
+_UNIDADES = ["Unidad", "Caja", "Litro", "Kilo", "Global", "Metro"]
+
+FECHA_BASE = datetime.datetime(2025, 11, 1, 12, 0)
+
+
+def tamano_escala(escala: str) -> int:
+    try:
+        return ESCALAS[escala.lower()]
+    except KeyError:
+        raise ValueError(f"Escala desconocida '{escala}' (opciones: {', '.join(ESCALAS)})")
+
+
+def generar_organismos(n: int, semilla: int = 1) -> List[str]:
+    rnd = random.Random(semilla)
+    return [f"{rnd.choice(_TIPOS_ORG)} {rnd.choice(_LUGARES)} {i + 1}" for i in range(n)]
+
+
+def generar_keywords(n: int, semilla: int = 2) -> List[Dict]:
+    """Keywords con puntos por título, descripción y productos (las de 'objeto' son las que aciertan)."""
+    rnd = random.Random(semilla)
+    palabras = list(dict.fromkeys(_OBJETOS + _RUBROS + [f"{o} {d.split()[-1]}" for o in _OBJETOS for d in _DETALLES]))
+    rnd.shuffle(palabras)
+    return [{"keyword": palabras[i % len(palabras)] + ("" if i < len(palabras) else f" {i}"),
+             "puntos_nombre": rnd.choice([0, 2, 5, 10]),
+             "puntos_descripcion": rnd.choice([0, 1, 3]),
+             "puntos_productos": rnd.choice([0, 2, 5])}
+            for i in range(n)]
+
+
+def generar_compras(n: int, organismos: List[str], semilla: int = 3) -> List[Dict]:
+    """Compras de Fase 1 tal como las entrega la API del buscador."""
+    rnd = random.Random(semilla)
+    compras = []
+    for i in range(n):
+        publicada = FECHA_BASE - datetime.timedelta(days=rnd.randint(0, 60))
+        estado = rnd.choices(ESTADOS, weights=[50, 10, 20, 5, 5, 10])[0]
+        compras.append({
+            "codigo": f"{1000000 + i}-{rnd.randint(1, 99)}-COT25",
+            "nombre": f"{rnd.choice(_RUBROS).capitalize()} de {rnd.choice(_OBJETOS)} {rnd.choice(_DETALLES)}",
+            "organismo": rnd.choice(organismos),
+            "estado": estado,
+            "estado_convocatoria": 2 if "Segundo" in estado else 1,
+            "fecha_publicacion": publicada.date(),
+            "fecha_cierre": publicada + datetime.timedelta(days=rnd.randint(2, 10), hours=rnd.randint(0, 8)),
+            "monto_disponible_CLP": float(rnd.choice([0, rnd.randint(50_000, 30_000_000)])),
+            "cantidad_provedores_cotizando": rnd.randint(0, 15),
+        })
+    return compras
+
+
+def generar_ficha(rnd: random.Random) -> Dict:
+    """Datos de Fase 2 (ficha): descripción y lista de productos solicitados."""
+    productos = [{"nombre": f"{rnd.choice(_OBJETOS)} {rnd.choice(_DETALLES)}",
+                  "descripcion": f"{rnd.choice(_RUBROS)} de {rnd.choice(_OBJETOS)}",
+                  "cantidad": rnd.randint(1, 500), "unidad": rnd.choice(_UNIDADES)}
+                 for _ in range(rnd.randint(1, 6))]
+    return {"descripcion": " ".join(f"{rnd.choice(_RUBROS)} de {rnd.choice(_OBJETOS)} {rnd.choice(_DETALLES)}." for _ in range(3)),
+            "productos_solicitados": productos,
+            "direccion_entrega": f"{rnd.choice(_LUGARES)} {rnd.randint(1, 9999)}",
+            "plazo_entrega": rnd.randint(1, 30)}
+
+
+def generar_fichas(n: int, semilla: int = 4) -> List[Dict]:
+    rnd = random.Random(semilla)
+    return [generar_ficha(rnd) for _ in range(n)]
+
+
+def modificar_compras(compras: List[Dict], fraccion: float, semilla: int = 5) -> List[Dict]:
+    """Copia de 'compras' con 'fraccion' de ellas cambiadas (como un re-scraping con novedades)."""
+    rnd = random.Random(semilla)
+    copia = [dict(c) for c in compras]
+    for c in rnd.sample(copia, int(len(copia) * fraccion)):
+        c["cantidad_provedores_cotizando"] += 1
+        c["estado"] = rnd.choice(ESTADOS)
+    return copia
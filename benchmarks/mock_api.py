@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita la API del buscador de Mercado Público.
+
+Sirve el listado (/compra-agil?page_number=N, con payload.resultados y pageCount)
+y la ficha (/compra-agil?action=ficha&code=X) con datos sintéticos deterministas,
+para medir y ajustar el scraper sin tocar el sitio real. Se puede configurar:
+  - latencia por petición (media y variación),
+  - respuestas 429 inyectadas (con Retry-After),
+  - vencimiento del token (401 pasado cierto tiempo desde su primer uso),
+  - cantidad de páginas y resultados por página,
+  - ETag en las fichas (If-None-Match -> 304), como un servidor con caché HTTP.
+
+'/__token' entrega un token nuevo (reemplaza la captura con navegador) y
+'/__stats' las estadísticas de peticiones.
+
+EJECUCIÓN (standalone; la app se apunta con MP_URL_BASE_API=http://127.0.0.1:8765):
+    python -m benchmarks.mock_api --puerto 8765 --paginas 40 --latencia-ms 120 --prob-429 0.05 --token-s 60
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import generadores as gen
+
+
+@dataclass
+class ConfigMock:
+    paginas: int = 10
+    por_pagina: int = 15
+    latencia_ms: float = 50.0
+    variacion_ms: float = 20.0
+    prob_429: float = 0.0
+    retry_after_s: int = 1
+    token_s: Optional[float] = None  # None = el token no vence
+    organismos: int = 200
+    etag: bool = True  # Las fichas llevan ETag y responden 304 a If-None-Match
+    semilla: int = 7
+
+
+class EstadisticasMock:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.por_ruta = Counter()
+        self.por_estado = Counter()
+        self.primera = self.ultima = None
+        self.tokens_emitidos = 0
+
+    def registrar(self, ruta: str, estado: int):
+        ahora = time.monotonic()
+        with self._lock:
+            self.por_ruta[ruta] += 1
+            self.por_estado[estado] += 1
+            self.primera = self.primera or ahora
+            self.ultima = ahora
+
+    def resumen(self) -> dict:
+        with self._lock:
+            total = sum(self.por_ruta.values())
+            duracion = (self.ultima - self.primera) if total > 1 else 0.0
+            return {"peticiones": total, "por_ruta": dict(self.por_ruta), "por_estado": {str(k): v for k, v in self.por_estado.items()},
+                    "tokens_emitidos": self.tokens_emitidos, "duracion_s": round(duracion, 3),
+                    "peticiones_por_s": round(total / duracion, 2) if duracion else None}
+
+
+class ServidorMock(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, config: ConfigMock):
+        super().__init__(direccion, _Manejador)
+        self.config = config
+        self.stats = EstadisticasMock()
+        self.organismos = gen.generar_organismos(config.organismos, config.semilla)
+        self._tokens = {}  # token -> instante del primer uso
+        self._lock_tokens = threading.Lock()
+        self._rnd = random.Random(config.semilla)
+        self._lock_rnd = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar_en_hilo(self) -> threading.Thread:
+        hilo = threading.Thread(target=self.serve_forever, name="mock-api", daemon=True)
+        hilo.start()
+        return hilo
+
+    # --- Comportamiento configurable ---
+    def azar(self) -> float:
+        with self._lock_rnd: return self._rnd.random()
+
+    def esperar_latencia(self):
+        c = self.config
+        with self._lock_rnd: ms = max(0.0, self._rnd.gauss(c.latencia_ms, c.variacion_ms)) if c.latencia_ms else 0.0
+        if ms: time.sleep(ms / 1000)
+
+    def emitir_token(self) -> str:
+        with self._lock_tokens:
+            self.stats.tokens_emitidos += 1
+            return uuid.uuid4().hex
+
+    def token_valido(self, autorizacion: Optional[str]) -> bool:
+        if not autorizacion: return False
+        if self.config.token_s is None: return True
+        ahora = time.monotonic()
+        with self._lock_tokens:
+            inicio = self._tokens.setdefault(autorizacion, ahora)
+        return ahora - inicio < self.config.token_s
+
+    # --- Datos ---
+    def pagina(self, numero: int) -> dict:
+        c = self.config
+        resultados = []
+        if 1 <= numero <= c.paginas:
+            compras = gen.generar_compras(c.por_pagina, self.organismos, semilla=c.semilla * 100_003 + numero)
+            for i, compra in enumerate(compras):
+                resultados.append({**compra, "codigo": f"{numero:05d}{i:03d}-{c.semilla}-COT25",
+                                   "fecha_publicacion": compra["fecha_publicacion"].isoformat(),
+                                   "fecha_cierre": compra["fecha_cierre"].isoformat()})
+        return {"success": "OK", "payload": {"resultados": resultados, "pageCount": c.paginas,
+                                             "resultCount": c.paginas * c.por_pagina, "page_number": numero}}
+
+    def ficha(self, codigo: str) -> dict:
+        rnd = random.Random(f"{self.config.semilla}-{codigo}")
+        ficha = gen.generar_ficha(rnd)
+        segundo = rnd.random() < 0.1
+        cierre = gen.FECHA_BASE + datetime.timedelta(days=rnd.randint(1, 10))
+        return {"success": "OK", "payload": {
+            **ficha, "codigo": codigo,
+            "estado": "Publicada" if rnd.random() < 0.8 else rnd.choice(gen.ESTADOS),
+            "estado_convocatoria": 2 if segundo else 1,
+            "fecha_cierre_primer_llamado": cierre.isoformat(),
+            "fecha_cierre_segundo_llamado": (cierre + datetime.timedelta(days=3)).isoformat() if segundo else None,
+            "cantidad_provedores_cotizando": rnd.randint(0, 15)}}
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    server: ServidorMock
+    protocol_version = "HTTP/1.1"  # keep-alive, como la API real
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, ruta: str, estado: int, cuerpo: dict, headers: Optional[dict] = None):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8") if cuerpo is not None else b""
+        self.send_response(estado)
+        if cuerpo is not None: self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(datos)
+        self.server.stats.registrar(ruta, estado)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        srv = self.server
+        if url.path == "/__token":
+            return self._responder("token", 200, {"token": srv.emitir_token()})
+        if url.path == "/__stats":
+            return self._responder("stats", 200, srv.stats.resumen())
+        if url.path != "/compra-agil":
+            return self._responder("otra", 404, {"success": "NOK", "message": "No encontrado"})
+
+        ruta = "ficha" if params.get("action") == "ficha" else "listado"
+        srv.esperar_latencia()
+        if not srv.token_valido(self.headers.get("authorization")):
+            return self._responder(ruta, 401, {"success": "NOK", "message": "Token inválido o expirado"})
+        if srv.config.prob_429 and srv.azar() < srv.config.prob_429:
+            return self._responder(ruta, 429, {"success": "NOK", "message": "Too Many Requests"},
+                                   {"Retry-After": str(srv.config.retry_after_s)})
+        if ruta == "ficha":
+            ficha = srv.ficha(params.get("code", ""))
+            if not srv.config.etag: return self._responder(ruta, 200, ficha)
+            etag = '"%s"' % hashlib.sha1(json.dumps(ficha, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                return self._responder(ruta, 304, None, {"ETag": etag})
+            return self._responder(ruta, 200, ficha, {"ETag": etag})
+        try: numero = int(params.get("page_number", 1))
+        except ValueError: numero = 1
+        return self._responder(ruta, 200, srv.pagina(numero))
+
+
+def crear_servidor(config: Optional[ConfigMock] = None, host: str = "127.0.0.1", puerto: int = 0) -> ServidorMock:
+    """puerto=0 elige uno libre (ver 'servidor.url')."""
+    return ServidorMock((host, puerto), config or ConfigMock())
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    d = ConfigMock()
+    parser.add_argument("--paginas", type=int, default=d.paginas)
+    parser.add_argument("--por-pagina", type=int, default=d.por_pagina)
+    parser.add_argument("--latencia-ms", type=float, default=d.latencia_ms)
+    parser.add_argument("--variacion-ms", type=float, default=d.variacion_ms)
+    parser.add_argument("--prob-429", type=float, default=d.prob_429, help="Probabilidad de responder 429 (0-1).")
+    parser.add_argument("--retry-after-s", type=int, default=d.retry_after_s)
+    parser.add_argument("--token-s", type=float, default=d.token_s, help="Segundos de vida del token (por defecto no vence).")
+    parser.add_argument("--semilla", type=int, default=d.semilla)
+    parser.add_argument("--sin-etag", action="store_true", help="Fichas sin ETag (sin 304; el scraper compara el hash del cuerpo).")
+
+
+def config_desde_args(args) -> ConfigMock:
+    return ConfigMock(paginas=args.paginas, por_pagina=args.por_pagina, latencia_ms=args.latencia_ms, variacion_ms=args.variacion_ms,
+                      prob_429=args.prob_429, retry_after_s=args.retry_after_s, token_s=args.token_s, semilla=args.semilla,
+                      etag=not args.sin_etag)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API simulada de Mercado Público.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+    servidor = crear_servidor(config_desde_args(args), args.host, args.puerto)
+    print(f"API simulada en {servidor.url} ({json.dumps(asdict(servidor.config))})", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        print(json.dumps(servidor.stats.resumen(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
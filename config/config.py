@@ -18,11 +18,45 @@ if not DATABASE_URL:
     # pero idealmente debería lanzar error o avisar en GUI
     print(f"ADVERTENCIA: DATABASE_URL no encontrada en {env_path}")
 
+# Métricas SQL (ver src/utils/metricas_sql.py): sentencias más lentas que esto van
+# al log de consultas lentas; una misma sentencia repetida más veces en una acción
+# se informa como posible N+1.
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "250"))
+SQL_REPETICIONES_N_MAS_1 = int(os.getenv("SQL_REPETICIONES_N_MAS_1", "20"))
+
+# Pool de conexiones (ver src/db/session.py). Con PostgreSQL alojado lejos (30-60 ms
+# de ida y vuelta) cada conexión nueva cuesta varios viajes, así que se reutilizan:
+# se reciclan por antigüedad en vez de hacer un ping en cada checkout, y los
+# keepalives de TCP detectan las conexiones que el servidor o un NAT cortaron.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT_S = int(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "False").lower() == "true"
+DB_KEEPALIVE_IDLE_S = int(os.getenv("DB_KEEPALIVE_IDLE_S", "60"))
+
 UMBRAL_FASE_1 = 5
 UMBRAL_FINAL_RELEVANTE = 9
 
+# Desde este largo el texto buscado usa también el índice de texto completo
+MIN_CARACTERES_BUSQUEDA_TEXTO = 3
+
+# Filas por página de la pestaña Candidatas (se cargan más al llegar al final de la tabla)
+TAMANO_PAGINA_CANDIDATAS = int(os.getenv("TAMANO_PAGINA_CANDIDATAS", "200"))
+
 URL_BASE_WEB = "https://buscador.mercadopublico.cl"
-URL_BASE_API = "https://api.buscador.mercadopublico.cl"
+# MP_URL_BASE_API apunta el scraper a otro servidor (p. ej. el simulado de benchmarks/mock_api.py)
+URL_BASE_API = os.getenv("MP_URL_BASE_API", "https://api.buscador.mercadopublico.cl").rstrip("/")
+
+# Almacén local de respuestas crudas de la API (src/scraper/almacen_payloads.py):
+# permite volver a cargar y puntuar sin scrapear ('run_cli.py replay').
+PAYLOADS_HABILITADO = os.getenv("PAYLOADS_HABILITADO", "True").lower() == "true"
+PAYLOADS_DIR = Path(os.getenv("PAYLOADS_DIR", str(BASE_DIR / "data" / "payloads")))
+# Las versiones reemplazadas se borran pasados estos días (la vigente de cada CA se conserva)
+PAYLOADS_RETENCION_DIAS = float(os.getenv("PAYLOADS_RETENCION_DIAS", "30"))
+# ETag / Last-Modified / hash de la última ficha descargada (src/scraper/cache_http.py)
+CACHE_FICHAS_HABILITADO = os.getenv("CACHE_FICHAS_HABILITADO", "True").lower() == "true"
+CACHE_FICHAS_ARCHIVO = Path(os.getenv("CACHE_FICHAS_ARCHIVO", str(PAYLOADS_DIR / "cache_fichas.sqlite")))
 
 # Timeouts y Reintentos
 TIMEOUT_REQUESTS = 30      
@@ -30,6 +64,12 @@ DELAY_ENTRE_PAGINAS = 1
 MAX_RETRIES = 3            
 DELAY_RETRY = 5            
 
+# Limitador de tasa adaptativo (src/scraper/rate_limiter.py), en peticiones por segundo
+LIMITE_TASA_INICIAL = float(os.getenv("LIMITE_TASA_INICIAL", "1.5"))
+LIMITE_TASA_MIN = float(os.getenv("LIMITE_TASA_MIN", "0.2"))
+LIMITE_TASA_MAX = float(os.getenv("LIMITE_TASA_MAX", "8"))
+LIMITE_LATENCIA_MAX_S = float(os.getenv("LIMITE_LATENCIA_MAX_S", "5"))  # Una respuesta más lenta cuenta como congestión
+
 MODO_HEADLESS = os.getenv('HEADLESS', 'False').lower() == 'false'
 
 # Seguridad: No hardcodear keys reales en código fuente.
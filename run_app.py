@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-import subprocess
+import multiprocessing
 from pathlib import Path
 
 # --- CORRECCIÓN CRÍTICA PARA EXE ---
@@ -31,50 +31,51 @@ from PySide6.QtGui import QPixmap, QFont
 from src.utils.logger import configurar_logger
 from config.config import DATABASE_URL
 
-from alembic.config import Config
-from alembic.command import upgrade
-
 logger = configurar_logger("run_app")
 
-def check_playwright_browsers():
-    """
-    Verifica e instala los navegadores de Playwright si no existen.
-    Crítico para el primer uso del .exe en un equipo limpio.
-    """
-    try:
-        logger.info("Verificando entorno de navegadores Playwright...")
-        # Solo forzamos la instalación si estamos en modo compilado (.exe)
-        if getattr(sys, 'frozen', False):
-            # Intentamos ejecutar la instalación pasando el entorno modificado
-            subprocess.run(["playwright", "install", "chromium"], check=True, env=os.environ)
-            logger.info("Navegadores verificados correctamente.")
-    except Exception as e:
-        logger.error(f"Error verificando navegadores: {e}")
-        # No lanzamos error fatal para permitir que la app intente arrancar
+def _config_alembic():
+    from alembic.config import Config
+
+    alembic_cfg_path = ROOT_DIR / "alembic.ini"
+    script_location = ROOT_DIR / "alembic"
+    if not alembic_cfg_path.exists():
+        logger.error(f"No se encontró alembic.ini en: {alembic_cfg_path}")
+        return None
 
-def run_migrations():
+    alembic_cfg = Config(str(alembic_cfg_path))
+    alembic_cfg.set_main_option("script_location", str(script_location))
+    alembic_cfg.set_main_option("sqlalchemy.url", DATABASE_URL)
+    return alembic_cfg
+
+def _bd_en_head(alembic_cfg) -> bool:
+    """Compara la revisión guardada en 'alembic_version' con la head de los scripts."""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from src.db.session import engine
+
+    with engine.connect() as conn:
+        actuales = set(MigrationContext.configure(conn).get_current_heads())
+    return actuales == set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+
+def run_migrations() -> bool:
+    """Lleva la BD a la última revisión. Se ejecuta en segundo plano, con la ventana ya visible."""
     logger.info("Verificando estado de la base de datos...")
     try:
-        if getattr(sys, 'frozen', False):
-            alembic_cfg_path = ROOT_DIR / "alembic.ini"
-            script_location = ROOT_DIR / "alembic"
-        else:
-            alembic_cfg_path = ROOT_DIR / "alembic.ini"
-            script_location = ROOT_DIR / "alembic"
-
-        if not alembic_cfg_path.exists():
-            logger.error(f"No se encontró alembic.ini en: {alembic_cfg_path}")
-            return
+        alembic_cfg = _config_alembic()
+        if alembic_cfg is None: return False
 
-        alembic_cfg = Config(str(alembic_cfg_path))
-        alembic_cfg.set_main_option("script_location", str(script_location))
-        alembic_cfg.set_main_option("sqlalchemy.url", DATABASE_URL)
+        if _bd_en_head(alembic_cfg):
+            logger.info("BD ya está en la última revisión.")
+            return True
 
+        from alembic.command import upgrade
         upgrade(alembic_cfg, "head")
         logger.info("BD actualizada correctamente.")
+        return True
 
     except Exception as e:
         logger.critical(f"Error al ejecutar migraciones: {e}", exc_info=True)
+        return False
 
 def main():
     app = QApplication(sys.argv)
@@ -83,34 +84,26 @@ def main():
     app.setQuitOnLastWindowClosed(False)
 
     splash = QSplashScreen()
-    splash.showMessage("Iniciando Monitor CA...", Qt.AlignBottom | Qt.AlignCenter, Qt.black)
-    splash.show()
-    
-    QCoreApplication.processEvents()
-
-    # 1. Verificar Navegadores (Playwright)
-    splash.showMessage("Verificando componentes web...", Qt.AlignBottom | Qt.AlignCenter, Qt.black)
-    QCoreApplication.processEvents()
-    check_playwright_browsers()
-
-    # 2. Ejecutar Migraciones (Base de Datos)
-    splash.showMessage("Conectando a Base de Datos...", Qt.AlignBottom | Qt.AlignCenter, Qt.black)
-    QCoreApplication.processEvents()
-    run_migrations()
-    
     splash.showMessage("Cargando Interfaz...", Qt.AlignBottom | Qt.AlignCenter, Qt.black)
+    splash.show()
     QCoreApplication.processEvents()
 
-    # 3. Iniciar GUI Principal
+    # La ventana se muestra sin tocar la BD; las migraciones corren en segundo plano
+    # y al terminar se cargan los datos. Los navegadores de Playwright se verifican
+    # recién en el primer scraping (ScraperService).
     try:
         from src.gui.gui_main import MainWindow
-        window = MainWindow()
+        window = MainWindow(cargar_datos=False)
         window.show()
         splash.finish(window)
+        window.start_background_task(run_migrations, on_result=window.iniciar_carga_datos)
         sys.exit(app.exec())
     except Exception as e:
         logger.critical(f"Error fatal no manejado en la GUI: {e}", exc_info=True)
         print(f"Error Fatal: {e}")
 
 if __name__ == "__main__":
+    # Necesario en el .exe: los procesos hijos (p. ej. el pool de exportación)
+    # se lanzan con 'spawn' y vuelven a ejecutar este archivo.
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
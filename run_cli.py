@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Línea de comandos de Monitor CA (sin Qt).
+
+Ejecuta el ETL, el mantenimiento y las exportaciones sin sesión de escritorio,
+para correr en un servidor bajo cron o systemd.
+
+EJEMPLOS:
+    python run_cli.py extraer --desde 2025-11-01 --hasta 2025-11-02
+    python run_cli.py actualizar --alcance seguimiento ofertadas
+    python run_cli.py recalcular
+    python run_cli.py limpiar --dias 30
+    python run_cli.py exportar --tipo bd_delta --formato parquet csv_gz --destino /srv/export
+    python run_cli.py importar-json data/compras.json
+    python run_cli.py replay --solo fichas --desde 2025-11-01
+    python run_cli.py --json daemon
+    python run_cli.py tareas --limite 50
+
+Con --json cada evento (progreso, porcentaje, resultado, error) se escribe como
+una línea JSON en stdout y los logs de consola pasan a stderr.
+Códigos de salida: 0 OK, 1 error inesperado, 2 uso incorrecto; el resto en CODIGOS_SALIDA.
+SIGTERM / Ctrl+C cancelan la tarea en curso en el siguiente aviso de avance.
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import signal
+import sys
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from src.utils.logger import configurar_logger
+from src.utils.exceptions import (
+    EtlError, EtlCanceladoError, ScrapingFase1Error, DatabaseLoadError,
+    DatabaseTransformError, ScrapingFase2Error, RecalculoError, DependenciaOpcionalError
+)
+
+logger = configurar_logger("run_cli")
+
+SALIDA_OK = 0
+SALIDA_ERROR = 1
+# De lo más específico a lo más general (EtlCanceladoError también es un EtlError)
+CODIGOS_SALIDA = [
+    (EtlCanceladoError, 8),
+    (ScrapingFase1Error, 3),
+    (DatabaseLoadError, 4),
+    (DatabaseTransformError, 5),
+    (ScrapingFase2Error, 6),
+    (RecalculoError, 7),
+    (DependenciaOpcionalError, 9),
+    (EtlError, 10),
+]
+
+ALCANCES_ACTUALIZACION = ["candidatas", "seguimiento", "ofertadas"]
+TIPOS_EXPORTACION = ["tabs", "config", "bd_full", "bd_delta"]
+FORMATOS_EXPORTACION = ["excel", "csv", "csv_gz", "csv_zst", "parquet", "arrow"]
+
+# Señal de parada (SIGTERM / Ctrl+C): las tareas la revisan en cada aviso de avance
+detener = threading.Event()
+
+
+def codigo_salida(error: BaseException) -> int:
+    for tipo, codigo in CODIGOS_SALIDA:
+        if isinstance(error, tipo): return codigo
+    return SALIDA_ERROR
+
+
+class Reporte:
+    """Salida para humanos o, con --json, un objeto JSON por línea."""
+    def __init__(self, modo_json: bool):
+        self.modo_json = modo_json
+        self._ultimo_porcentaje = None
+
+    def _emitir(self, evento: str, **datos):
+        linea = {"evento": evento, "ts": datetime.datetime.now().isoformat(timespec="seconds"), **datos}
+        print(json.dumps(linea, ensure_ascii=False, default=str), flush=True)
+
+    def texto(self, mensaje: str):
+        if detener.is_set(): raise EtlCanceladoError("Tarea cancelada por señal de parada.")
+        if self.modo_json: self._emitir("progreso", mensaje=mensaje)
+        else: print(mensaje, flush=True)
+
+    def porcentaje(self, valor: int):
+        if detener.is_set(): raise EtlCanceladoError("Tarea cancelada por señal de parada.")
+        if valor == self._ultimo_porcentaje: return
+        self._ultimo_porcentaje = valor
+        if self.modo_json: self._emitir("porcentaje", valor=valor)
+
+    def resultado(self, comando: str, **datos):
+        if self.modo_json: self._emitir("resultado", comando=comando, **datos)
+        else: print(" ".join([f"[{comando}] OK"] + [f"{k}={v}" for k, v in datos.items()]), flush=True)
+
+    def error(self, comando: str, error: BaseException, codigo: int):
+        if self.modo_json: self._emitir("error", comando=comando, tipo=type(error).__name__, mensaje=str(error), codigo=codigo)
+        else: print(f"[{comando}] ERROR ({codigo}): {error}", file=sys.stderr, flush=True)
+
+
+def _fecha(valor: str) -> datetime.date:
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida '{valor}' (formato AAAA-MM-DD)")
+
+
+def _progreso(reporte: Reporte) -> dict:
+    return {"progress_callback_text": reporte.texto, "progress_callback_percent": reporte.porcentaje}
+
+
+# --- Comandos ---
+
+def cmd_extraer(args, reporte: Reporte):
+    from src.logic.servicios import crear_etl_service
+    ayer = datetime.date.today() - datetime.timedelta(days=1)
+    config = {"mode": "to_db", "date_from": args.desde or ayer, "date_to": args.hasta or args.desde or ayer, "max_paginas": args.max_paginas}
+    nuevos = crear_etl_service().run_etl_live_to_db(config=config, **_progreso(reporte))
+    reporte.resultado("extraer", nuevos_organismos=nuevos or [])
+
+
+def cmd_actualizar(args, reporte: Reporte):
+    from src.logic.servicios import crear_etl_service
+    crear_etl_service().run_fase2_update(scopes=args.alcance, **_progreso(reporte))
+    reporte.resultado("actualizar", alcance=args.alcance or ["all"])
+
+
+def cmd_recalcular(args, reporte: Reporte):
+    from src.logic.servicios import crear_etl_service
+    crear_etl_service().run_recalculo_total_fase_1(**_progreso(reporte))
+    reporte.resultado("recalcular")
+
+
+def cmd_limpiar(args, reporte: Reporte):
+    from src.logic.servicios import crear_db_service
+    eliminados = crear_db_service().limpiar_registros_antiguos(dias_retencion=args.dias)
+    reporte.resultado("limpiar", eliminados=eliminados)
+
+
+def cmd_exportar(args, reporte: Reporte):
+    from src.logic.excel_service import ExcelService
+    from src.logic.servicios import crear_db_service
+    tareas = [{"tipo": args.tipo, "format": f, "scope": "all"} for f in args.formato]
+    resultados = ExcelService(crear_db_service()).ejecutar_exportacion_lote(tareas, str(args.destino), **_progreso(reporte))
+    errores = [r for r in resultados if r.startswith("ERROR")]
+    if errores: raise EtlError("; ".join(errores))
+    reporte.resultado("exportar", archivos=resultados)
+
+
+def cmd_importar_json(args, reporte: Reporte):
+    from src.logic.servicios import crear_etl_service
+    try:
+        with open(args.archivo, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise DatabaseLoadError(f"No se pudo leer '{args.archivo}': {e}") from e
+    if not isinstance(datos, list):
+        raise DatabaseLoadError(f"El JSON en '{args.archivo}' no es una lista de compras.")
+    nuevos = crear_etl_service().run_importacion_json(datos=datos, **_progreso(reporte))
+    reporte.resultado("importar-json", registros=len(datos), nuevos_organismos=nuevos)
+
+
+def cmd_replay(args, reporte: Reporte):
+    """Recarga y repuntúa desde los payloads guardados (data/payloads), sin llamar a la API."""
+    from src.logic.servicios import crear_etl_service
+    desde = datetime.datetime.combine(args.desde, datetime.time()) if args.desde else None
+    hasta = datetime.datetime.combine(args.hasta + datetime.timedelta(days=1), datetime.time()) if args.hasta else None
+    resumen = crear_etl_service().run_replay_payloads(desde=desde, hasta=hasta, listado=args.solo != "fichas",
+                                                      fichas=args.solo != "listado", **_progreso(reporte))
+    reporte.resultado("replay", **resumen)
+
+
+def cmd_daemon(args, reporte: Reporte):
+    """
+    Piloto automático sin GUI: el mismo planificador que la ventana, con las tareas
+    de settings.json (y cualquier otra en ca_tarea_programada). Un error en una tarea
+    queda en el historial y el daemon sigue.
+    """
+    from src.logic.planificador import Planificador, crear_ejecutores, sincronizar_autopiloto
+    from src.logic.servicios import crear_db_service
+    from src.utils.settings_manager import SettingsManager
+    settings, db_service = SettingsManager(), crear_db_service()
+    sincronizar_autopiloto(db_service, settings)
+
+    def al_terminar(info: dict):
+        comando = f"daemon:{info['tarea']}"
+        if info["estado"] == "ok":
+            reporte.resultado(comando, origen=info["origen"], espera_s=round(info["espera_s"], 1), duracion_s=info["duracion_s"], resultado=info["resultado"])
+        else:
+            reporte.error(comando, EtlError(info["error"]), codigo_salida(EtlError()))
+
+    planificador = Planificador(db_service, crear_ejecutores(db_service, progreso=reporte.texto), al_terminar=al_terminar, intervalo=args.intervalo)
+    planificador.iniciar()
+    reporte.texto(f"Daemon iniciado (revisión cada {args.intervalo} s).")
+    # settings.json se puede editar con el daemon corriendo
+    while not detener.wait(args.intervalo):
+        settings.config = settings.load_settings()
+        sincronizar_autopiloto(db_service, settings)
+    planificador.detener(esperar=True)
+    reporte.resultado("daemon", estado="detenido")
+
+
+def cmd_tareas(args, reporte: Reporte):
+    from src.logic.servicios import crear_db_service
+    db_service = crear_db_service()
+    if args.json:
+        reporte.resultado("tareas", tareas=db_service.obtener_tareas_programadas(solo_activas=False),
+                          ejecuciones=db_service.obtener_historial_ejecuciones(args.limite))
+        return
+    for t in db_service.obtener_tareas_programadas(solo_activas=False):
+        print(f"{t['nombre']:<24} {t['tipo']:<11} {t['hora']}  prioridad {t['prioridad']:<3} recurso {t['recurso']:<6} {'activa' if t['activa'] else 'inactiva'}")
+    print()
+    for e in db_service.obtener_historial_ejecuciones(args.limite):
+        espera = f"{e['espera_s']:.0f}" if e["espera_s"] is not None else "-"
+        duracion = f"{e['duracion_s']:.0f}" if e["duracion_s"] is not None else "-"
+        print(f"#{e['ejecucion_id']:<5} {e['tarea']:<24} {e['programada_para']:%Y-%m-%d %H:%M}  {e['origen']:<10} {e['estado']:<8} "
+              f"espera {espera:>5} s  duración {duracion:>5} s  {e['error'] or ''}")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="run_cli.py", description="Monitor CA sin interfaz gráfica.")
+    parser.add_argument("--json", action="store_true", help="Avance y resultado como líneas JSON en stdout.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("extraer", help="Fase 1 + puntajes + Fase 2 de las mejores (por defecto: ayer).")
+    p.add_argument("--desde", type=_fecha); p.add_argument("--hasta", type=_fecha)
+    p.add_argument("--max-paginas", type=int, default=0, help="0 = sin límite.")
+    p.set_defaults(funcion=cmd_extraer)
+
+    p = sub.add_parser("actualizar", help="Descarga las fichas (Fase 2) de las CAs seleccionadas.")
+    p.add_argument("--alcance", nargs="+", choices=ALCANCES_ACTUALIZACION, help="Por defecto: todas.")
+    p.set_defaults(funcion=cmd_actualizar)
+
+    p = sub.add_parser("recalcular", help="Recalcula todos los puntajes con las reglas actuales.")
+    p.set_defaults(funcion=cmd_recalcular)
+
+    p = sub.add_parser("limpiar", help="Elimina CAs cerradas antiguas (no toca favoritas).")
+    p.add_argument("--dias", type=int, default=30, help="Días de retención.")
+    p.set_defaults(funcion=cmd_limpiar)
+
+    p = sub.add_parser("exportar", help="Genera reportes / respaldos.")
+    p.add_argument("--tipo", choices=TIPOS_EXPORTACION, default="tabs")
+    p.add_argument("--formato", nargs="+", choices=FORMATOS_EXPORTACION, default=["excel"])
+    p.add_argument("--destino", type=Path, default=BASE_DIR / "data", help="Carpeta base (se crea 'export/<fecha>').")
+    p.set_defaults(funcion=cmd_exportar)
+
+    p = sub.add_parser("importar-json", help="Carga un JSON de Fase 1 ya descargado y calcula puntajes.")
+    p.add_argument("archivo", type=Path)
+    p.set_defaults(funcion=cmd_importar_json)
+
+    p = sub.add_parser("replay", help="Recarga y repuntúa desde los payloads crudos guardados, sin scrapear.")
+    p.add_argument("--desde", type=_fecha, help="Payloads obtenidos desde este día.")
+    p.add_argument("--hasta", type=_fecha, help="Payloads obtenidos hasta este día (incluido).")
+    p.add_argument("--solo", choices=["listado", "fichas"], help="Por defecto: ambos.")
+    p.set_defaults(funcion=cmd_replay)
+
+    p = sub.add_parser("daemon", help="Piloto automático según settings.json, hasta recibir SIGTERM.")
+    p.add_argument("--intervalo", type=int, default=30, help="Segundos entre revisiones.")
+    p.set_defaults(funcion=cmd_daemon)
+
+    p = sub.add_parser("tareas", help="Tareas programadas e historial de ejecuciones.")
+    p.add_argument("--limite", type=int, default=20, help="Ejecuciones a mostrar.")
+    p.set_defaults(funcion=cmd_tareas)
+    return parser
+
+
+def _redirigir_consola_a_stderr():
+    # El logger raíz solo encola; la consola la escribe el listener
+    from src.utils.logger import consola_handler
+    if consola_handler.stream is sys.stdout: consola_handler.setStream(sys.stderr)
+
+
+def main(argv=None) -> int:
+    args = crear_parser().parse_args(argv)
+    reporte = Reporte(args.json)
+    if args.json: _redirigir_consola_a_stderr()
+
+    def al_recibir_senal(signum, frame):
+        logger.warning(f"Señal {signum} recibida: deteniendo.")
+        detener.set()
+    signal.signal(signal.SIGTERM, al_recibir_senal)
+    signal.signal(signal.SIGINT, al_recibir_senal)
+
+    try:
+        args.funcion(args, reporte)
+        return SALIDA_OK
+    except Exception as e:
+        # Una tarea cancelada puede llegar envuelta en el error de su fase
+        if detener.is_set() and not isinstance(e, EtlCanceladoError):
+            e = EtlCanceladoError(f"Tarea cancelada por señal de parada ({e}).")
+        codigo = codigo_salida(e)
+        logger.error(f"Comando '{args.comando}' falló: {e}", exc_info=codigo == SALIDA_ERROR)
+        reporte.error(args.comando, e, codigo)
+        return codigo
+
+
+if __name__ == "__main__":
+    # Los procesos de exportación se lanzan con 'spawn' y vuelven a ejecutar este archivo
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -8,7 +8,7 @@ import datetime
 import enum  
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy import (
-    String, Integer, Float, Boolean, DateTime, JSON, ForeignKey, Enum, Text
+    String, Integer, Float, Boolean, DateTime, JSON, ForeignKey, Enum, Text, func
 )
 from typing import Optional, List
 
@@ -59,6 +59,9 @@ class CaLicitacion(Base):
     # ---------------------------------------------------
 
     puntuacion_final: Mapped[int] = mapped_column(Integer, default=0, index=True)
+
+    # Último cambio de la fila (lo usa la exportación incremental)
+    actualizado_en: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     
     organismo_id: Mapped[Optional[int]] = mapped_column(ForeignKey("ca_organismo.organismo_id"))
     organismo: Mapped[Optional["CaOrganismo"]] = relationship(back_populates="licitaciones", lazy="joined")
@@ -71,6 +74,7 @@ class CaSeguimiento(Base):
     es_ofertada: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
     es_oculta: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
     notas: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    actualizado_en: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     licitacion: Mapped["CaLicitacion"] = relationship(back_populates="seguimiento")
 
 # --- Tablas de Configuración ---
@@ -98,4 +102,46 @@ class CaOrganismoRegla(Base):
     organismo_id: Mapped[int] = mapped_column(ForeignKey("ca_organismo.organismo_id", ondelete="CASCADE"), unique=True, index=True)
     tipo: Mapped[TipoReglaOrganismo] = mapped_column(Enum(TipoReglaOrganismo, name='tipo_regla_organismo_enum', native_enum=False), nullable=False, index=True)
     puntos: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
-    organismo: Mapped["CaOrganismo"] = relationship(lazy="joined")
\ No newline at end of file
+    organismo: Mapped["CaOrganismo"] = relationship(lazy="joined")
+
+# --- Tablas del Planificador de Tareas ---
+
+class EstadoEjecucion(enum.Enum):
+    EN_COLA = 'en_cola'
+    EN_CURSO = 'en_curso'
+    OK = 'ok'
+    ERROR = 'error'
+    OMITIDA = 'omitida'
+
+class CaTareaProgramada(Base):
+    """Definición persistente de una tarea diaria (p. ej. la extracción del piloto automático)."""
+    __tablename__ = "ca_tarea_programada"
+    tarea_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    nombre: Mapped[str] = mapped_column(String(100), unique=True, index=True)
+    tipo: Mapped[str] = mapped_column(String(50))  # Clave del ejecutor: 'extraer', 'actualizar', 'exportar'...
+    hora: Mapped[str] = mapped_column(String(5))  # "HH:MM", todos los días
+    parametros: Mapped[Optional[dict[str, any]]] = mapped_column(JSON, nullable=True)
+    prioridad: Mapped[int] = mapped_column(Integer, default=50)  # Menor = antes
+    recurso: Mapped[str] = mapped_column(String(50), default="bd")  # Limita la concurrencia por recurso
+    activa: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    recuperar_perdidas: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # Último horario ya atendido (ejecutado, encolado u omitido)
+    ultimo_horario: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    ejecuciones: Mapped[List["CaEjecucionTarea"]] = relationship(back_populates="tarea", cascade="all, delete-orphan")
+
+class CaEjecucionTarea(Base):
+    """Historial de ejecuciones con sus métricas de espera, duración y resultado."""
+    __tablename__ = "ca_ejecucion_tarea"
+    ejecucion_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tarea_id: Mapped[int] = mapped_column(ForeignKey("ca_tarea_programada.tarea_id", ondelete="CASCADE"), index=True)
+    programada_para: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    origen: Mapped[str] = mapped_column(String(20))  # 'programada' | 'recuperada'
+    estado: Mapped[EstadoEjecucion] = mapped_column(Enum(EstadoEjecucion, name='estado_ejecucion_enum', native_enum=False), index=True)
+    encolada_en: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    iniciada_en: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finalizada_en: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    espera_s: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    duracion_s: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    resultado: Mapped[Optional[dict[str, any]]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    tarea: Mapped["CaTareaProgramada"] = relationship(back_populates="ejecuciones")
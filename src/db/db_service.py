@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List, Dict, Tuple, Optional, Union, Set
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from sqlalchemy.orm import sessionmaker, Session, joinedload
-from sqlalchemy import select, delete, or_, update, and_
+from sqlalchemy import select, delete, or_, update, and_, text, func, bindparam, Integer
 from sqlalchemy.dialects.postgresql import insert
 
 from .db_models import (
@@ -12,19 +16,171 @@ from .db_models import (
     CaSector,
     CaKeyword,
     CaOrganismoRegla,
-    TipoReglaOrganismo 
+    TipoReglaOrganismo,
+    CaTareaProgramada,
+    CaEjecucionTarea,
+    EstadoEjecucion
 )
 
-from config.config import UMBRAL_FASE_1, UMBRAL_FINAL_RELEVANTE
+from config.config import UMBRAL_FASE_1, UMBRAL_FINAL_RELEVANTE, MIN_CARACTERES_BUSQUEDA_TEXTO, TAMANO_PAGINA_CANDIDATAS
 from src.utils.logger import configurar_logger
+from src.utils.exceptions import TransaccionRevertidaError
+from src.utils.tracing import span
 
 logger = configurar_logger(__name__)
 
+
+def _fecha_api(valor, solo_fecha: bool = False):
+    """La API entrega las fechas como texto ISO; PostgreSQL las acepta así, SQLite no."""
+    if not isinstance(valor, str) or not valor: return valor
+    try: fecha = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    except ValueError: return valor
+    return fecha.date() if solo_fecha else fecha
+
+
+# --- Búsqueda de texto completo ---
+# PostgreSQL: columna 'texto_busqueda' (tsvector + GIN) mantenida por trigger,
+# ver migración 'busqueda_texto_completo'. Configuración sin acentos 'es_unaccent'.
+# Las coincidencias (sin límite) sirven de subconsulta para filtrar; el ranking las ordena y corta.
+SQL_COINCIDENCIAS_PG = "SELECT ca_id FROM ca_licitacion WHERE texto_busqueda @@ to_tsquery('es_unaccent', :consulta)"
+SQL_BUSQUEDA_PG = text(SQL_COINCIDENCIAS_PG + """
+    ORDER BY ts_rank_cd(texto_busqueda, to_tsquery('es_unaccent', :consulta)) DESC, ca_id DESC
+    LIMIT :limite
+""")
+
+# SQLite (pruebas / desarrollo local): tabla virtual FTS5 mantenida por triggers.
+SQL_FTS_SQLITE_DOCUMENTO = """
+    coalesce({t}.codigo_ca, ''), coalesce({t}.nombre, ''),
+    coalesce((SELECT nombre FROM ca_organismo WHERE organismo_id = {t}.organismo_id), ''),
+    coalesce({t}.descripcion, ''),
+    coalesce((SELECT group_concat(coalesce(json_extract(value, '$.nombre'), '') || ' ' || coalesce(json_extract(value, '$.descripcion'), ''), ' ')
+              FROM json_each(CASE WHEN json_valid({t}.productos_solicitados) THEN {t}.productos_solicitados ELSE '[]' END)), '')
+"""
+SQL_FTS_SQLITE_SETUP = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ca_licitacion_fts USING fts5("
+    "codigo, nombre, organismo, descripcion, productos, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS ca_licitacion_fts_ai AFTER INSERT ON ca_licitacion BEGIN "
+    "INSERT INTO ca_licitacion_fts(rowid, codigo, nombre, organismo, descripcion, productos) "
+    f"VALUES (NEW.ca_id, {SQL_FTS_SQLITE_DOCUMENTO.format(t='NEW')}); END",
+    "CREATE TRIGGER IF NOT EXISTS ca_licitacion_fts_au AFTER UPDATE ON ca_licitacion BEGIN "
+    "DELETE FROM ca_licitacion_fts WHERE rowid = OLD.ca_id; "
+    "INSERT INTO ca_licitacion_fts(rowid, codigo, nombre, organismo, descripcion, productos) "
+    f"VALUES (NEW.ca_id, {SQL_FTS_SQLITE_DOCUMENTO.format(t='NEW')}); END",
+    "CREATE TRIGGER IF NOT EXISTS ca_licitacion_fts_ad AFTER DELETE ON ca_licitacion BEGIN "
+    "DELETE FROM ca_licitacion_fts WHERE rowid = OLD.ca_id; END",
+    "DELETE FROM ca_licitacion_fts",
+    "INSERT INTO ca_licitacion_fts(rowid, codigo, nombre, organismo, descripcion, productos) "
+    f"SELECT ca_licitacion.ca_id, {SQL_FTS_SQLITE_DOCUMENTO.format(t='ca_licitacion')} FROM ca_licitacion",
+]
+# Pesos bm25 por columna: código y nombre > organismo > descripción > productos
+SQL_COINCIDENCIAS_SQLITE = "SELECT rowid FROM ca_licitacion_fts WHERE ca_licitacion_fts MATCH :consulta"
+SQL_BUSQUEDA_SQLITE = text(SQL_COINCIDENCIAS_SQLITE + """
+    ORDER BY bm25(ca_licitacion_fts, 10.0, 10.0, 5.0, 2.0, 1.0), rowid DESC
+    LIMIT :limite
+""")
+
+
+# Detalles (CaLicitacion con organismo y seguimiento) que se guardan en memoria
+# para abrir el panel de detalle sin consultar la BD.
+TAMANO_CACHE_DETALLE = 256
+
+
+def _terminos_busqueda(consulta: str) -> List[str]:
+    """Separa la consulta del usuario en palabras seguras para tsquery/FTS5."""
+    return re.findall(r"\w+", (consulta or "").lower())
+
+
+class _SesionCompartida:
+    """
+    La sesión de una unidad de trabajo, tal como la ven los métodos de DbService:
+    'with' no la cierra, 'commit' solo envía los cambios (flush) y 'rollback'
+    deja la unidad marcada como fallida. Se confirma o revierte todo junto al final.
+    """
+
+    def __init__(self, session: Session):
+        self._session = session
+        self.fallida = False
+
+    def __getattr__(self, nombre): return getattr(self._session, nombre)
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def commit(self): self._session.flush()
+    def close(self): pass
+    def rollback(self): self._session.rollback(); self.fallida = True
+
+
 class DbService:
     def __init__(self, session_factory: sessionmaker[Session]):
         self.session_factory = session_factory
+        self._uow = threading.local()
+        self._fts_sqlite_listo = False
+        self._cache_detalle: "OrderedDict[int, CaLicitacion]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._generacion_cache = 0  # Sube con cada invalidación (ver _guardar_en_cache)
         logger.info("DbService inicializado.")
 
+    # --- Unidad de trabajo ---
+    def _sesion(self):
+        """Sesión para un método: la de la unidad de trabajo en curso en este hilo, o una nueva."""
+        compartida = getattr(self._uow, "sesion", None)
+        return compartida if compartida is not None else self.session_factory()
+
+    @contextmanager
+    def unidad_de_trabajo(self):
+        """
+        Ejecuta varias llamadas a DbService en una sola sesión y una sola transacción
+        (p. ej. cargar + puntuar, o marcar favorito + recargar pestañas): una conexión
+        del pool y un commit en vez de uno por método. Si algo falla, se revierte todo.
+        Anidada, se une a la unidad ya abierta. Los objetos devueltos siguen
+        utilizables al cerrar (expire_on_commit=False).
+        """
+        actual = getattr(self._uow, "sesion", None)
+        if actual is not None:
+            yield actual; return
+        session = self.session_factory()
+        expirar, session.expire_on_commit = session.expire_on_commit, False
+        compartida = self._uow.sesion = _SesionCompartida(session)
+        try:
+            yield compartida
+            if compartida.fallida: raise TransaccionRevertidaError("Una operación de la unidad de trabajo falló; no se guardó ningún cambio.")
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.invalidar_detalle()  # La caché pudo recibir datos que no se confirmaron
+            raise
+        finally:
+            self._uow.sesion = None
+            session.expire_on_commit = expirar
+            session.close()
+
+    # --- Caché LRU de detalles ---
+    def detalle_en_cache(self, ca_id: int) -> Optional[CaLicitacion]:
+        """Devuelve el detalle si está en caché (sin tocar la BD), o None."""
+        with self._cache_lock:
+            licitacion = self._cache_detalle.get(ca_id)
+            if licitacion is not None: self._cache_detalle.move_to_end(ca_id)
+            return licitacion
+
+    def _guardar_en_cache(self, licitaciones: List[CaLicitacion], generacion: int):
+        """
+        'generacion' es la de la caché antes de consultar: si hubo una invalidación
+        mientras tanto, lo leído puede ser anterior al cambio y se descarta.
+        """
+        with self._cache_lock:
+            if generacion != self._generacion_cache: return
+            for ca in licitaciones:
+                self._cache_detalle[ca.ca_id] = ca
+                self._cache_detalle.move_to_end(ca.ca_id)
+            while len(self._cache_detalle) > TAMANO_CACHE_DETALLE:
+                self._cache_detalle.popitem(last=False)
+
+    def invalidar_detalle(self, ca_id: Optional[int] = None):
+        """Descarta el detalle de una CA, o toda la caché si ca_id es None (cambios masivos)."""
+        with self._cache_lock:
+            self._generacion_cache += 1
+            if ca_id is None: self._cache_detalle.clear()
+            else: self._cache_detalle.pop(ca_id, None)
+
     def _preparar_mapa_organismos(self, session: Session, nombres_organismos: Set[str]) -> Dict[str, int]:
         if not nombres_organismos: return {}
         nombres_norm = {n.strip() for n in nombres_organismos if n}
@@ -45,10 +201,11 @@ class DbService:
     def insertar_o_actualizar_licitaciones_raw(self, compras: List[Dict]):
         if not compras: return
         logger.info(f"Iniciando Carga Masiva (Bulk Upsert) de {len(compras)} registros...")
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 nombres_orgs = {c.get("organismo", "No Especificado") for c in compras}
-                mapa_orgs = self._preparar_mapa_organismos(session, nombres_orgs)
+                with span("organismos", n=len(nombres_orgs)):
+                    mapa_orgs = self._preparar_mapa_organismos(session, nombres_orgs)
                 data_to_upsert = []
                 codigos_vistos = set()
                 for item in compras:
@@ -61,8 +218,8 @@ class DbService:
                         "codigo_ca": codigo,
                         "nombre": item.get("nombre"),
                         "monto_clp": item.get("monto_disponible_CLP"),
-                        "fecha_publicacion": item.get("fecha_publicacion"),
-                        "fecha_cierre": item.get("fecha_cierre"),
+                        "fecha_publicacion": _fecha_api(item.get("fecha_publicacion"), solo_fecha=True),
+                        "fecha_cierre": _fecha_api(item.get("fecha_cierre")),
                         "proveedores_cotizando": item.get("cantidad_provedores_cotizando"),
                         "estado_ca_texto": item.get("estado"),
                         "estado_convocatoria": item.get("estado_convocatoria"),
@@ -71,22 +228,25 @@ class DbService:
                     data_to_upsert.append(record)
                 if data_to_upsert:
                     stmt = insert(CaLicitacion).values(data_to_upsert)
+                    columnas_actualizables = ["proveedores_cotizando", "estado_ca_texto", "fecha_cierre", "estado_convocatoria", "monto_clp"]
                     stmt = stmt.on_conflict_do_update(
                         index_elements=['codigo_ca'],
                         set_={
-                            "proveedores_cotizando": stmt.excluded.proveedores_cotizando,
-                            "estado_ca_texto": stmt.excluded.estado_ca_texto,
-                            "fecha_cierre": stmt.excluded.fecha_cierre,
-                            "estado_convocatoria": stmt.excluded.estado_convocatoria,
-                            "monto_clp": stmt.excluded.monto_clp
-                        }
+                            **{col: stmt.excluded[col] for col in columnas_actualizables},
+                            "actualizado_en": func.now()
+                        },
+                        # Solo se reescriben (y marcan como cambiadas) las filas que traen algo distinto
+                        where=or_(*(CaLicitacion.__table__.c[col].is_distinct_from(stmt.excluded[col]) for col in columnas_actualizables))
                     )
-                    session.execute(stmt); session.commit(); logger.info("Carga Masiva completada exitosamente.")
+                    with span("upsert", n=len(data_to_upsert)):
+                        session.execute(stmt); session.commit()
+                    logger.info("Carga Masiva completada exitosamente.")
+                    self.invalidar_detalle()
             except Exception as e:
                 logger.error(f"Error en Bulk Upsert: {e}", exc_info=True); session.rollback(); raise e
 
     def obtener_todas_candidatas_fase_1_para_recalculo(self) -> List[Dict]:
-        with self.session_factory() as session:
+        with self._sesion() as session:
             stmt = select(
                 CaLicitacion.ca_id,
                 CaLicitacion.codigo_ca,
@@ -108,29 +268,47 @@ class DbService:
 
     def actualizar_puntajes_fase_1_en_lote(self, actualizaciones: List[Union[Tuple[int, int], Tuple[int, int, List[str]]]]):
         if not actualizaciones: return
-        datos_mapeados = []
+        nuevos = {}
         for item in actualizaciones:
             if len(item) == 3: ca_id, puntaje, detalle = item
             elif len(item) == 2: ca_id, puntaje = item; detalle = ["Sin detalle"]
             else: continue
-            datos_mapeados.append({ "ca_id": ca_id, "puntuacion_final": puntaje, "puntaje_detalle": list(detalle) })
-        with self.session_factory() as session:
-            try: session.bulk_update_mappings(CaLicitacion, datos_mapeados); session.commit()
+            nuevos[ca_id] = (puntaje, list(detalle))
+        tabla = CaLicitacion.__table__
+        with self._sesion() as session:
+            try:
+                # El recálculo recorre todas las CA tras cada scraping: solo se escriben
+                # (y se marcan en 'actualizado_en') las que cambian de puntaje o detalle.
+                actuales = session.execute(select(tabla.c.ca_id, tabla.c.puntuacion_final, tabla.c.puntaje_detalle))
+                cambios = [
+                    {"b_ca_id": ca_id, "b_puntaje": nuevos[ca_id][0], "b_detalle": nuevos[ca_id][1]}
+                    for ca_id, puntaje, detalle in actuales
+                    if ca_id in nuevos and (puntaje, detalle) != nuevos[ca_id]
+                ]
+                if cambios:
+                    stmt = update(tabla).where(tabla.c.ca_id == bindparam("b_ca_id")).values(
+                        puntuacion_final=bindparam("b_puntaje"),
+                        puntaje_detalle=bindparam("b_detalle", type_=tabla.c.puntaje_detalle.type),
+                        actualizado_en=func.now())
+                    session.execute(stmt, cambios)
+                session.commit()
             except Exception as e: logger.error(f"Error update lote: {e}"); session.rollback(); raise
+        logger.debug(f"Puntajes: {len(cambios)} de {len(nuevos)} CA cambiaron.")
+        if cambios: self.invalidar_detalle()
 
     def obtener_candidatas_para_fase_2(self, umbral_minimo: int = 10) -> List[CaLicitacion]:
-        with self.session_factory() as session:
+        with self._sesion() as session:
             stmt = select(CaLicitacion).filter(CaLicitacion.puntuacion_final >= umbral_minimo, CaLicitacion.descripcion.is_(None)).order_by(CaLicitacion.fecha_cierre.asc())
             return session.scalars(stmt).all()
 
     def obtener_candidatas_top_para_actualizar(self, umbral_minimo: int = 10) -> List[CaLicitacion]:
-        with self.session_factory() as session:
+        with self._sesion() as session:
             subq = select(CaSeguimiento.ca_id).where(or_(CaSeguimiento.es_favorito == True, CaSeguimiento.es_ofertada == True))
             stmt = select(CaLicitacion).filter(CaLicitacion.puntuacion_final >= umbral_minimo, CaLicitacion.ca_id.notin_(subq)).order_by(CaLicitacion.fecha_cierre.asc())
             return session.scalars(stmt).all()
 
     def actualizar_ca_con_fase_2(self, codigo_ca: str, datos_fase_2: Dict, puntuacion_total: int, detalle_completo: List[str]):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 stmt = select(CaLicitacion).where(CaLicitacion.codigo_ca == codigo_ca)
                 licitacion = session.scalars(stmt).first()
@@ -142,7 +320,7 @@ class DbService:
                 licitacion.puntuacion_final = puntuacion_total
                 licitacion.plazo_entrega = datos_fase_2.get("plazo_entrega")
                 licitacion.puntaje_detalle = detalle_completo 
-                licitacion.fecha_cierre_segundo_llamado = datos_fase_2.get("fecha_cierre_p2")
+                licitacion.fecha_cierre_segundo_llamado = _fecha_api(datos_fase_2.get("fecha_cierre_p2"))
                 
                 nuevo_estado_texto = datos_fase_2.get("estado")
                 if nuevo_estado_texto:
@@ -152,30 +330,93 @@ class DbService:
                 if est is not None: licitacion.estado_convocatoria = est
                 
                 session.commit()
+                self.invalidar_detalle(licitacion.ca_id)
             except Exception as e: 
                 logger.error(f"[Fase 2] Error actualizando {codigo_ca}: {e}")
                 session.rollback()
                 raise
 
     def get_licitacion_by_id(self, ca_id: int) -> Optional[CaLicitacion]:
-        with self.session_factory() as session:
+        licitacion = self.detalle_en_cache(ca_id)
+        if licitacion is not None: return licitacion
+        generacion = self._generacion_cache
+        with self._sesion() as session:
             stmt = select(CaLicitacion).options(joinedload(CaLicitacion.organismo), joinedload(CaLicitacion.seguimiento)).where(CaLicitacion.ca_id == ca_id)
-            return session.scalars(stmt).first()
+            licitacion = session.scalars(stmt).first()
+        if licitacion is not None: self._guardar_en_cache([licitacion], generacion)
+        return licitacion
+
+    def precargar_detalles(self, ca_ids: List[int]) -> int:
+        """Carga en una sola consulta los detalles que aún no están en caché. Devuelve cuántos cargó."""
+        with self._cache_lock:
+            faltantes = [i for i in dict.fromkeys(ca_ids) if i and i not in self._cache_detalle]
+            generacion = self._generacion_cache
+        if not faltantes: return 0
+        with self._sesion() as session:
+            stmt = select(CaLicitacion).options(joinedload(CaLicitacion.organismo), joinedload(CaLicitacion.seguimiento)).where(CaLicitacion.ca_id.in_(faltantes))
+            licitaciones = session.scalars(stmt).unique().all()
+        self._guardar_en_cache(licitaciones, generacion)
+        return len(licitaciones)
+
+    def buscar_licitaciones_texto(self, consulta: str, limite: int = 1000) -> List[int]:
+        """
+        Búsqueda de texto completo (sin acentos, por prefijo) sobre código, nombre,
+        organismo, descripción y productos. Devuelve los ca_id ordenados por relevancia.
+        """
+        preparada = self._preparar_busqueda_texto(consulta)
+        if preparada is None: return []
+        es_pg, consulta_motor = preparada
+        with self._sesion() as session:
+            return list(session.scalars(SQL_BUSQUEDA_PG if es_pg else SQL_BUSQUEDA_SQLITE,
+                                        {"consulta": consulta_motor, "limite": limite}))
+
+    def subconsulta_texto(self, consulta: str):
+        """
+        Todos los ca_id que coinciden con la búsqueda de texto completo, como subconsulta
+        (sin límite) para usar en 'ca_id IN (...)'. None si la consulta no tiene palabras.
+        """
+        preparada = self._preparar_busqueda_texto(consulta)
+        if preparada is None: return None
+        es_pg, consulta_motor = preparada
+        sql = SQL_COINCIDENCIAS_PG if es_pg else SQL_COINCIDENCIAS_SQLITE
+        return text(sql).bindparams(consulta=consulta_motor).columns(ca_id=Integer)
+
+    def ids_coincidentes_texto(self, consulta: str) -> Set[int]:
+        """Todos los ca_id que coinciden con la búsqueda (sin orden ni límite), para filtrar en memoria."""
+        coincidencias = self.subconsulta_texto(consulta)
+        if coincidencias is None: return set()
+        with self._sesion() as session:
+            return set(session.scalars(coincidencias))
+
+    def _preparar_busqueda_texto(self, consulta: str) -> Optional[Tuple[bool, str]]:
+        """(es_postgresql, consulta en la sintaxis del motor); en SQLite crea el índice FTS5 la primera vez."""
+        terminos = _terminos_busqueda(consulta)
+        if not terminos: return None
+        with self._sesion() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                return True, " & ".join(f"{t}:*" for t in terminos)
+            if not self._fts_sqlite_listo:
+                for sentencia in SQL_FTS_SQLITE_SETUP: session.execute(text(sentencia))
+                session.commit()
+                self._fts_sqlite_listo = True
+        return False, " ".join(f'"{t}"*' for t in terminos)
 
     def limpiar_registros_antiguos(self, dias_retencion: int = 30) -> int:
         fecha_limite = datetime.now() - timedelta(days=dias_retencion)
         registros_eliminados = 0
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 subq = select(CaSeguimiento.ca_id).where(CaSeguimiento.es_favorito == True)
                 stmt = delete(CaLicitacion).where(CaLicitacion.fecha_cierre < fecha_limite, CaLicitacion.estado_ca_texto.notin_(['Publicada', 'Publicada - Segundo llamado']), or_(CaLicitacion.estado_convocatoria.is_(None), CaLicitacion.estado_convocatoria != 2), CaLicitacion.ca_id.notin_(subq))
                 result = session.execute(stmt); registros_eliminados = result.rowcount; session.commit()
+                if registros_eliminados > 0: self.invalidar_detalle()
                 if registros_eliminados > 0: logger.info(f"Limpieza: {registros_eliminados} eliminados.")
             except Exception as e: logger.error(f"Error limpieza: {e}"); session.rollback()
         return registros_eliminados
 
-    def obtener_datos_tab1_candidatas(self, umbral_minimo: int = 5) -> List[CaLicitacion]:
-        with self.session_factory() as session:
+    def _condiciones_tab(self, tab: str, umbral_minimo: int = UMBRAL_FASE_1) -> list:
+        """Condiciones que definen qué licitaciones pertenecen a cada pestaña."""
+        if tab == "tab1":
             # Excluir Favoritas, Ofertadas Y AHORA TAMBIÉN OCULTAS
             subq = select(CaSeguimiento.ca_id).where(
                 or_(
@@ -184,49 +425,146 @@ class DbService:
                     CaSeguimiento.es_oculta == True  
                 )
             )
+            return [CaLicitacion.puntuacion_final >= umbral_minimo, CaLicitacion.ca_id.notin_(subq)]
+        if tab == "tab3":
+            return [CaLicitacion.ca_id.in_(select(CaSeguimiento.ca_id).where(CaSeguimiento.es_favorito == True, CaSeguimiento.es_ofertada == False))]
+        if tab == "tab4":
+            return [CaLicitacion.ca_id.in_(select(CaSeguimiento.ca_id).where(CaSeguimiento.es_ofertada == True))]
+        raise ValueError(f"Pestaña desconocida: {tab}")
+
+    def _condiciones_filtro(self, filter_state: Optional[Dict], texto: str = "") -> list:
+        """
+        Traduce 'TableInterface.filter_state' (y el texto buscado) a condiciones SQL,
+        con la misma semántica que el filtro en memoria de LicitacionProxyModel.
+        """
+        fs = filter_state or {}
+        condiciones = []
+        if not fs.get("show_zeros"): condiciones.append(CaLicitacion.puntuacion_final != 0)
+        if fs.get("monto"): condiciones.append(CaLicitacion.monto_clp >= fs["monto"])
+        if fs.get("selected_states"): condiciones.append(CaLicitacion.estado_ca_texto.in_(fs["selected_states"]))
+        if fs.get("2do_llamado"): condiciones.append(CaLicitacion.estado_convocatoria == 2)
+
+        # Rangos de fecha inclusivos por día
+        if fs.get("pub_from"): condiciones.append(CaLicitacion.fecha_publicacion >= fs["pub_from"])
+        if fs.get("pub_to"): condiciones.append(CaLicitacion.fecha_publicacion <= fs["pub_to"])
+        if fs.get("close_from"): condiciones.append(CaLicitacion.fecha_cierre >= datetime.combine(fs["close_from"], time.min))
+        if fs.get("close_to"): condiciones.append(CaLicitacion.fecha_cierre < datetime.combine(fs["close_to"] + timedelta(days=1), time.min))
+
+        texto = (texto or "").strip().lower()
+        if texto:
+            por_texto = CaLicitacion.nombre.icontains(texto, autoescape=True)
+            if len(texto) >= MIN_CARACTERES_BUSQUEDA_TEXTO:
+                coincidencias = self.subconsulta_texto(texto)
+                if coincidencias is not None: por_texto = or_(por_texto, CaLicitacion.ca_id.in_(coincidencias))
+            condiciones.append(por_texto)
+        return condiciones
+
+    def obtener_pagina_tab(self, tab: str, filter_state: Optional[Dict] = None, texto: str = "",
+                           cursor: Optional[Tuple] = None, limite: int = 200,
+                           umbral_minimo: int = UMBRAL_FASE_1) -> Tuple[List[CaLicitacion], int, Optional[Tuple]]:
+        """
+        Página de una pestaña con los filtros aplicados en la BD.
+        Paginación por keyset: 'cursor' es el valor devuelto por la página anterior
+        (None para la primera). Devuelve (filas, total_filtrado, siguiente_cursor);
+        siguiente_cursor es None cuando no quedan más filas.
+        Orden: tab1 por puntaje desc; tab3/tab4 por fecha de cierre asc (sin fecha al final).
+        """
+        filtros = self._condiciones_tab(tab, umbral_minimo) + self._condiciones_filtro(filter_state, texto)
+
+        keyset = []
+        if tab == "tab1":
+            orden = [CaLicitacion.puntuacion_final.desc(), CaLicitacion.ca_id.asc()]
+            if cursor:
+                puntaje, ca_id = cursor
+                keyset.append(or_(CaLicitacion.puntuacion_final < puntaje,
+                                       and_(CaLicitacion.puntuacion_final == puntaje, CaLicitacion.ca_id > ca_id)))
+        else:
+            orden = [CaLicitacion.fecha_cierre.asc().nulls_last(), CaLicitacion.ca_id.asc()]
+            if cursor:
+                cierre, ca_id = cursor
+                if cierre is None:
+                    keyset.append(and_(CaLicitacion.fecha_cierre.is_(None), CaLicitacion.ca_id > ca_id))
+                else:
+                    keyset.append(or_(CaLicitacion.fecha_cierre > cierre, CaLicitacion.fecha_cierre.is_(None),
+                                           and_(CaLicitacion.fecha_cierre == cierre, CaLicitacion.ca_id > ca_id)))
+
+        with self._sesion() as session:
+            # El total ignora el cursor: es el de todo el resultado filtrado
+            total = session.scalar(select(func.count(CaLicitacion.ca_id)).where(*filtros))
+            stmt = select(CaLicitacion).options(
+                joinedload(CaLicitacion.seguimiento), 
+                joinedload(CaLicitacion.organismo).joinedload(CaOrganismo.sector)
+            ).where(*filtros, *keyset).order_by(*orden).limit(limite)
+            filas = session.scalars(stmt).all()
+
+        siguiente = None
+        if len(filas) == limite:
+            ultima = filas[-1]
+            siguiente = (ultima.puntuacion_final if tab == "tab1" else ultima.fecha_cierre, ultima.ca_id)
+        return filas, total, siguiente
+
+    def obtener_datos_tab1_candidatas(self, umbral_minimo: int = 5) -> List[CaLicitacion]:
+        with self._sesion() as session:
             stmt = select(CaLicitacion).options(
                 joinedload(CaLicitacion.seguimiento), 
                 joinedload(CaLicitacion.organismo).joinedload(CaOrganismo.sector)
-            ).filter(
-                CaLicitacion.puntuacion_final >= umbral_minimo, 
-                CaLicitacion.ca_id.notin_(subq)
-            ).order_by(CaLicitacion.puntuacion_final.desc())
+            ).filter(*self._condiciones_tab("tab1", umbral_minimo)).order_by(CaLicitacion.puntuacion_final.desc())
             
             return session.scalars(stmt).all()
 
     def obtener_datos_tab3_seguimiento(self) -> List[CaLicitacion]:
-        with self.session_factory() as session:
+        with self._sesion() as session:
             stmt = select(CaLicitacion).options(
                 joinedload(CaLicitacion.seguimiento), 
                 joinedload(CaLicitacion.organismo).joinedload(CaOrganismo.sector)
-            ).join(CaSeguimiento, CaLicitacion.ca_id == CaSeguimiento.ca_id).filter(
-                CaSeguimiento.es_favorito == True,
-                CaSeguimiento.es_ofertada == False 
-            ).order_by(CaLicitacion.fecha_cierre.asc())
+            ).filter(*self._condiciones_tab("tab3")).order_by(CaLicitacion.fecha_cierre.asc())
             return session.scalars(stmt).all()
 
     def obtener_datos_tab4_ofertadas(self) -> List[CaLicitacion]:
-        with self.session_factory() as session:
-            stmt = select(CaLicitacion).options(joinedload(CaLicitacion.seguimiento), joinedload(CaLicitacion.organismo).joinedload(CaOrganismo.sector)).join(CaSeguimiento, CaLicitacion.ca_id == CaSeguimiento.ca_id).filter(CaSeguimiento.es_ofertada == True).order_by(CaLicitacion.fecha_cierre.asc())
+        with self._sesion() as session:
+            stmt = select(CaLicitacion).options(joinedload(CaLicitacion.seguimiento), joinedload(CaLicitacion.organismo).joinedload(CaOrganismo.sector)).filter(*self._condiciones_tab("tab4")).order_by(CaLicitacion.fecha_cierre.asc())
             return session.scalars(stmt).all()
 
-    def _to_dict_safe(self, licitaciones: List[CaLicitacion]) -> List[Dict]:
-        resultados = []
-        for ca in licitaciones:
-            resultados.append({
-                "puntuacion_final": ca.puntuacion_final, "codigo_ca": ca.codigo_ca, "nombre": ca.nombre, "descripcion": ca.descripcion, "organismo_nombre": ca.organismo.nombre if ca.organismo else "N/A", "direccion_entrega": ca.direccion_entrega, "estado_ca_texto": ca.estado_ca_texto, "fecha_publicacion": ca.fecha_publicacion, "fecha_cierre": ca.fecha_cierre, "fecha_cierre_segundo_llamado": ca.fecha_cierre_segundo_llamado, "proveedores_cotizando": ca.proveedores_cotizando, "productos_solicitados": ca.productos_solicitados, "es_favorito": ca.seguimiento.es_favorito if ca.seguimiento else False, "es_ofertada": ca.seguimiento.es_ofertada if ca.seguimiento else False,
-            })
-        return resultados
-
-    def obtener_datos_exportacion_tab1(self) -> List[Dict]:
-        with self.session_factory() as session: objs = self.obtener_datos_tab1_candidatas(umbral_minimo=0); return self._to_dict_safe(objs)
-    def obtener_datos_exportacion_tab3(self) -> List[Dict]:
-        with self.session_factory() as session: objs = self.obtener_datos_tab3_seguimiento(); return self._to_dict_safe(objs)
-    def obtener_datos_exportacion_tab4(self) -> List[Dict]:
-        with self.session_factory() as session: objs = self.obtener_datos_tab4_ofertadas(); return self._to_dict_safe(objs)
+    def obtener_datos_pestanas(self, umbral_minimo: int = 5, filter_state: Optional[Dict] = None, texto: str = "",
+                               limite: int = TAMANO_PAGINA_CANDIDATAS) -> Tuple[Tuple, List[CaLicitacion], List[CaLicitacion]]:
+        """
+        Primera página de candidatas (con los filtros de su pestaña, ver obtener_pagina_tab),
+        seguimiento y ofertadas en una sola sesión (una vista coherente de las tres).
+        """
+        with self.unidad_de_trabajo():
+            return (self.obtener_pagina_tab("tab1", filter_state, texto, None, limite, umbral_minimo),
+                    self.obtener_datos_tab3_seguimiento(), self.obtener_datos_tab4_ofertadas())
+
+    # Columnas de los reportes de pestañas, en el orden en que se exportan
+    COLUMNAS_EXPORTACION_TAB = {
+        "puntuacion_final": CaLicitacion.puntuacion_final, "codigo_ca": CaLicitacion.codigo_ca,
+        "nombre": CaLicitacion.nombre, "descripcion": CaLicitacion.descripcion,
+        "organismo_nombre": func.coalesce(CaOrganismo.nombre, "N/A"), "direccion_entrega": CaLicitacion.direccion_entrega,
+        "estado_ca_texto": CaLicitacion.estado_ca_texto, "fecha_publicacion": CaLicitacion.fecha_publicacion,
+        "fecha_cierre": CaLicitacion.fecha_cierre, "fecha_cierre_segundo_llamado": CaLicitacion.fecha_cierre_segundo_llamado,
+        "proveedores_cotizando": CaLicitacion.proveedores_cotizando, "productos_solicitados": CaLicitacion.productos_solicitados,
+        "es_favorito": func.coalesce(CaSeguimiento.es_favorito, False), "es_ofertada": func.coalesce(CaSeguimiento.es_ofertada, False),
+    }
+
+    def obtener_datos_exportacion_tab(self, tab: str) -> Tuple[List[str], List[tuple]]:
+        """
+        Datos de una pestaña para exportar: (nombres_columnas, filas como tuplas).
+        Selecciona solo las columnas del reporte (sin cargar entidades ORM).
+        Candidatas sin umbral mínimo, igual que antes.
+        """
+        columnas = list(self.COLUMNAS_EXPORTACION_TAB)
+        orden = [CaLicitacion.puntuacion_final.desc()] if tab == "tab1" else [CaLicitacion.fecha_cierre.asc()]
+        stmt = (select(*[c.label(n) for n, c in self.COLUMNAS_EXPORTACION_TAB.items()])
+                .select_from(CaLicitacion)
+                .outerjoin(CaOrganismo, CaLicitacion.organismo_id == CaOrganismo.organismo_id)
+                .outerjoin(CaSeguimiento, CaLicitacion.ca_id == CaSeguimiento.ca_id)
+                .where(*self._condiciones_tab(tab, umbral_minimo=0)).order_by(*orden))
+        with self._sesion() as session:
+            filas = [tuple(f) for f in session.execute(stmt)]
+        return columnas, filas
 
     def _gestionar_seguimiento(self, ca_id: int, es_favorito: bool | None, es_ofertada: bool | None):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 seguimiento = session.get(CaSeguimiento, ca_id)
                 if seguimiento:
@@ -238,11 +576,12 @@ class DbService:
                     session.add(nuevo)
                 session.commit()
             except Exception as e: logger.error(f"Error seguimiento {ca_id}: {e}"); session.rollback()
+        self.invalidar_detalle(ca_id)
 
     def gestionar_favorito(self, ca_id: int, es_favorito: bool): self._gestionar_seguimiento(ca_id, es_favorito=es_favorito, es_ofertada=None)
     def gestionar_ofertada(self, ca_id: int, es_ofertada: bool): self._gestionar_seguimiento(ca_id, es_favorito=None, es_ofertada=es_ofertada)
     def gestionar_oculta(self, ca_id: int, ocultar: bool = True):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 seguimiento = session.get(CaSeguimiento, ca_id)
                 if seguimiento:
@@ -256,9 +595,10 @@ class DbService:
                     session.add(nuevo)
                 session.commit()
             except Exception as e: logger.error(f"Error ocultando {ca_id}: {e}"); session.rollback()
+        self.invalidar_detalle(ca_id)
     
     def agregar_nota(self, ca_id: int, nota: str):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 seguimiento = session.get(CaSeguimiento, ca_id)
                 if seguimiento:
@@ -269,21 +609,23 @@ class DbService:
                     session.add(nuevo)
                 session.commit()
             except Exception as e: logger.error(f"Error nota {ca_id}: {e}"); session.rollback()
+        self.invalidar_detalle(ca_id)
     
     def eliminar_ca_definitivamente(self, ca_id: int):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             try:
                 licitacion = session.get(CaLicitacion, ca_id)
                 if licitacion: session.delete(licitacion); session.commit()
             except Exception as e: logger.error(f"Error eliminar {ca_id}: {e}"); session.rollback()
+        self.invalidar_detalle(ca_id)
     def ocultar_licitacion(self, ca_id: int): return self.eliminar_ca_definitivamente(ca_id)
 
     def get_all_keywords(self) -> List[CaKeyword]:
-        with self.session_factory() as session: return session.scalars(select(CaKeyword).order_by(CaKeyword.keyword)).all()
+        with self._sesion() as session: return session.scalars(select(CaKeyword).order_by(CaKeyword.keyword)).all()
 
     # --- FUNCIÓN CORREGIDA Y COINCIDENTE ---
     def add_keyword(self, keyword: str, tipo: str, puntos: int) -> CaKeyword:
-        with self.session_factory() as session:
+        with self._sesion() as session:
             nuevo = CaKeyword(keyword=keyword.lower().strip())
             
             if tipo in ["titulo_pos", "titulo_neg"]:
@@ -299,23 +641,100 @@ class DbService:
     # ----------------------------------------
 
     def delete_keyword(self, keyword_id: int):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             session.query(CaKeyword).filter_by(keyword_id=keyword_id).delete()
             session.commit()
 
     def get_all_organismo_reglas(self) -> List[CaOrganismoRegla]:
-        with self.session_factory() as session: return session.scalars(select(CaOrganismoRegla).options(joinedload(CaOrganismoRegla.organismo))).all()
+        with self._sesion() as session: return session.scalars(select(CaOrganismoRegla).options(joinedload(CaOrganismoRegla.organismo))).all()
     def set_organismo_regla(self, organismo_id: int, tipo_str: str, puntos: Optional[int] = None) -> CaOrganismoRegla:
-        with self.session_factory() as session:
+        with self._sesion() as session:
             stmt = select(CaOrganismoRegla).where(CaOrganismoRegla.organismo_id == organismo_id)
             regla = session.scalars(stmt).first()
             if regla: regla.tipo = tipo_str; regla.puntos = puntos
             else: regla = CaOrganismoRegla(organismo_id=organismo_id, tipo=tipo_str, puntos=puntos); session.add(regla)
             session.commit(); session.refresh(regla); return regla
     def delete_organismo_regla(self, organismo_id: int):
-        with self.session_factory() as session:
+        with self._sesion() as session:
             stmt = select(CaOrganismoRegla).where(CaOrganismoRegla.organismo_id == organismo_id)
             regla = session.scalars(stmt).first()
             if regla: session.delete(regla); session.commit()
     def get_all_organisms(self) -> List[CaOrganismo]:
-        with self.session_factory() as session: return session.scalars(select(CaOrganismo).order_by(CaOrganismo.nombre)).all()
\ No newline at end of file
+        with self._sesion() as session: return session.scalars(select(CaOrganismo).order_by(CaOrganismo.nombre)).all()
+
+    # --- Planificador de tareas ---
+    # Las fechas del planificador se guardan y se comparan con zona (hora local del equipo):
+    # PostgreSQL las convierte bien aunque su TimeZone sea otro. SQLite las devuelve sin
+    # zona, con la hora local con que se guardaron.
+    @staticmethod
+    def _ahora() -> datetime:
+        return datetime.now().astimezone()
+
+    @staticmethod
+    def _hora_local(valor: Optional[datetime]) -> Optional[datetime]:
+        return None if valor is None else valor.astimezone()
+
+    def _tarea_a_dict(self, t: CaTareaProgramada) -> Dict:
+        return {"tarea_id": t.tarea_id, "nombre": t.nombre, "tipo": t.tipo, "hora": t.hora, "parametros": t.parametros or {},
+                "prioridad": t.prioridad, "recurso": t.recurso, "activa": t.activa, "recuperar_perdidas": t.recuperar_perdidas,
+                "ultimo_horario": self._hora_local(t.ultimo_horario)}
+
+    def _ejecucion_a_dict(self, e: CaEjecucionTarea) -> Dict:
+        return {"ejecucion_id": e.ejecucion_id, "tarea_id": e.tarea_id, "tarea": e.tarea.nombre, "origen": e.origen,
+                "estado": e.estado.value, "programada_para": self._hora_local(e.programada_para),
+                "encolada_en": self._hora_local(e.encolada_en), "iniciada_en": self._hora_local(e.iniciada_en),
+                "finalizada_en": self._hora_local(e.finalizada_en), "espera_s": e.espera_s, "duracion_s": e.duracion_s,
+                "resultado": e.resultado, "error": e.error}
+
+    def guardar_tarea_programada(self, nombre: str, tipo: str, hora: str, activa: bool = True, parametros: Optional[Dict] = None,
+                                 prioridad: int = 50, recurso: str = "bd", recuperar_perdidas: bool = True) -> int:
+        """Crea o actualiza (por nombre) una tarea diaria. Un horario nuevo o recién activado no se recupera hacia atrás."""
+        with self._sesion() as session:
+            tarea = session.scalars(select(CaTareaProgramada).where(CaTareaProgramada.nombre == nombre)).first()
+            if tarea is None:
+                tarea = CaTareaProgramada(nombre=nombre, ultimo_horario=self._ahora()); session.add(tarea)
+            elif tarea.hora != hora or (activa and not tarea.activa):
+                tarea.ultimo_horario = self._ahora()
+            tarea.tipo, tarea.hora, tarea.activa, tarea.parametros = tipo, hora, activa, parametros or {}
+            tarea.prioridad, tarea.recurso, tarea.recuperar_perdidas = prioridad, recurso, recuperar_perdidas
+            session.commit(); return tarea.tarea_id
+
+    def obtener_tareas_programadas(self, solo_activas: bool = True) -> List[Dict]:
+        with self._sesion() as session:
+            stmt = select(CaTareaProgramada).order_by(CaTareaProgramada.prioridad, CaTareaProgramada.tarea_id)
+            if solo_activas: stmt = stmt.where(CaTareaProgramada.activa == True)
+            return [self._tarea_a_dict(t) for t in session.scalars(stmt)]
+
+    def registrar_ejecucion_tarea(self, tarea_id: int, programada_para: datetime, origen: str,
+                                  estado: EstadoEjecucion = EstadoEjecucion.EN_COLA, error: Optional[str] = None) -> int:
+        """Registra una ejecución y marca su horario como atendido en la misma transacción."""
+        with self._sesion() as session:
+            ejecucion = CaEjecucionTarea(tarea_id=tarea_id, programada_para=programada_para, origen=origen, estado=estado,
+                                         encolada_en=self._ahora(), error=error)
+            session.add(ejecucion)
+            session.execute(update(CaTareaProgramada).where(CaTareaProgramada.tarea_id == tarea_id).values(ultimo_horario=programada_para))
+            session.commit(); return ejecucion.ejecucion_id
+
+    def actualizar_ejecucion_tarea(self, ejecucion_id: int, **campos):
+        with self._sesion() as session:
+            session.execute(update(CaEjecucionTarea).where(CaEjecucionTarea.ejecucion_id == ejecucion_id).values(**campos))
+            session.commit()
+
+    def recuperar_ejecuciones_pendientes(self) -> List[Tuple[Dict, Dict]]:
+        """
+        Al arrancar: las ejecuciones que quedaron EN_CURSO se cierran como error (la app se cerró a mitad)
+        y se devuelven las que seguían EN_COLA, como (ejecucion, tarea), para volver a encolarlas.
+        """
+        with self._sesion() as session:
+            session.execute(update(CaEjecucionTarea).where(CaEjecucionTarea.estado == EstadoEjecucion.EN_CURSO)
+                            .values(estado=EstadoEjecucion.ERROR, finalizada_en=self._ahora(), error="Interrumpida: la aplicación se cerró."))
+            session.commit()
+            stmt = (select(CaEjecucionTarea).options(joinedload(CaEjecucionTarea.tarea))
+                    .where(CaEjecucionTarea.estado == EstadoEjecucion.EN_COLA).order_by(CaEjecucionTarea.ejecucion_id))
+            return [(self._ejecucion_a_dict(e), self._tarea_a_dict(e.tarea)) for e in session.scalars(stmt)]
+
+    def obtener_historial_ejecuciones(self, limite: int = 50) -> List[Dict]:
+        with self._sesion() as session:
+            stmt = (select(CaEjecucionTarea).options(joinedload(CaEjecucionTarea.tarea))
+                    .order_by(CaEjecucionTarea.ejecucion_id.desc()).limit(limite))
+            return [self._ejecucion_a_dict(e) for e in session.scalars(stmt)]
@@ -8,22 +8,44 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 
 # Importa la URL de la BD desde el archivo de configuración central
-from config.config import DATABASE_URL
+from config.config import (
+    DATABASE_URL, SQL_LENTA_MS, SQL_REPETICIONES_N_MAS_1,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_S, DB_POOL_RECYCLE_S, DB_POOL_PRE_PING, DB_KEEPALIVE_IDLE_S
+)
 from src.utils.logger import configurar_logger
+from src.utils.metricas_sql import instrumentar
 
 logger = configurar_logger(__name__)
 
+
+def _opciones_engine(url: str) -> dict:
+    """Opciones del pool y del driver según el motor (SQLite solo se usa en pruebas / desarrollo)."""
+    if (url or "").startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_S,
+        # Reciclar por antigüedad en vez de un SELECT 1 por checkout (un viaje extra
+        # al servidor en cada consulta); DB_POOL_PRE_PING=true vuelve al ping.
+        "pool_recycle": DB_POOL_RECYCLE_S,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_use_lifo": True,  # Reusa la conexión más reciente y deja expirar las sobrantes
+        "connect_args": {
+            # Le decimos al driver (psycopg2) que use UTF-8
+            # para comunicarse con el servidor de PostgreSQL.
+            "client_encoding": "utf8",
+            "keepalives": 1, "keepalives_idle": DB_KEEPALIVE_IDLE_S,
+            "keepalives_interval": 10, "keepalives_count": 3,
+        },
+    }
+
+
 # --- Creación del Engine ---
 try:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,  # Verifica la conexión antes de usarla
-        echo=False,
-        
-        # Le decimos al driver (psycopg2) que use UTF-8
-        # para comunicarse con el servidor de PostgreSQL.
-        client_encoding='utf8'
-    )
+    engine = create_engine(DATABASE_URL, echo=False, **_opciones_engine(DATABASE_URL))
+    # Latencia por sentencia, log de lentas y conteo por acción (ver metricas_sql)
+    instrumentar(engine, umbral_lenta_ms=SQL_LENTA_MS, repeticiones_n_mas_1=SQL_REPETICIONES_N_MAS_1)
     logger.info("Engine de SQLAlchemy creado exitosamente.")
 except Exception as e:
     logger.critical(f"Error al crear el engine de SQLAlchemy: {e}")
@@ -4,8 +4,11 @@ Diálogo de Exportación (Moderno).
 """
 
 from PySide6.QtCore import Slot
+from PySide6.QtWidgets import QButtonGroup
 from qfluentwidgets import MessageBoxBase, SubtitleLabel, RadioButton, BodyLabel
 
+from src.logic.export_writers import FORMATOS_EXPORT
+
 class GuiExportDialog(MessageBoxBase):
     def __init__(self, current_tab_name: str, parent=None):
         super().__init__(parent)
@@ -14,22 +17,29 @@ class GuiExportDialog(MessageBoxBase):
         
         # Widgets
         self.lbl_format = BodyLabel("Formato de Archivo:", self)
-        self.radio_excel = RadioButton("Excel (.xlsx)", self)
-        self.radio_csv = RadioButton("CSV (.csv)", self)
+        self.radios_formato = {fmt: RadioButton(etiqueta, self) for fmt, etiqueta in FORMATOS_EXPORT.items()}
+        self.radio_excel = self.radios_formato["excel"]
+        self.radio_csv = self.radios_formato["csv"]
         self.radio_excel.setChecked(True)
         
         self.lbl_scope = BodyLabel("Alcance:", self)
         self.radio_all = RadioButton("Todas las pestañas", self)
         self.radio_curr = RadioButton(f"Solo actual ({current_tab_name})", self)
         self.radio_all.setChecked(True)
+
+        # Grupos separados: si no, todos los RadioButton hermanos serían excluyentes entre sí
+        self.grupo_formato = QButtonGroup(self)
+        for radio in self.radios_formato.values(): self.grupo_formato.addButton(radio)
+        self.grupo_alcance = QButtonGroup(self)
+        self.grupo_alcance.addButton(self.radio_all); self.grupo_alcance.addButton(self.radio_curr)
         
         # Layout
         self.viewLayout.addWidget(self.titleLabel)
         self.viewLayout.addSpacing(10)
         
         self.viewLayout.addWidget(self.lbl_format)
-        self.viewLayout.addWidget(self.radio_excel)
-        self.viewLayout.addWidget(self.radio_csv)
+        for radio in self.radios_formato.values():
+            self.viewLayout.addWidget(radio)
         
         self.viewLayout.addSpacing(15)
         
@@ -42,7 +52,7 @@ class GuiExportDialog(MessageBoxBase):
         
     def get_options(self) -> dict:
         return {
-            "format": "excel" if self.radio_excel.isChecked() else "csv",
+            "format": next((fmt for fmt, radio in self.radios_formato.items() if radio.isChecked()), "excel"),
             "scope": "all" if self.radio_all.isChecked() else "current",
             "tab_name": self.current_tab_name
         }
\ No newline at end of file
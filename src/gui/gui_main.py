@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-import datetime
+from functools import cached_property
 from pathlib import Path
 from typing import List
 
-from PySide6.QtCore import QThreadPool, QTimer, Qt, Slot, QTime, Signal, QDate
+from PySide6.QtCore import QThreadPool, QTimer, Qt, Slot, Signal, QDate
 from PySide6.QtGui import QStandardItemModel, QIcon, QAction, QFont
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
@@ -17,20 +17,17 @@ from qfluentwidgets import (
     FluentWindow, NavigationItemPosition, FluentIcon as FIF,
     ProgressBar, InfoBar, InfoBarPosition, CheckBox, SpinBox, BodyLabel, LineEdit,
     ToolButton, Flyout, FlyoutAnimationType, SwitchButton, StrongBodyLabel, 
-    CalendarPicker, PrimaryPushButton
+    CalendarPicker, PrimaryPushButton, CaptionLabel
 )
 from src.gui.gui_detail_drawer import DetailDrawer
 from src.gui.gui_worker import Worker
 from src.gui.gui_tools import GuiToolsWidget
-from src.utils.logger import configurar_logger
+from src.utils.logger import configurar_logger, configurar_niveles_desde_settings
 from src.utils.settings_manager import SettingsManager
+from src.utils import perfilado
 from src.db.session import SessionLocal
 from src.db.db_service import DbService
-from src.logic.etl_service import EtlService
-from src.logic.excel_service import ExcelService
-from src.logic.score_engine import ScoreEngine
-from src.scraper.scraper_service import ScraperService
-from src.gui.gui_models import LicitacionProxyModel
+from src.gui.gui_models import LicitacionProxyModel, crear_parametros_filtro, UMBRAL_FILTRADO_EN_HILO
 
 from .mixins.threading_mixin import ThreadingMixin
 from .mixins.main_slots_mixin import MainSlotsMixin
@@ -94,10 +91,17 @@ class CheckableComboBox(QComboBox):
 
 class ClickableContainer(QWidget):
     clicked = Signal() 
+    isSelectable = False  # El panel de navegación no lo marca como pestaña activa
     def setSelected(self, isSelected: bool): pass
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if event.button() == Qt.LeftButton: self.clicked.emit()
 
 class TableInterface(QWidget):
     filtersChanged = Signal()
+    # Se emite una vez que el usuario deja de escribir/cambiar filtros (debounce)
+    filterRequested = Signal()
+    FILTER_DEBOUNCE_MS = 250
 
     def __init__(self, object_name, parent=None):
         super().__init__(parent=parent)
@@ -130,7 +134,12 @@ class TableInterface(QWidget):
         self.filterButton.setToolTip("Filtros Avanzados")
         self.filterButton.clicked.connect(self._show_filter_flyout)
         
+        # Filas cargadas / total filtrado (solo en las pestañas paginadas)
+        self.lblConteo = CaptionLabel("", self)
+        self.lblConteo.setStyleSheet("color: gray;")
+
         self.topLayout.addWidget(self.searchBar, 1)
+        self.topLayout.addWidget(self.lblConteo)
         self.topLayout.addWidget(self.filterButton)
         
         self.vBoxLayout.addLayout(self.topLayout)
@@ -140,6 +149,27 @@ class TableInterface(QWidget):
         self.tableLayout.setContentsMargins(0, 5, 0, 0)
         self.vBoxLayout.addWidget(self.tableContainer)
 
+        # Agrupa las pulsaciones de teclas y cambios de filtro en una sola petición
+        self._filter_debounce = QTimer(self)
+        self._filter_debounce.setSingleShot(True)
+        self._filter_debounce.setInterval(self.FILTER_DEBOUNCE_MS)
+        self._filter_debounce.timeout.connect(self.filterRequested.emit)
+        self.searchBar.textChanged.connect(self._filter_debounce.start)
+        self.filtersChanged.connect(self._filter_debounce.start)
+
+    def filter_parameters(self) -> dict:
+        return crear_parametros_filtro(
+            self.searchBar.text(),
+            self.filter_state["monto"],
+            self.filter_state["show_zeros"],
+            self.filter_state["2do_llamado"],
+            self.filter_state["selected_states"],
+            self.filter_state["pub_from"],
+            self.filter_state["pub_to"],
+            self.filter_state["close_from"],
+            self.filter_state["close_to"]
+        )
+
     def _show_filter_flyout(self):
         self.filter_view = QFrame()
         self.filter_view.setObjectName("FilterFlyout")
@@ -290,7 +320,15 @@ class TableInterface(QWidget):
 
 
 class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin, ContextMenuMixin, TableManagerMixin):
-    def __init__(self):
+    # El planificador avisa desde sus hilos; las señales lo traen al hilo de la GUI
+    tareaProgramadaTerminada = Signal(dict)
+    tareaProgramadaProgreso = Signal(str)
+
+    def __init__(self, cargar_datos: bool = True):
+        """
+        cargar_datos=False deja la ventana visible pero ocupada, sin tocar la BD: el arranque
+        la muestra de inmediato y llama a 'iniciar_carga_datos' cuando terminan las migraciones.
+        """
         super().__init__()
         self.setWindowTitle("Monitor CA")
         self.resize(1280, 800)
@@ -299,22 +337,18 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
         self.running_workers = []
         self.is_task_running = False
         self.last_error = None
-        self.executed_tasks_log = set()
+        self.proceso_etl = None  # Extracción en proceso hijo (cancelable desde la barra de progreso)
+        self.planificador = None
         
         try:
             self.settings_manager = SettingsManager()
+            perfilado.configurar_desde_settings(self.settings_manager)
+            configurar_niveles_desde_settings(self.settings_manager)
             self.db_service = DbService(SessionLocal)
-            self.scraper_service = ScraperService()
-            self.excel_service = ExcelService(self.db_service)
-            self.score_engine = ScoreEngine(self.db_service)
-            self.etl_service = EtlService(self.db_service, self.scraper_service, self.score_engine)
         except Exception as e:
             logger.critical(f"Error servicios: {e}")
             sys.exit(1)
 
-        self.scheduler_timer = QTimer(self)
-        self.scheduler_timer.timeout.connect(self.check_scheduled_tasks)
-        
         self.progress_container = ClickableContainer(self)
         self.progress_layout = QVBoxLayout(self.progress_container)
         self.progress_layout.setContentsMargins(10, 0, 10, 0); self.progress_layout.setSpacing(5)
@@ -329,7 +363,13 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
         self.model_tab1 = QStandardItemModel(0, len(COLUMN_HEADERS))
         self.proxy_tab1 = LicitacionProxyModel(self)
         self.proxy_tab1.setSourceModel(self.model_tab1)
+        # Candidatas se filtra y ordena en la BD al cargar cada página (puntaje desc): el proxy no filtra
+        self.proxy_tab1.params = crear_parametros_filtro(show_zeros=True)
+        self.pagina_candidatas = {"generacion": 0, "cursor": None, "total": 0, "cargando": False,
+                                  "filter_state": {}, "texto": "", "umbral": 5}
         self.table_unified = self.crear_tabla_view(self.model_tab1, "tab_unified")
+        # Sin orden por encabezado: solo ordenaría las páginas ya cargadas y las siguientes se mezclarían
+        self.table_unified.setSortingEnabled(False)
         self.table_unified.setModel(self.proxy_tab1) 
         self.unifiedInterface.tableLayout.addWidget(self.table_unified)
         
@@ -356,17 +396,52 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
         self.toolsInterface.start_export_signal.connect(self.on_start_export_dispatch)
         self.toolsInterface.start_recalculate_signal.connect(lambda: self.on_run_recalculate_thread(silent=True))
         self.toolsInterface.settings_changed_signal.connect(self.on_settings_changed)
-        self.toolsInterface.autopilot_config_changed_signal.connect(lambda: self.settings_manager.load_settings())
+        self.toolsInterface.autopilot_config_changed_signal.connect(self.on_autopilot_config_changed)
+        self.tareaProgramadaTerminada.connect(self.on_tarea_programada_terminada)
+        self.tareaProgramadaProgreso.connect(lambda msg: None if self.is_task_running else self.lbl_progress_status.setText(msg))
         self.detail_drawer = DetailDrawer(self)
 
         self.initNavigation()
         self._setup_tray_icon()
         self._connect_table_signals()
         
-        self.scheduler_timer.start(30000)
+        self.datos_iniciados = False
+        if cargar_datos: self.iniciar_carga_datos()
+        else:
+            # Sin acciones mientras corren las migraciones: las guardas miran 'is_task_running'
+            self.set_ui_busy(True); self.lbl_progress_status.setText("Verificando base de datos...")
+
+    def iniciar_carga_datos(self, *_):
+        """Primera carga de tablas, limpieza y tareas programadas (requieren la BD al día)."""
+        if self.datos_iniciados: return
+        self.datos_iniciados = True
+        self.set_ui_busy(False)
+        self.start_background_task(self.score_engine.precargar_reglas)
+        self.start_background_task(self.iniciar_planificador)
         QTimer.singleShot(500, self.on_load_data_thread)
         QTimer.singleShot(3000, self.iniciar_limpieza_silenciosa)
 
+    # --- Servicios: se crean al primer uso (pandas y playwright solo cargan al exportar o extraer) ---
+    @cached_property
+    def score_engine(self):
+        from src.logic.score_engine import ScoreEngine
+        return ScoreEngine(self.db_service)
+
+    @cached_property
+    def scraper_service(self):
+        from src.scraper.scraper_service import ScraperService
+        return ScraperService()
+
+    @cached_property
+    def etl_service(self):
+        from src.logic.etl_service import EtlService
+        return EtlService(self.db_service, self.scraper_service, self.score_engine)
+
+    @cached_property
+    def excel_service(self):
+        from src.logic.excel_service import ExcelService
+        return ExcelService(self.db_service)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if hasattr(self, 'detail_drawer'):
@@ -389,9 +464,16 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
         # -------------------------------------------------
 
         self.addSubInterface(self.toolsInterface, FIF.TILES, "Herramientas", NavigationItemPosition.TOP)
-        self.navigationInterface.addWidget(routeKey="progress_widget", widget=self.progress_container, onClick=lambda: None, position=NavigationItemPosition.BOTTOM)
+        self.navigationInterface.addWidget(routeKey="progress_widget", widget=self.progress_container, onClick=self.on_progress_clicked, position=NavigationItemPosition.BOTTOM)
         self.navigationInterface.addItem(routeKey="refresh", icon=FIF.SYNC, text="Refrescar Tablas", onClick=self.on_load_data_thread, position=NavigationItemPosition.BOTTOM)
 
+    def on_progress_clicked(self):
+        proceso = self.proceso_etl
+        if proceso is None or not proceso.en_curso: return
+        confirm = QMessageBox.question(self, "Cancelar Extracción", "¿Cancelar la extracción en curso?\nLo ya guardado en la base de datos se conserva.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if confirm == QMessageBox.StandardButton.Yes and proceso is self.proceso_etl:
+            proceso.cancelar(); self.lbl_progress_status.setText("Cancelando...")
+
     def _show_update_flyout(self):
         view = QFrame(); view.setObjectName("UpdateFlyout"); view.setFixedWidth(300)
         view.setStyleSheet("QFrame#UpdateFlyout { background-color: #ffffff; border: 1px solid #e5e5e5; border-radius: 8px; } QLabel { background-color: transparent; }")
@@ -413,48 +495,54 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
         flyout_view.parent().close()
         if self.is_task_running: InfoBar.warning("Ocupado", "Ya hay una tarea en ejecución.", parent=self); return
         logger.info(f"Iniciando actualización selectiva para: {scopes}")
-        self.start_task(task=self.etl_service.run_fase2_update, on_result=lambda: logger.info("Actualización selectiva OK"), on_error=self.on_task_error, on_finished=self.on_fase2_update_finished, on_progress=self.on_progress_update, on_progress_percent=self.on_progress_percent_update, task_kwargs={"scopes": scopes})
+        self.start_process_task("run_fase2_update", on_result=lambda: logger.info("Actualización selectiva OK"), on_error=self.on_task_error, on_finished=self.on_fase2_update_finished, on_progress=self.on_progress_update, on_progress_percent=self.on_progress_percent_update, task_kwargs={"scopes": scopes})
 
     def _connect_table_signals(self):
         ui = self.unifiedInterface
-        ui.searchBar.textChanged.connect(lambda: self.update_proxy_filter(self.proxy_tab1, ui))
-        ui.filtersChanged.connect(lambda: self.update_proxy_filter(self.proxy_tab1, ui))
+        ui.filterRequested.connect(self.recargar_candidatas)
+        self.table_unified.verticalScrollBar().valueChanged.connect(self.cargar_mas_candidatas)
         self.table_unified.customContextMenuRequested.connect(self.mostrar_menu_contextual)
         
         ui3 = self.seguimientoInterface
-        ui3.searchBar.textChanged.connect(lambda: self.update_proxy_filter(self.proxy_tab3, ui3))
-        ui3.filtersChanged.connect(lambda: self.update_proxy_filter(self.proxy_tab3, ui3))
+        ui3.filterRequested.connect(lambda: self.update_proxy_filter(self.proxy_tab3, ui3))
         self.table_seguimiento.customContextMenuRequested.connect(self.mostrar_menu_contextual)
         
         ui4 = self.ofertadasInterface
-        ui4.searchBar.textChanged.connect(lambda: self.update_proxy_filter(self.proxy_tab4, ui4))
-        ui4.filtersChanged.connect(lambda: self.update_proxy_filter(self.proxy_tab4, ui4))
+        ui4.filterRequested.connect(lambda: self.update_proxy_filter(self.proxy_tab4, ui4))
         self.table_ofertadas.customContextMenuRequested.connect(self.mostrar_menu_contextual)
 
         self.table_unified.doubleClicked.connect(self.on_table_double_clicked)
         self.table_seguimiento.doubleClicked.connect(self.on_table_double_clicked)
         self.table_ofertadas.doubleClicked.connect(self.on_table_double_clicked)
 
+        for table in (self.table_unified, self.table_seguimiento, self.table_ofertadas):
+            table.selectionModel().currentRowChanged.connect(self.on_table_current_changed)
+
     def update_proxy_filter(self, proxy_model, ui_obj):
-        proxy_model.set_filter_parameters(
-            ui_obj.searchBar.text(),
-            ui_obj.filter_state["monto"],
-            ui_obj.filter_state["show_zeros"],
-            ui_obj.filter_state["2do_llamado"],
-            ui_obj.filter_state["selected_states"],
-            ui_obj.filter_state["pub_from"],
-            ui_obj.filter_state["pub_to"],
-            ui_obj.filter_state["close_from"],
-            ui_obj.filter_state["close_to"]
-        )
+        # Las filas visibles se calculan sobre una copia de las claves precalculadas;
+        # con tablas grandes eso ocurre en un hilo y el resultado se aplica en un solo lote.
+        # La búsqueda de texto completo consulta la BD, así que siempre va al hilo.
+        trabajo = proxy_model.preparar_filtrado(ui_obj.filter_parameters())
+        if trabajo["params"]["texto_completo"]:
+            self.start_background_task(self._filtrar_con_texto_completo, on_result=proxy_model.aplicar_filtrado, task_args=(proxy_model, trabajo))
+        elif proxy_model.filas_origen() < UMBRAL_FILTRADO_EN_HILO:
+            proxy_model.aplicar_filtrado(proxy_model.calcular_filas(trabajo))
+        else:
+            self.start_background_task(proxy_model.calcular_filas, on_result=proxy_model.aplicar_filtrado, task_args=(trabajo,))
 
-    def poblar_tab_unificada(self, data):
-        super().poblar_tab_unificada(data)
-        self.update_proxy_filter(self.proxy_tab1, self.unifiedInterface)
+    def _filtrar_con_texto_completo(self, proxy_model, trabajo):
+        params = trabajo["params"]
+        try:
+            params["ids_texto"] = frozenset(self.db_service.ids_coincidentes_texto(params["texto"]))
+        except Exception as e:
+            # Sin índice disponible se filtra solo por nombre, como antes
+            logger.warning(f"Búsqueda de texto completo no disponible: {e}")
+            params["texto_completo"] = False
+        return proxy_model.calcular_filas(trabajo)
 
     @Slot()
     def on_settings_changed(self):
-        logger.info("Configuración interna actualizada."); self.score_engine.recargar_reglas()
+        logger.info("Configuración interna actualizada."); self.start_background_task(self.score_engine.recargar_reglas)
         try:
             # Sin mensaje emergente como solicitaste antes
             pass
@@ -481,41 +569,51 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
             folder = QFileDialog.getExistingDirectory(self, "Seleccionar Carpeta Base")
             if not folder: return
             self.settings_manager.set_setting("user_export_path", folder); self.settings_manager.save_settings(self.settings_manager.config); saved_path = folder
-        self.start_task(task=self.excel_service.ejecutar_exportacion_lote, on_result=lambda r: self._show_export_success(r, saved_path), on_error=self.on_task_error, task_args=(lista_tareas, saved_path))
+        self.start_task(task=self.excel_service.ejecutar_exportacion_lote, on_result=lambda r: self._show_export_success(r, saved_path), on_error=self.on_task_error, on_progress=self.on_progress_update, on_progress_percent=self.on_progress_percent_update, task_args=(lista_tareas, saved_path))
     
     def _show_export_success(self, resultados: List[str], base_path: str):
         exitos = [r for r in resultados if not r.startswith("ERROR")]
         if exitos: InfoBar.success("Exportación Finalizada", f"Archivos en: {base_path}", parent=self)
     
-    def check_scheduled_tasks(self):
-        if self.is_task_running: return 
-        self.settings_manager.load_settings()
-        now_str = QTime.currentTime().toString("HH:mm"); today_str = datetime.date.today().strftime("%Y-%m-%d")
-        if self.settings_manager.get_setting("auto_extract_enabled"):
-            if now_str == self.settings_manager.get_setting("auto_extract_time") and f"{today_str}_extract" not in self.executed_tasks_log:
-                self.executed_tasks_log.add(f"{today_str}_extract"); self.on_auto_extract_yesterday()
-        if self.settings_manager.get_setting("auto_update_enabled"):
-            if now_str == self.settings_manager.get_setting("auto_update_time") and f"{today_str}_update" not in self.executed_tasks_log:
-                self.executed_tasks_log.add(f"{today_str}_update"); self.on_run_fase2_update_thread_auto()
+    # --- Planificador de tareas (piloto automático) ---
+    def iniciar_planificador(self):
+        from src.logic.planificador import Planificador, crear_ejecutores, sincronizar_autopiloto
+        sincronizar_autopiloto(self.db_service, self.settings_manager)
+        self.planificador = Planificador(
+            self.db_service, crear_ejecutores(self.db_service, en_proceso=True, progreso=self.tareaProgramadaProgreso.emit),
+            al_terminar=self.tareaProgramadaTerminada.emit,
+            # Las extracciones manuales reservan 'web' (start_process_task); esto cubre la que
+            # pudo arrancar antes de que existiera el planificador
+            ocupado=lambda recurso: recurso == "web" and self.proceso_etl is not None and self.proceso_etl.en_curso)
+        self.planificador.iniciar()
 
     @Slot()
-    def on_auto_extract_yesterday(self):
-        y = datetime.date.today() - datetime.timedelta(days=1)
-        self.start_task(
-            task=self.etl_service.run_etl_live_to_db, 
-            on_finished=self.on_auto_task_finished, 
-            task_kwargs={"config": {"mode":"to_db", "date_from":y, "date_to":y, "max_paginas":0}}
-        )
-    
-    
+    def on_autopilot_config_changed(self):
+        self.settings_manager.config = self.settings_manager.load_settings()
+        if self.planificador is None: return
+        from src.logic.planificador import sincronizar_autopiloto
+        self.start_background_task(sincronizar_autopiloto, task_args=(self.db_service, self.settings_manager))
+
+    @Slot(dict)
+    def on_tarea_programada_terminada(self, info: dict):
+        if info["estado"] == "ok":
+            logger.info(f"PILOTO AUTOMÁTICO: '{info['tarea']}' finalizada en {info['duracion_s']:.0f} s.")
+            self.db_service.invalidar_detalle()
+            if not self.is_task_running: self.on_load_data_thread()
+        else:
+            logger.warning(f"PILOTO AUTOMÁTICO: '{info['tarea']}' falló: {info['error']}")
+            self._show_task_completion_notification("Error de Piloto Automático", f"La tarea '{info['tarea']}' falló: {info['error']}", is_auto=True, is_error=True)
+        if not self.is_task_running: self.lbl_progress_status.setText("Listo")
+
     @Slot(dict)
     def on_start_full_scraping(self, config: dict):
         logger.info(f"Recibida configuración de scraping: {config}")
+        if self.is_task_running: InfoBar.warning("Ocupado", "Ya hay una tarea en ejecución.", parent=self); return
         task_to_run = None
         if config["mode"] == "to_db":
-            task_to_run = self.etl_service.run_etl_live_to_db
+            task_to_run = "run_etl_live_to_db"
         elif config["mode"] == "to_json":
-            task_to_run = self.etl_service.run_etl_live_to_db 
+            task_to_run = "run_etl_live_to_db" 
             
         if task_to_run is None: return
         
@@ -538,8 +636,8 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
                 
                 QMessageBox.information(self, "Nuevos Organismos Detectados", msg)
 
-        self.start_task(
-            task=task_to_run,
+        self.start_process_task(
+            task_to_run,
             on_result=on_etl_result, 
             on_error=self.on_task_error,
             on_finished=self.on_scraping_completed,
@@ -562,7 +660,9 @@ class MainWindow(FluentWindow, ThreadingMixin, MainSlotsMixin, DataLoaderMixin,
         self.tray_icon.setContextMenu(menu); self.tray_icon.show(); self.tray_icon.activated.connect(lambda r: self.showNormal() if r == QSystemTrayIcon.DoubleClick else None)
     def force_quit(self): self.force_close = True; self.close(); QApplication.instance().quit()
     def closeEvent(self, event):
-        if self.force_close: event.accept()
+        if self.force_close:
+            if self.planificador: self.planificador.detener()
+            event.accept()
         else: event.ignore(); self.hide(); InfoBar.info("Minimizado", "La aplicación sigue en la bandeja.", parent=self)
 
 def run_gui():
@@ -1,20 +1,108 @@
 # -*- coding: utf-8 -*-
+from array import array
 from datetime import date, datetime
 from PySide6.QtCore import QSortFilterProxyModel, Qt, QModelIndex
 
+from config.config import MIN_CARACTERES_BUSQUEDA_TEXTO
+from src.utils.perfilado import perfilado
+
+# Bajo este número de filas el filtrado se calcula directo en el hilo GUI
+# (lanzar un hilo cuesta más que recorrer la tabla).
+UMBRAL_FILTRADO_EN_HILO = 5000
+
+# Puntaje ilegible: distinto de 0 para que "ocultar puntaje 0" no oculte la fila
+SCORE_ILEGIBLE = -(2 ** 63)
+
+
+def _a_fecha(valor):
+    """Normaliza datetime -> date (los filtros comparan solo la fecha)."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor if isinstance(valor, date) else None
+
+
+def crear_parametros_filtro(texto="", monto=0, show_zeros=False, segundo_llamado=False, estados=(),
+                            pub_from=None, pub_to=None, close_from=None, close_to=None) -> dict:
+    """
+    Estructura de parámetros que entienden 'filas_que_cumplen' y 'es_refinamiento'.
+    'ids_texto' (conjunto de ca_id de DbService.buscar_licitaciones_texto) se
+    completa después, fuera del hilo GUI, cuando 'texto_completo' es True.
+    """
+    texto = (texto or "").strip().lower()
+    return {
+        "texto": texto, "texto_completo": len(texto) >= MIN_CARACTERES_BUSQUEDA_TEXTO, "ids_texto": None,
+        "monto": monto or 0, "show_zeros": bool(show_zeros),
+        "2do_llamado": bool(segundo_llamado), "estados": frozenset(estados or ()),
+        "pub_from": pub_from, "pub_to": pub_to, "close_from": close_from, "close_to": close_to,
+    }
+
+
+def filas_que_cumplen(claves: tuple, params: dict, candidatas=None) -> list:
+    """
+    Recorre las claves precalculadas (ver LicitacionProxyModel) y devuelve
+    los índices de fila origen que pasan el filtro.
+    Es Python puro: se puede ejecutar en un hilo de trabajo sobre una copia.
+    Si se entrega 'candidatas' solo se revisan esas filas (refinamiento).
+    """
+    k_texto, k_score, k_monto, k_estado, k_estado_id, k_pub, k_cierre, k_id = claves
+    texto = params["texto"]; ids_texto = params["ids_texto"]; monto = params["monto"]; show_zeros = params["show_zeros"]
+    solo_2do = params["2do_llamado"]; estados = params["estados"]
+    p_from, p_to = params["pub_from"], params["pub_to"]
+    c_from, c_to = params["close_from"], params["close_to"]
+    filtra_pub = bool(p_from or p_to); filtra_cierre = bool(c_from or c_to)
+
+    resultado = []
+    for i in (range(len(k_texto)) if candidatas is None else candidatas):
+        if not show_zeros and k_score[i] == 0: continue
+        if texto and texto not in k_texto[i] and not (ids_texto and k_id[i] in ids_texto): continue
+        if estados and k_estado[i] not in estados: continue
+        if solo_2do and k_estado_id[i] != 2: continue
+        if monto > 0 and k_monto[i] < monto: continue
+        if filtra_pub:
+            d = k_pub[i]
+            if not d or (p_from and d < p_from) or (p_to and d > p_to): continue
+        if filtra_cierre:
+            d = k_cierre[i]
+            if not d or (c_from and d < c_from) or (c_to and d > c_to): continue
+        resultado.append(i)
+    return resultado
+
+
+def es_refinamiento(anterior: dict, nuevo: dict) -> bool:
+    """True si 'nuevo' solo puede aceptar un subconjunto de lo que aceptaba 'anterior'."""
+    if anterior is None: return False
+    if anterior["texto_completo"] != nuevo["texto_completo"]: return False
+    if anterior["texto_completo"]:
+        # Búsqueda por prefijo: solo al alargar la consulta el resultado se reduce
+        if not nuevo["texto"].startswith(anterior["texto"]): return False
+    elif anterior["texto"] not in nuevo["texto"]: return False
+    if nuevo["show_zeros"] and not anterior["show_zeros"]: return False
+    if anterior["2do_llamado"] and not nuevo["2do_llamado"]: return False
+    if nuevo["monto"] < anterior["monto"]: return False
+    if anterior["estados"] and not (nuevo["estados"] and nuevo["estados"] <= anterior["estados"]): return False
+    for k in ("pub_from", "close_from"):
+        if anterior[k] and not (nuevo[k] and nuevo[k] >= anterior[k]): return False
+    for k in ("pub_to", "close_to"):
+        if anterior[k] and not (nuevo[k] and nuevo[k] <= anterior[k]): return False
+    return True
+
+
 class LicitacionProxyModel(QSortFilterProxyModel):
+    """
+    Proxy de filtrado para las pestañas de licitaciones.
+
+    Mantiene un registro precalculado por fila del modelo origen (arreglos
+    paralelos) para que el filtrado no tenga que pasar por la API de Qt
+    (model.data) ni convertir tipos en cada tecla.
+
+    Flujo asíncrono: 'preparar_filtrado' toma una copia de las claves,
+    'calcular_filas' (en un hilo) obtiene las filas visibles y
+    'aplicar_filtrado' las aplica a la vista de una sola vez.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.filter_text = ""
-        self.min_amount = 0
-        self.show_zeros = False
-        self.only_2nd_call = False
-        self.selected_states = []
-        
-        self.pub_date_from = None
-        self.pub_date_to = None
-        self.close_date_from = None
-        self.close_date_to = None
+        self.params = crear_parametros_filtro()
 
         self.IDX_SCORE = 0
         self.IDX_NOMBRE = 1
@@ -23,75 +111,182 @@ class LicitacionProxyModel(QSortFilterProxyModel):
         self.IDX_CIERRE = 5
         self.IDX_MONTO = 6
 
+        # --- Claves de filtro precalculadas (una posición por fila origen) ---
+        self._k_texto: list[str] = []
+        self._k_score = array('q')
+        self._k_monto = array('d')
+        self._k_estado: list[str] = []
+        self._k_estado_id = array('q')
+        self._k_pub: list = []
+        self._k_cierre: list = []
+        self._k_id = array('q')
+        self._conexiones = []
+
+        # --- Estado del filtrado asíncrono ---
+        self._version = 0           # Cambia cada vez que cambian las claves
+        self._generacion = 0        # Cambia con cada petición de filtrado
+        self._filas_visibles = None # set con el último resultado aplicado (o None)
+        self._ultimo_resultado = None  # (version, params, filas) para refinar
+
+    # --- Mantenimiento de las claves ---
+
+    def setSourceModel(self, model):
+        viejo = self.sourceModel()
+        if viejo is not None:
+            for senal, slot in self._conexiones:
+                try: senal.disconnect(slot)
+                except (RuntimeError, TypeError): pass
+        self._conexiones = []
+
+        # IMPORTANTE: conectamos ANTES de super().setSourceModel para que
+        # nuestras claves estén al día cuando el proxy re-filtre las filas.
+        if model is not None:
+            self._conexiones = [
+                (model.rowsInserted, self._on_rows_inserted),
+                (model.rowsRemoved, self._on_rows_removed),
+                (model.dataChanged, self._on_data_changed),
+                (model.modelReset, self._reconstruir_claves),
+                (model.layoutChanged, self._reconstruir_claves),
+                (model.rowsMoved, self._reconstruir_claves),
+            ]
+            for senal, slot in self._conexiones:
+                senal.connect(slot)
+
+        super().setSourceModel(model)
+        self._reconstruir_claves()
+
+    def _claves_modificadas(self):
+        # Cualquier resultado calculado sobre las claves anteriores deja de ser válido;
+        # mientras llega uno nuevo se filtra fila a fila con los parámetros vigentes.
+        self._version += 1
+        self._filas_visibles = None
+        self._ultimo_resultado = None
+
+    def _calcular_claves(self, model, row: int) -> tuple:
+        texto = str(model.data(model.index(row, self.IDX_NOMBRE), Qt.UserRole) or "").lower()
+
+        try: score = int(model.data(model.index(row, self.IDX_SCORE), Qt.DisplayRole) or 0)
+        except (TypeError, ValueError): score = SCORE_ILEGIBLE
+
+        # Monto ilegible = -1 (queda fuera de cualquier filtro de monto mínimo)
+        try: monto = float(model.data(model.index(row, self.IDX_MONTO), Qt.UserRole) or 0)
+        except (TypeError, ValueError): monto = -1.0
+
+        idx_estado = model.index(row, self.IDX_ESTADO)
+        estado = model.data(idx_estado, Qt.UserRole + 2)
+        try: estado_id = int(model.data(idx_estado, Qt.UserRole) or 0)
+        except (TypeError, ValueError): estado_id = 0
+
+        pub = _a_fecha(model.data(model.index(row, self.IDX_PUB), Qt.UserRole))
+        cierre = _a_fecha(model.data(model.index(row, self.IDX_CIERRE), Qt.UserRole))
+
+        try: ca_id = int(model.data(model.index(row, self.IDX_SCORE), Qt.UserRole + 1) or 0)
+        except (TypeError, ValueError): ca_id = 0
+        return texto, score, monto, estado, estado_id, pub, cierre, ca_id
+
+    def _reconstruir_claves(self, *args):
+        model = self.sourceModel()
+        filas = [self._calcular_claves(model, r) for r in range(model.rowCount())] if model else []
+        self._k_texto = [f[0] for f in filas]
+        self._k_score = array('q', (f[1] for f in filas))
+        self._k_monto = array('d', (f[2] for f in filas))
+        self._k_estado = [f[3] for f in filas]
+        self._k_estado_id = array('q', (f[4] for f in filas))
+        self._k_pub = [f[5] for f in filas]
+        self._k_cierre = [f[6] for f in filas]
+        self._k_id = array('q', (f[7] for f in filas))
+        self._claves_modificadas()
+
+    def _on_rows_inserted(self, parent: QModelIndex, first: int, last: int):
+        if parent.isValid(): return
+        model = self.sourceModel()
+        filas = [self._calcular_claves(model, r) for r in range(first, last + 1)]
+        self._k_texto[first:first] = [f[0] for f in filas]
+        self._k_score[first:first] = array('q', (f[1] for f in filas))
+        self._k_monto[first:first] = array('d', (f[2] for f in filas))
+        self._k_estado[first:first] = [f[3] for f in filas]
+        self._k_estado_id[first:first] = array('q', (f[4] for f in filas))
+        self._k_pub[first:first] = [f[5] for f in filas]
+        self._k_cierre[first:first] = [f[6] for f in filas]
+        self._k_id[first:first] = array('q', (f[7] for f in filas))
+        self._claves_modificadas()
+
+    def _on_rows_removed(self, parent: QModelIndex, first: int, last: int):
+        if parent.isValid(): return
+        for claves in self._claves():
+            del claves[first:last + 1]
+        self._claves_modificadas()
+
+    def _on_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=None):
+        model = self.sourceModel()
+        for r in range(top_left.row(), bottom_right.row() + 1):
+            if r >= len(self._k_texto): break
+            (self._k_texto[r], self._k_score[r], self._k_monto[r], self._k_estado[r],
+             self._k_estado_id[r], self._k_pub[r], self._k_cierre[r], self._k_id[r]) = self._calcular_claves(model, r)
+        self._claves_modificadas()
+
+    def _claves(self) -> tuple:
+        return (self._k_texto, self._k_score, self._k_monto, self._k_estado,
+                self._k_estado_id, self._k_pub, self._k_cierre, self._k_id)
+
+    # --- Filtrado ---
+
     def set_filter_parameters(self, text, min_amount, show_zeros, only_2nd, states, p_from, p_to, c_from, c_to):
-        self.filter_text = text.lower()
-        self.min_amount = min_amount
-        self.show_zeros = show_zeros
-        self.only_2nd_call = only_2nd
-        self.selected_states = states
-        self.pub_date_from = p_from
-        self.pub_date_to = p_to
-        self.close_date_from = c_from
-        self.close_date_to = c_to
+        """Aplica el filtro de forma síncrona (en el hilo GUI)."""
+        params = crear_parametros_filtro(text, min_amount, show_zeros, only_2nd, states, p_from, p_to, c_from, c_to)
+        self.aplicar_filtrado(self.calcular_filas(self.preparar_filtrado(params)))
+
+    def preparar_filtrado(self, params: dict) -> dict:
+        """
+        Crea un trabajo de filtrado autocontenido (copia de las claves) que
+        puede procesarse fuera del hilo GUI con 'calcular_filas'. La copia es
+        por rebanada (memcpy en los array, punteros en las listas): no convierte
+        ningún valor en el hilo GUI.
+        Si el filtro refina al último aplicado, solo se revisan sus filas.
+        """
+        self._generacion += 1
+        candidatas = None
+        if self._ultimo_resultado:
+            version, params_previos, filas_previas = self._ultimo_resultado
+            if version == self._version and es_refinamiento(params_previos, params):
+                candidatas = filas_previas
+        return {
+            "generacion": self._generacion, "version": self._version, "params": params,
+            "claves": tuple(c[:] for c in self._claves()),
+            "candidatas": candidatas,
+        }
+
+    @staticmethod
+    @perfilado("filtrado_calcular")
+    def calcular_filas(trabajo: dict) -> dict:
+        """Ejecutable en un hilo de trabajo: no toca objetos Qt."""
+        filas = filas_que_cumplen(trabajo["claves"], trabajo["params"], trabajo["candidatas"])
+        return {"generacion": trabajo["generacion"], "version": trabajo["version"],
+                "params": trabajo["params"], "filas": filas}
+
+    @perfilado("filtrado_aplicar")  # incluye invalidateFilter -> filterAcceptsRow por cada fila
+    def aplicar_filtrado(self, resultado: dict):
+        """Aplica a la vista, en un solo lote, el resultado de 'calcular_filas'."""
+        if resultado["generacion"] != self._generacion:
+            return  # Llegó tarde: ya hay una petición más nueva en curso
+        self.params = resultado["params"]
+        if resultado["version"] == self._version:
+            self._filas_visibles = set(resultado["filas"])
+            self._ultimo_resultado = (self._version, self.params, resultado["filas"])
+        else:
+            # Los datos cambiaron mientras se calculaba: filtramos fila a fila.
+            self._filas_visibles = None
+            self._ultimo_resultado = None
         self.invalidateFilter()
 
+    def filas_origen(self) -> int:
+        return len(self._k_texto)
+
     def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
-        model = self.sourceModel()
-        if not model:
-            return True
-
-        if not self.show_zeros:
-            idx_score = model.index(source_row, self.IDX_SCORE, source_parent)
-            try:
-                score_val = int(model.data(idx_score, Qt.DisplayRole) or 0)
-                if score_val == 0:
-                    return False
-            except: pass
-
-        if self.filter_text:
-            idx_nombre = model.index(source_row, self.IDX_NOMBRE, source_parent)
-            search_data = str(model.data(idx_nombre, Qt.UserRole) or "").lower()
-            if self.filter_text not in search_data:
-                return False
-
-        idx_estado = model.index(source_row, self.IDX_ESTADO, source_parent)
-        if self.selected_states:
-            estado_row = model.data(idx_estado, Qt.UserRole + 2)
-            if estado_row not in self.selected_states:
-                return False
-
-        if self.only_2nd_call:
-            estado_id = int(model.data(idx_estado, Qt.UserRole) or 0)
-            if estado_id != 2:
-                return False
-
-        if self.min_amount > 0:
-            idx_monto = model.index(source_row, self.IDX_MONTO, source_parent)
-            try:
-                monto_val = float(model.data(idx_monto, Qt.UserRole) or 0)
-                if monto_val < self.min_amount:
-                    return False
-            except: return False
-
-        if self.pub_date_from or self.pub_date_to:
-            idx_pub = model.index(source_row, self.IDX_PUB, source_parent)
-            row_date = model.data(idx_pub, Qt.UserRole) 
-            if not row_date:
-                return False
-            if isinstance(row_date, datetime):
-                row_date = row_date.date()
-            
-            if self.pub_date_from and row_date < self.pub_date_from: return False
-            if self.pub_date_to and row_date > self.pub_date_to: return False
-
-        if self.close_date_from or self.close_date_to:
-            idx_cierre = model.index(source_row, self.IDX_CIERRE, source_parent)
-            row_datetime = model.data(idx_cierre, Qt.UserRole)
-            if not row_datetime:
-                return False
-            row_date_only = row_datetime.date() if isinstance(row_datetime, datetime) else row_datetime
-
-            if self.close_date_from and row_date_only < self.close_date_from: return False
-            if self.close_date_to and row_date_only > self.close_date_to: return False
-
-        return True
\ No newline at end of file
+        if self._filas_visibles is not None:
+            return source_row in self._filas_visibles
+        if source_row >= len(self._k_texto):
+            # Defensa: el modelo cambió sin avisarnos (no debería ocurrir)
+            if not self.sourceModel(): return True
+            self._reconstruir_claves()
+        return bool(filas_que_cumplen(self._claves(), self.params, (source_row,)))
@@ -4,13 +4,13 @@ Panel de Herramientas.
 Actualizado: Interfaz de 'Nueva Keyword' simplificada (sin menú desplegable).
 """
 
-from PySide6.QtCore import Qt, Signal, QDate, QTime
+from PySide6.QtCore import Qt, Signal, QDate, QTime, QUrl
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QStackedWidget, QHeaderView, 
     QTableWidgetItem, QMenu, QMessageBox, QGroupBox, 
-    QSplitter, QDialog, QLabel, QFrame, QAbstractSpinBox, QSpinBox
+    QSplitter, QDialog, QLabel, QFrame, QAbstractSpinBox, QSpinBox, QPlainTextEdit
 )
-from PySide6.QtGui import QColor, QBrush
+from PySide6.QtGui import QColor, QBrush, QDesktopServices
 
 from qfluentwidgets import (
     SegmentedWidget, TitleLabel, BodyLabel, CalendarPicker, 
@@ -20,8 +20,10 @@ from qfluentwidgets import (
 )
 
 from sqlalchemy import update
-from src.utils.logger import configurar_logger
+from src.utils.logger import LOG_DIR, configurar_logger, configurar_niveles_desde_settings
 from src.db.db_models import TipoReglaOrganismo, CaKeyword
+from src.logic.export_writers import FORMATOS_EXPORT
+from src.utils import perfilado, metricas_sql
 
 logger = configurar_logger(__name__)
 
@@ -71,6 +73,28 @@ class EditScoreDialog(QDialog):
 
     def get_value(self): return self.spin.value()
 
+class SqlMetricsDialog(QDialog):
+    """Reporte agregado de metricas_sql (sentencias por método, más lentas, acciones y N+1)."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Métricas SQL")
+        self.resize(1000, 620)
+        self.setStyleSheet("QDialog { background-color: #ffffff; color: #000000; }")
+        layout = QVBoxLayout(self); layout.setContentsMargins(20, 20, 20, 20); layout.setSpacing(10)
+        layout.addWidget(SubtitleLabel("Métricas SQL de esta sesión", self))
+        self.texto = QPlainTextEdit(self); self.texto.setReadOnly(True); self.texto.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.texto.setStyleSheet("QPlainTextEdit { font-family: monospace; font-size: 12px; background: white; border: 1px solid #e0e0e0; }")
+        layout.addWidget(self.texto)
+        h_btn = QHBoxLayout()
+        btn_reset = PushButton("Reiniciar", self); btn_reset.clicked.connect(self._reiniciar)
+        btn_refresh = PushButton("Actualizar", self); btn_refresh.clicked.connect(self._actualizar)
+        btn_close = PrimaryPushButton("Cerrar", self); btn_close.clicked.connect(self.accept)
+        h_btn.addWidget(btn_reset); h_btn.addStretch(); h_btn.addWidget(btn_refresh); h_btn.addWidget(btn_close); layout.addLayout(h_btn)
+        self._actualizar()
+
+    def _actualizar(self): self.texto.setPlainText(metricas_sql.formatear_reporte(top=25))
+    def _reiniciar(self): metricas_sql.metricas.reiniciar(); self._actualizar()
+
 class EditKeywordDialog(QDialog):
     def __init__(self, kw_id, name, p_nom, p_desc, p_prod, parent=None):
         super().__init__(parent)
@@ -156,17 +180,25 @@ class GuiToolsWidget(QWidget):
         w = QWidget(); l = QVBoxLayout(w); l.setSpacing(20); l.addWidget(SubtitleLabel("Centro de Exportación", w))
         gItems = QGroupBox("1. Elementos a Exportar"); vItems = QVBoxLayout()
         self.chk_bd = CheckBox("Base de Datos Completa (Backup)", w); self.chk_config = CheckBox("Keywords y Organismos (Reglas)", w); self.chk_tabs = CheckBox("Todas las Pestañas (Candidatas, Seguimiento, Ofertadas)", w); self.chk_tabs.setChecked(True)
-        vItems.addWidget(self.chk_bd); vItems.addWidget(self.chk_config); vItems.addWidget(self.chk_tabs); gItems.setLayout(vItems); l.addWidget(gItems)
+        self.chk_bd_delta = CheckBox("Base de Datos Incremental (solo cambios desde la última exportación)", w)
+        vItems.addWidget(self.chk_bd); vItems.addWidget(self.chk_bd_delta); vItems.addWidget(self.chk_config); vItems.addWidget(self.chk_tabs); gItems.setLayout(vItems); l.addWidget(gItems)
         gFmt = QGroupBox("2. Formatos de Salida"); hFmt = QHBoxLayout()
         self.chk_excel = CheckBox("Excel (.xlsx)", w); self.chk_csv = CheckBox("CSV (.csv)", w); self.chk_excel.setChecked(True)
-        hFmt.addWidget(self.chk_excel); hFmt.addSpacing(20); hFmt.addWidget(self.chk_csv); hFmt.addStretch(); gFmt.setLayout(hFmt); l.addWidget(gFmt)
+        hFmt.addWidget(self.chk_excel); hFmt.addSpacing(20); hFmt.addWidget(self.chk_csv); hFmt.addStretch()
+        # Formatos para análisis (requieren pyarrow / zstandard)
+        hFmt2 = QHBoxLayout(); self.chks_formato_extra = {}
+        for fmt in ("parquet", "arrow", "csv_gz", "csv_zst"):
+            chk = CheckBox(FORMATOS_EXPORT[fmt], w); self.chks_formato_extra[fmt] = chk; hFmt2.addWidget(chk); hFmt2.addSpacing(20)
+        hFmt2.addStretch(); vFmt = QVBoxLayout(); vFmt.addLayout(hFmt); vFmt.addLayout(hFmt2); gFmt.setLayout(vFmt); l.addWidget(gFmt)
         l.addSpacing(10); hBtn = QHBoxLayout(); b = PrimaryPushButton("Generar Exportaciones", w); b.setFixedWidth(220); b.clicked.connect(self._on_click_export); hBtn.addStretch(); hBtn.addWidget(b); hBtn.addStretch(); l.addLayout(hBtn); l.addStretch()
         return w
     def _on_click_export(self):
         fmts = []; tips = []
         if self.chk_excel.isChecked(): fmts.append("excel")
         if self.chk_csv.isChecked(): fmts.append("csv")
+        fmts += [fmt for fmt, chk in self.chks_formato_extra.items() if chk.isChecked()]
         if self.chk_bd.isChecked(): tips.append("bd_full")
+        if self.chk_bd_delta.isChecked(): tips.append("bd_delta")
         if self.chk_config.isChecked(): tips.append("config")
         if self.chk_tabs.isChecked(): tips.append("tabs")
         if not fmts or not tips: return
@@ -177,19 +209,45 @@ class GuiToolsWidget(QWidget):
         g1 = QGroupBox("Extracción Automática (Ayer)"); v1 = QVBoxLayout(); h1 = QHBoxLayout()
         self.chkAutoExtract = CheckBox("Habilitar", w); self.timeExtract = TimePicker(w, showSeconds=False) 
         h1.addWidget(self.chkAutoExtract); h1.addStretch(); h1.addWidget(BodyLabel("Hora de ejecución:", w)); h1.addWidget(self.timeExtract); v1.addLayout(h1); g1.setLayout(v1); l.addWidget(g1)
+        l.addSpacing(10); l.addWidget(SubtitleLabel("Diagnóstico", w))
+        g2 = QGroupBox("Perfilado de Rendimiento"); v2 = QVBoxLayout(); h2 = QHBoxLayout()
+        self.chkPerfilado = CheckBox("Perfilar tareas, carga de tablas y filtros", w)
+        self.cmbPerfilado = ComboBox(w); self.cmbPerfilado.addItems(["cProfile (.pstats)", "Muestreo (speedscope)"]); self.cmbPerfilado.setFixedWidth(220)
+        bPerfiles = PushButton("Abrir carpeta", w); bPerfiles.clicked.connect(self._abrir_carpeta_perfiles)
+        h2.addWidget(self.chkPerfilado); h2.addStretch(); h2.addWidget(self.cmbPerfilado); h2.addWidget(bPerfiles); v2.addLayout(h2)
+        v2.addWidget(BodyLabel(f"Guarda un archivo por operación lenta en {perfilado.DIR_PERFILES}. Dejar apagado en uso normal.", w)); g2.setLayout(v2); l.addWidget(g2)
+        g3 = QGroupBox("Consultas a la Base de Datos"); h3 = QHBoxLayout()
+        h3.addWidget(BodyLabel("Tiempos por método de DbService, consultas lentas y posibles N+1.", w)); h3.addStretch()
+        bSql = PushButton("Ver métricas SQL", w); bSql.clicked.connect(lambda: SqlMetricsDialog(self).exec()); h3.addWidget(bSql); g3.setLayout(h3); l.addWidget(g3)
+        g4 = QGroupBox("Registro (logs)"); h4 = QHBoxLayout()
+        self.txtNivelesLog = LineEdit(w); self.txtNivelesLog.setPlaceholderText("Niveles por módulo, p. ej.: src.scraper=INFO, sql_lenta=WARNING")
+        bLogs = PushButton("Abrir carpeta", w); bLogs.clicked.connect(lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(str(LOG_DIR))))
+        h4.addWidget(self.txtNivelesLog); h4.addWidget(bLogs); g4.setLayout(h4); l.addWidget(g4)
         l.addSpacing(20); hBtn = QHBoxLayout(); b = PrimaryPushButton("Guardar Configuración", w); b.setFixedWidth(250); b.clicked.connect(self._save_advanced); hBtn.addStretch(); hBtn.addWidget(b); hBtn.addStretch(); l.addLayout(hBtn); l.addStretch()
         self._load_advanced_settings(); return w
 
     def _load_advanced_settings(self):
         self.chkAutoExtract.setChecked(bool(self.settings_manager.get_setting("auto_extract_enabled")))
         self.timeExtract.setTime(QTime.fromString(self.settings_manager.get_setting("auto_extract_time") or "08:00", "HH:mm"))
+        self.chkPerfilado.setChecked(bool(self.settings_manager.get_setting("perfilado_habilitado")))
+        self.cmbPerfilado.setCurrentIndex(1 if self.settings_manager.get_setting("perfilado_modo") == "muestreo" else 0)
+        self.txtNivelesLog.setText(self.settings_manager.get_setting("niveles_log") or "")
     def _save_advanced(self):
         self.settings_manager.set_setting("auto_extract_enabled", self.chkAutoExtract.isChecked())
         t_ext = self.timeExtract.time.toString("HH:mm") if hasattr(self.timeExtract, "time") else self.timeExtract.getTime().toString("HH:mm")
         self.settings_manager.set_setting("auto_extract_time", t_ext)
+        self.settings_manager.set_setting("perfilado_habilitado", self.chkPerfilado.isChecked())
+        self.settings_manager.set_setting("perfilado_modo", perfilado.MODOS[self.cmbPerfilado.currentIndex()])
+        perfilado.configurar_desde_settings(self.settings_manager)
+        self.settings_manager.set_setting("niveles_log", self.txtNivelesLog.text().strip())
+        configurar_niveles_desde_settings(self.settings_manager)
         self.settings_manager.save_settings(self.settings_manager.config); self.autopilot_config_changed_signal.emit()
         InfoBar.success(title="Guardado", content="Configuración guardada.", orient=Qt.Horizontal, isClosable=True, position=InfoBarPosition.TOP_RIGHT, duration=2000, parent=self.window())
 
+    def _abrir_carpeta_perfiles(self):
+        perfilado.DIR_PERFILES.mkdir(parents=True, exist_ok=True)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(str(perfilado.DIR_PERFILES)))
+
     def _create_config_page(self):
         w = QWidget(); main_layout = QVBoxLayout(w); main_layout.setContentsMargins(0, 0, 0, 0); main_layout.addWidget(BodyLabel("Doble clic para EDITAR.", w))
         splitter = QSplitter(Qt.Vertical)
@@ -10,8 +10,10 @@ from typing import Any
 
 from PySide6.QtCore import QObject, QRunnable, Signal, Slot
 
-# Única dependencia interna permitida: logger
+# Únicas dependencias internas permitidas: utils
 from src.utils.logger import configurar_logger
+from src.utils.perfilado import perfilar_tarea
+from src.utils.metricas_sql import accion
 
 logger = configurar_logger(__name__)
 
@@ -64,7 +66,8 @@ class Worker(QRunnable):
                 self.kwargs['progress_callback_percent'] = self.signals.progress_percent.emit
             
             # Ejecutar la tarea
-            resultado = self.task(*self.args, **self.kwargs)
+            with accion(getattr(self.task, '__qualname__', self.task.__name__)), perfilar_tarea(self.task):
+                resultado = self.task(*self.args, **self.kwargs)
 
             if resultado is not None:
                 self.signals.result.emit(resultado)
@@ -102,20 +102,20 @@ class ContextMenuMixin:
     def _open_url_callback(self, lic): 
         if lic and lic.codigo_ca: QDesktopServices.openUrl(QUrl(f"https://buscador.mercadopublico.cl/ficha?code={lic.codigo_ca}"))
 
-    # IMPORTANTE: Usamos on_finished para refrescar la tabla inmediatamente
-    def _mover_a_favoritos(self, cid): self.start_task(self.db_service.gestionar_favorito, on_finished=self.on_load_data_thread, task_args=(cid, True))
-    def _quitar_de_favoritos(self, cid): self.start_task(self.db_service.gestionar_favorito, on_finished=self.on_load_data_thread, task_args=(cid, False))
-    def _marcar_ofertada(self, cid): self.start_task(self.db_service.gestionar_ofertada, on_finished=self.on_load_data_thread, task_args=(cid, True))
-    def _desmarcar_ofertada(self, cid): self.start_task(self.db_service.gestionar_ofertada, on_finished=self.on_load_data_thread, task_args=(cid, False))
+    # El cambio y la recarga de las pestañas van en una sola tarea y transacción
+    def _mover_a_favoritos(self, cid): self.recargar_pestanas(self.db_service.gestionar_favorito, (cid, True))
+    def _quitar_de_favoritos(self, cid): self.recargar_pestanas(self.db_service.gestionar_favorito, (cid, False))
+    def _marcar_ofertada(self, cid): self.recargar_pestanas(self.db_service.gestionar_ofertada, (cid, True))
+    def _desmarcar_ofertada(self, cid): self.recargar_pestanas(self.db_service.gestionar_ofertada, (cid, False))
     def _ocultar_de_candidatas(self, cid, nombre):
         if QMessageBox.question(self, "Ocultar", f"¿Quitar de candidatas?\n{nombre}", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
-            self.start_task(self.db_service.gestionar_oculta, on_finished=self.on_load_data_thread, task_args=(cid, True))
+            self.recargar_pestanas(self.db_service.gestionar_oculta, (cid, True))
 
     def _agregar_nota_dialog(self, cid):
         text, ok = QInputDialog.getMultiLineText(self, "Nota Personal", "Escribe una nota:")
         if ok and text.strip():
-            self.start_task(self.db_service.agregar_nota, on_finished=self.on_load_data_thread, task_args=(cid, text))
+            self.recargar_pestanas(self.db_service.agregar_nota, (cid, text))
 
     def _borrar_nota(self, cid):
         if QMessageBox.question(self, "Borrar Nota", "¿Estás seguro?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
-            self.start_task(self.db_service.agregar_nota, on_finished=self.on_load_data_thread, task_args=(cid, ""))
\ No newline at end of file
+            self.recargar_pestanas(self.db_service.agregar_nota, (cid, ""))
\ No newline at end of file
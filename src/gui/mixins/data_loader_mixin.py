@@ -1,49 +1,107 @@
 # -*- coding: utf-8 -*-
 from PySide6.QtCore import Slot
+from config.config import TAMANO_PAGINA_CANDIDATAS
 from src.utils.logger import configurar_logger
 
 logger = configurar_logger(__name__)
 
+# Filas antes del final de la tabla a las que se pide la siguiente página de Candidatas
+MARGEN_CARGA_FILAS = 20
+
 class DataLoaderMixin:
     """
     Maneja la carga secuencial de las pestañas para no congelar la UI.
+
+    Candidatas se carga por páginas (DbService.obtener_pagina_tab): sus filtros y
+    su búsqueda se aplican en la BD y las páginas siguientes llegan al acercarse
+    el scroll al final. 'pagina_candidatas' guarda el cursor, los filtros de la
+    carga en curso y una generación para descartar respuestas viejas.
     """
 
     @Slot()
     def on_load_data_thread(self):
-        self.on_load_tab1_candidatas()
+        self.recargar_pestanas()
 
-    def on_load_tab1_candidatas(self):
+    def recargar_pestanas(self, antes=None, antes_args=()):
+        """
+        Carga las tres pestañas en una sola tarea y una sola transacción. Si se indica
+        'antes' (p. ej. db_service.gestionar_favorito), el cambio y la recarga van en la
+        misma unidad de trabajo: una conexión y un commit en vez de cuatro tareas.
+        """
         # Leer umbral dinámico desde configuración (Default: 5)
         try:
             self.settings_manager.load_settings()
             umbral = int(self.settings_manager.get_setting("umbral_puntaje_minimo") or 5)
         except:
             umbral = 5
-        
+        self.pagina_candidatas["umbral"] = umbral
+        generacion, filter_state, texto = self._nueva_carga_candidatas()
+
         def task():
-            return self.db_service.obtener_datos_tab1_candidatas(umbral_minimo=umbral)
-        
+            with self.db_service.unidad_de_trabajo():
+                if antes: antes(*antes_args)
+                return self.db_service.obtener_datos_pestanas(umbral, filter_state, texto)
+
         self.start_task(
             task=task,
-            on_result=self.poblar_tab_unificada,
+            on_result=lambda datos: self.poblar_pestanas(datos, generacion),
             on_error=self.on_task_error
         )
 
-    def poblar_tab_unificada(self, data):
-        logger.info(f"DATA LOADER: Cargando {len(data)} licitaciones en Candidatas.")
-        self.poblar_tabla(self.model_tab1, data)
-        self.on_load_tab3_seguimiento()
+    def poblar_pestanas(self, datos, generacion):
+        pagina, seguimiento, ofertadas = datos
+        self.poblar_pagina_candidatas(pagina, generacion, agregar=False)
+        self.poblar_tab_seguimiento(seguimiento)
+        self.poblar_tab_ofertadas(ofertadas)
+
+    def _nueva_carga_candidatas(self):
+        """Invalida las páginas en curso y fija los filtros de la pestaña para las siguientes."""
+        estado = self.pagina_candidatas
+        ui = self.unifiedInterface
+        estado.update(generacion=estado["generacion"] + 1, cursor=None, cargando=True,
+                      filter_state=dict(ui.filter_state), texto=ui.searchBar.text())
+        return estado["generacion"], estado["filter_state"], estado["texto"]
 
-    def on_load_tab3_seguimiento(self):
-        self.start_task(task=self.db_service.obtener_datos_tab3_seguimiento, on_result=self.poblar_tab_seguimiento, on_error=self.on_task_error)
+    def recargar_candidatas(self):
+        """Primera página de Candidatas con los filtros actuales (al cambiar filtros o búsqueda)."""
+        if not self.datos_iniciados: return
+        generacion, filter_state, texto = self._nueva_carga_candidatas()
+        self._pedir_pagina_candidatas(generacion, filter_state, texto, None)
+
+    def cargar_mas_candidatas(self, *_):
+        """Siguiente página cuando el scroll se acerca al final de la tabla."""
+        estado = self.pagina_candidatas
+        if estado["cursor"] is None or estado["cargando"]: return
+        barra = self.table_unified.verticalScrollBar()
+        if barra.maximum() - barra.value() > MARGEN_CARGA_FILAS * max(barra.singleStep(), 1): return
+        estado["cargando"] = True
+        self._pedir_pagina_candidatas(estado["generacion"], estado["filter_state"], estado["texto"], estado["cursor"])
+
+    def _pedir_pagina_candidatas(self, generacion, filter_state, texto, cursor):
+        umbral = self.pagina_candidatas["umbral"]
+
+        def task():
+            try:
+                return self.db_service.obtener_pagina_tab("tab1", filter_state, texto, cursor, TAMANO_PAGINA_CANDIDATAS, umbral)
+            except Exception as e:
+                logger.error(f"No se pudo cargar la página de Candidatas: {e}")
+                return None
+
+        self.start_background_task(task, on_result=lambda pagina: self.poblar_pagina_candidatas(pagina, generacion, agregar=cursor is not None))
+
+    def poblar_pagina_candidatas(self, pagina, generacion, agregar: bool):
+        estado = self.pagina_candidatas
+        if generacion != estado["generacion"]: return  # Los filtros cambiaron: ya hay otra carga en curso
+        estado["cargando"] = False
+        if pagina is None: return
+        filas, total, cursor = pagina
+        estado.update(cursor=cursor, total=total)
+        if not agregar: logger.info(f"DATA LOADER: Cargando {len(filas)} de {total} licitaciones en Candidatas.")
+        self.poblar_tabla(self.model_tab1, filas, agregar=agregar)
+        self.unifiedInterface.lblConteo.setText(f"{self.model_tab1.rowCount()} de {total}")
 
     def poblar_tab_seguimiento(self, data):
         self.poblar_tabla(self.model_tab3, data)
-        self.on_load_tab4_ofertadas()
-
-    def on_load_tab4_ofertadas(self):
-        self.start_task(task=self.db_service.obtener_datos_tab4_ofertadas, on_result=self.poblar_tab_ofertadas, on_error=self.on_task_error)
 
     def poblar_tab_ofertadas(self, data):
         self.poblar_tabla(self.model_tab4, data)
@@ -51,4 +109,4 @@ class DataLoaderMixin:
     @Slot()
     def on_auto_task_finished(self):
         logger.info("Tarea automática finalizada. Recargando datos...")
-        self.on_load_data_thread()
\ No newline at end of file
+        self.on_load_data_thread()
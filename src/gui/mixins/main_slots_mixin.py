@@ -12,9 +12,13 @@ from src.gui.gui_scraping_dialog import ScrapingDialog
 from src.gui.gui_settings_dialog import GuiSettingsDialog
 from src.gui.gui_export_dialog import GuiExportDialog 
 from src.utils.logger import configurar_logger
+from src.utils.tracing import formatear_resumen
 
 logger = configurar_logger(__name__)
 
+# Filas hacia arriba y abajo de la selección cuyo detalle se precarga
+FILAS_PRECARGA_DETALLE = 2
+
 
 class MainSlotsMixin:
     """
@@ -38,7 +42,28 @@ class MainSlotsMixin:
                 QMessageBox.information(self, "Nota Personal", str(nota_texto))
             return # Detenemos aquí para no abrir el drawer
 
-        row = index.row()
+        ca_id = self._obtener_ca_id_fila(proxy_model, index.row())
+        if not ca_id:
+             logger.warning(f"ERROR: No se encontró CA_ID en la fila {index.row()}. Revisa table_manager_mixin.py")
+             return
+
+        logger.info(f"Abriendo detalle para CA ID: {ca_id}")
+
+        # Si ya se precargó al navegar la tabla, se abre sin ir a la BD
+        licitacion = self.db_service.detalle_en_cache(ca_id)
+        if licitacion is not None:
+            self.on_detail_data_loaded(licitacion)
+            return
+
+        # Ejecutar consulta en hilo secundario
+        self.start_task(
+            task=self.db_service.get_licitacion_by_id,
+            on_result=self.on_detail_data_loaded,
+            on_error=self.on_task_error,
+            task_args=(ca_id,)
+        )
+
+    def _obtener_ca_id_fila(self, proxy_model, row):
         ca_id = None
 
         # --- BÚSQUEDA ROBUSTA DEL ID ---
@@ -69,20 +94,16 @@ class MainSlotsMixin:
             idx_oculto = proxy_model.index(row, 2)
             val = proxy_model.data(idx_oculto, Qt.UserRole)
             if isinstance(val, int): ca_id = val
+        return ca_id
 
-        if not ca_id:
-             logger.warning(f"ERROR: No se encontró CA_ID en la fila {row}. Revisa table_manager_mixin.py")
-             return
-
-        logger.info(f"Abriendo detalle para CA ID: {ca_id}")
-        
-        # Ejecutar consulta en hilo secundario
-        self.start_task(
-            task=self.db_service.get_licitacion_by_id,
-            on_result=self.on_detail_data_loaded,
-            on_error=self.on_task_error,
-            task_args=(ca_id,)
-        )
+    @Slot(object, object)
+    def on_table_current_changed(self, current, previous):
+        """Precarga en segundo plano el detalle de la fila actual y sus vecinas."""
+        if not current.isValid(): return
+        proxy_model = current.model()
+        filas = range(max(0, current.row() - FILAS_PRECARGA_DETALLE), min(proxy_model.rowCount(), current.row() + FILAS_PRECARGA_DETALLE + 1))
+        ids = [ca_id for ca_id in (self._obtener_ca_id_fila(proxy_model, r) for r in filas) if ca_id and self.db_service.detalle_en_cache(ca_id) is None]
+        if ids: self.start_background_task(self.db_service.precargar_detalles, task_args=(ids,))
 
     def on_detail_data_loaded(self, licitacion_obj):
         """Callback cuando la BD devuelve el objeto completo."""
@@ -92,13 +113,26 @@ class MainSlotsMixin:
         else:
             logger.error("No se pudo cargar el detalle de la licitación.")
 
-    def _show_task_completion_notification(self, title: str, message: str, is_auto: bool = False, is_error: bool = False):
+    def _show_task_completion_notification(self, title: str, message: str, is_auto: bool = False, is_error: bool = False, detail: str = None):
         if self.tray_icon:
             icon = QSystemTrayIcon.MessageIcon.Warning if is_error else QSystemTrayIcon.MessageIcon.Information
             self.tray_icon.showMessage(title, message, icon, 4000)
         if not is_auto:
             if not is_error:
-                QMessageBox.information(self, title, message)
+                if detail:
+                    box = QMessageBox(QMessageBox.Icon.Information, title, message, QMessageBox.StandardButton.Ok, self)
+                    box.setDetailedText(detail)
+                    box.setStyleSheet("QTextEdit { font-family: monospace; }")  # la tabla va alineada en columnas
+                    box.exec()
+                else:
+                    QMessageBox.information(self, title, message)
+
+    def _tomar_reporte_etl(self):
+        """Mensaje corto y tabla de tiempos por etapa del último ETL en proceso (y lo consume)."""
+        reporte = getattr(self, 'ultimo_reporte_etl', None)
+        self.ultimo_reporte_etl = None
+        if not reporte: return "", None
+        return f"\n\nDuración: {reporte['duracion_s']:.1f} s (ver detalles).", formatear_resumen(reporte)
     
     @Slot()
     def on_scraping_completed(self):
@@ -107,8 +141,9 @@ class MainSlotsMixin:
             logger.warning("Proceso de Scraping finalizado con errores.")
             self._show_task_completion_notification( "Error de Scraping", f"La tarea falló: {self.last_error}", is_auto=False, is_error=True )
         else:
-            msg = "La tarea de scraping ha finalizado exitosamente."
-            self._show_task_completion_notification( "Proceso Completado", msg, is_auto=False, is_error=False )
+            resumen, detalle = self._tomar_reporte_etl()
+            msg = "La tarea de scraping ha finalizado exitosamente." + resumen
+            self._show_task_completion_notification( "Proceso Completado", msg, is_auto=False, is_error=False, detail=detalle )
         self.on_load_data_thread()
 
     @Slot()
@@ -141,8 +176,9 @@ class MainSlotsMixin:
             logger.warning(f"Proceso de Actualización de Fichas finalizado con errores: {self.last_error}")
             self._show_task_completion_notification( "Error de Actualización", f"La actualización falló: {self.last_error}", is_auto=is_auto, is_error=True )
         else:
-            msg = "Se han actualizado las fichas seleccionadas."
-            self._show_task_completion_notification( "Actualización Completada", msg, is_auto=is_auto, is_error=False )
+            resumen, detalle = self._tomar_reporte_etl()
+            msg = "Se han actualizado las fichas seleccionadas." + resumen
+            self._show_task_completion_notification( "Actualización Completada", msg, is_auto=is_auto, is_error=False, detail=detalle )
         self.on_load_data_thread()
         
     @Slot()
@@ -184,15 +220,15 @@ class MainSlotsMixin:
         logger.info(f"Recibida configuración de scraping: {config}")
         task_to_run = None
         if config["mode"] == "to_db":
-            task_to_run = self.etl_service.run_etl_live_to_db
+            task_to_run = "run_etl_live_to_db"
         elif config["mode"] == "to_json":
-            task_to_run = self.etl_service.run_etl_live_to_db 
+            task_to_run = "run_etl_live_to_db" 
             
         if task_to_run is None:
             return
         
-        self.start_task(
-            task=task_to_run,
+        self.start_process_task(
+            task_to_run,
             on_result=lambda: logger.info("Proceso ETL completo OK"),
             on_error=self.on_task_error,
             on_finished=self.on_scraping_completed,
@@ -305,8 +341,8 @@ class MainSlotsMixin:
                 return
         logger.info("Iniciando actualización de Fichas Fase 2 (con hilo)...")
         
-        self.start_task(
-            task=self.etl_service.run_fase2_update,
+        self.start_process_task(
+            "run_fase2_update",
             on_result=lambda: logger.info("Actualización de Fichas completada OK"),
             on_error=self.on_task_error,
             on_finished=self.on_fase2_update_finished,
@@ -325,8 +361,8 @@ class MainSlotsMixin:
         config = { "mode": "to_db", "date_from": yesterday, "date_to": today, "max_paginas": 100 }
         logger.info("PILOTO AUTOMÁTICO (Fase 1): Iniciando tarea...")
         
-        self.start_task(
-            task=self.etl_service.run_etl_live_to_db,
+        self.start_process_task(
+            "run_etl_live_to_db",
             on_result=lambda: logger.info("PILOTO AUTOMÁTICO (Fase 1): Proceso ETL completo OK"),
             on_error=self.on_task_error,
             on_finished=self.on_auto_task_finished, 
@@ -343,8 +379,8 @@ class MainSlotsMixin:
             return
         logger.info("PILOTO AUTOMÁTICO (Fase 2): Iniciando tarea...")
         
-        self.start_task(
-            task=self.etl_service.run_fase2_update,
+        self.start_process_task(
+            "run_fase2_update",
             on_result=lambda: logger.info("PILOTO AUTOMÁTICO (Fase 2): Actualización de Fichas OK"),
             on_error=self.on_task_error,
             on_finished=self.on_auto_task_finished,
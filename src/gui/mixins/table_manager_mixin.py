@@ -3,6 +3,8 @@ from PySide6.QtGui import QStandardItem, QBrush, QColor
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QTableView, QHeaderView, QAbstractItemView
 
+from src.utils.perfilado import perfilado
+
 # Definición global de encabezados
 COLUMN_HEADERS = [
     "Score", 
@@ -53,8 +55,10 @@ class TableManagerMixin:
         
         return table
 
-    def poblar_tabla(self, model, data_list):
-        model.removeRows(0, model.rowCount())
+    @perfilado("poblar_tabla")
+    def poblar_tabla(self, model, data_list, agregar: bool = False):
+        """Reemplaza las filas del modelo ('agregar=True' las suma al final: páginas de Candidatas)."""
+        if not agregar: model.removeRows(0, model.rowCount())
         
         for data in data_list:
             # 1. Score
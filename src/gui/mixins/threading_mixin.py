@@ -4,7 +4,9 @@ Mixin para la gestión de hilos (Threading).
 CORRECCIÓN CRÍTICA: setAutoDelete(False) evita el error 'Signal source has been deleted'.
 """
 from PySide6.QtCore import Slot
+from qfluentwidgets import InfoBar
 from src.gui.gui_worker import Worker
+from src.logic.etl_proceso import ProcesoEtl
 from src.utils.logger import configurar_logger
 
 logger = configurar_logger(__name__)
@@ -74,6 +76,52 @@ class ThreadingMixin:
             logger.critical(f"Error al iniciar Worker: {e}")
             raise e
 
+    def start_background_task(self, task, on_result=None, task_args=(), task_kwargs=None):
+        """
+        Ejecuta una tarea liviana en segundo plano SIN bloquear la UI
+        (no toca 'set_ui_busy' ni la barra de progreso). Los errores solo se registran.
+        """
+        worker = Worker(task, False, False, *task_args, **(task_kwargs or {}))
+        worker.setAutoDelete(False)
+        if on_result:
+            worker.signals.result.connect(on_result)
+        worker.signals.error.connect(lambda e: logger.error(f"Error en tarea de fondo: {e}"))
+        worker.signals.finished.connect(lambda: self._cleanup_worker(worker))
+        self.thread_pool.start(worker)
+        self.running_workers.append(worker)
+
+    def start_process_task(self, metodo, on_result=None, on_error=None, on_finished=None,
+                           on_progress=None, on_progress_percent=None, task_kwargs=None):
+        """
+        Como 'start_task', pero el método de EtlService corre en un proceso hijo
+        (ver ProcesoEtl). El trabajo queda en 'self.proceso_etl' para poder cancelarlo.
+        Todas las tareas de proceso son extracciones web: comparten el recurso 'web' con
+        el planificador, así que no arrancan si hay una programada en curso. Devuelve
+        False si no se pudo iniciar.
+        """
+        planificador = getattr(self, 'planificador', None)
+        if getattr(self, 'proceso_etl', None) is not None or (planificador and not planificador.reservar("web")):
+            logger.warning("Ya hay una extracción web en curso; no se inicia otra.")
+            InfoBar.warning("Ocupado", "Ya hay una extracción web en curso (manual o programada).", parent=self)
+            return False
+        proceso = ProcesoEtl(metodo, **(task_kwargs or {}))
+        self.proceso_etl = proceso
+        self.last_error = None
+
+        def al_terminar():
+            if planificador: planificador.liberar("web")
+            if getattr(self, 'proceso_etl', None) is proceso: self.proceso_etl = None
+            self.ultimo_reporte_etl = proceso.reporte
+            # El hijo escribió en la BD por su cuenta: la caché de detalles de este proceso quedó vieja
+            if hasattr(self, 'db_service'): self.db_service.invalidar_detalle()
+            if on_finished: on_finished()
+
+        # El avance del hijo siempre se reenvía (por defecto a la barra de progreso)
+        self.start_task(task=proceso.ejecutar, on_result=on_result, on_error=on_error, on_finished=al_terminar,
+                        on_progress=on_progress or self.on_progress_update,
+                        on_progress_percent=on_progress_percent or self.on_progress_percent_update)
+        return True
+
     def _cleanup_worker(self, worker):
         if worker in self.running_workers:
             self.running_workers.remove(worker)
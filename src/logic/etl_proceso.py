@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+ETL en un proceso aparte.
+
+El scraping (Playwright), el parseo de JSON y las escrituras a la BD corren en un
+proceso hijo ('spawn'), así no compiten por el GIL con Qt y un navegador colgado
+se puede matar sin tumbar la GUI.
+
+Protocolo (cola hijo -> padre), tuplas (tipo, valor):
+    ("progreso", str)     texto de avance
+    ("porcentaje", int)   avance 0-100
+    ("reporte", dict)     tiempos por etapa de la ejecución (ver src/utils/tracing.py), sin los spans
+    ("resultado", obj)    lo que devuelve el método de EtlService
+    ("error", Exception)
+La cancelación va del padre al hijo con un Event que el hijo revisa en cada avance;
+si no termina dentro de PLAZO_CANCELACION_S se le aplica terminate() y luego kill().
+El hijo escribe su log en ARCHIVO_LOG_HIJO (data/logs), con los niveles por módulo del padre.
+"""
+
+import multiprocessing
+import pickle
+import queue
+import time
+from typing import Callable, Optional
+
+from src.utils import perfilado
+from src.utils.exceptions import EtlCanceladoError
+from src.utils.logger import configurar_logger, configurar_niveles, niveles, usar_archivo
+
+logger = configurar_logger(__name__)
+
+# Métodos de EtlService que se ejecutan en el proceso hijo (los que scrapean)
+METODOS_EN_PROCESO = {"run_etl_live_to_db", "run_fase2_update"}
+
+PLAZO_CANCELACION_S = 10
+PLAZO_TERMINAR_S = 3
+INTERVALO_SONDEO_S = 0.2
+ARCHIVO_LOG_HIJO = "etl_proceso.log"  # Cada proceso rota su propio archivo
+
+
+def _proceso_hijo(metodo: str, kwargs: dict, cola, cancelado, perfilado_padre: dict, niveles_padre: dict):
+    """Punto de entrada del proceso hijo: arma sus propios servicios y ejecuta 'metodo'."""
+    usar_archivo(ARCHIVO_LOG_HIJO)
+    configurar_niveles(niveles_padre)
+
+    def revisar_cancelacion():
+        if cancelado.is_set(): raise EtlCanceladoError("Extracción cancelada por el usuario.")
+
+    def emitir_texto(msg: str):
+        revisar_cancelacion(); cola.put(("progreso", msg))
+
+    def emitir_porcentaje(valor: int):
+        revisar_cancelacion(); cola.put(("porcentaje", valor))
+
+    def enviar_reporte():
+        from src.utils.tracing import ultimo_reporte
+        reporte = ultimo_reporte()
+        # El detalle de spans ya quedó en el JSON del hijo; al padre le basta el resumen
+        if reporte: cola.put(("reporte", {k: v for k, v in reporte.items() if k != "spans"}))
+
+    try:
+        from src.logic.servicios import crear_etl_service
+        # El hijo ('spawn') no hereda el estado del padre: el perfilado se activa igual que allá
+        perfilado.configurar(perfilado_padre["activo"], perfilado_padre["modo"])
+        etl = crear_etl_service()
+        with perfilado.perfilar(f"etl_{metodo}"):
+            resultado = getattr(etl, metodo)(progress_callback_text=emitir_texto, progress_callback_percent=emitir_porcentaje, **kwargs)
+        enviar_reporte()
+        cola.put(("resultado", resultado))
+    except BaseException as e:
+        # La cola serializa en otro hilo: un error no serializable se perdería en silencio
+        try: pickle.dumps(e)
+        except Exception: e = RuntimeError(f"{type(e).__name__}: {e}")
+        enviar_reporte()
+        cola.put(("error", e))
+
+
+class ProcesoEtl:
+    """
+    Un trabajo de EtlService ejecutado en un proceso hijo.
+    'ejecutar' bloquea hasta el final (se lanza desde un Worker, que reenvía el avance
+    a sus señales); 'cancelar' se puede llamar desde la GUI en cualquier momento.
+    """
+    def __init__(self, metodo: str, **kwargs):
+        if metodo not in METODOS_EN_PROCESO:
+            raise ValueError(f"Método de ETL no permitido en proceso: {metodo}")
+        self.metodo, self.kwargs = metodo, kwargs
+        self._ctx = multiprocessing.get_context("spawn")
+        self._cancelado = self._ctx.Event()
+        self._proceso = None
+        self.reporte = None  # resumen de tiempos que envía el hijo al terminar
+
+    @property
+    def en_curso(self) -> bool:
+        return self._proceso is not None and self._proceso.is_alive()
+
+    def cancelar(self):
+        if self._cancelado.is_set(): return
+        logger.info(f"Cancelación solicitada para '{self.metodo}'.")
+        self._cancelado.set()
+
+    @perfilado.sin_perfilado  # Solo espera al hijo, que se perfila por su cuenta
+    def ejecutar(self, progress_callback_text: Optional[Callable[[str], None]] = None,
+                 progress_callback_percent: Optional[Callable[[int], None]] = None):
+        cola = self._ctx.Queue()
+        self._proceso = self._ctx.Process(target=_proceso_hijo, args=(self.metodo, self.kwargs, cola, self._cancelado, perfilado.estado(), niveles()),
+                                          name=f"etl-{self.metodo}", daemon=True)
+        self._proceso.start()
+        logger.info(f"ETL '{self.metodo}' en proceso hijo (pid {self._proceso.pid}).")
+        try:
+            return self._atender(cola, progress_callback_text, progress_callback_percent)
+        finally:
+            if self._proceso.is_alive():
+                self._proceso.join(PLAZO_TERMINAR_S)
+                self._detener()
+            cola.close()
+
+    def _atender(self, cola, emitir_texto, emitir_porcentaje):
+        inicio_cancelacion = None
+        while True:
+            if self._cancelado.is_set():
+                inicio_cancelacion = inicio_cancelacion or time.monotonic()
+                if time.monotonic() - inicio_cancelacion > PLAZO_CANCELACION_S:
+                    logger.warning(f"El proceso de '{self.metodo}' no respondió a la cancelación; se detiene.")
+                    self._detener()
+                    raise EtlCanceladoError("Extracción cancelada por el usuario (proceso detenido).")
+            try:
+                tipo, valor = cola.get(timeout=INTERVALO_SONDEO_S)
+            except queue.Empty:
+                # Si el hijo ya terminó, un último sondeo recoge lo que haya quedado en tránsito
+                if self._proceso.is_alive(): continue
+                try: tipo, valor = cola.get(timeout=INTERVALO_SONDEO_S)
+                except queue.Empty:
+                    if self._cancelado.is_set(): raise EtlCanceladoError("Extracción cancelada por el usuario.")
+                    raise RuntimeError(f"El proceso de extracción terminó inesperadamente (código {self._proceso.exitcode}).")
+
+            if tipo == "progreso":
+                if emitir_texto: emitir_texto(valor)
+            elif tipo == "porcentaje":
+                if emitir_porcentaje: emitir_porcentaje(valor)
+            elif tipo == "reporte":
+                self.reporte = valor
+            elif tipo == "resultado":
+                return valor
+            elif tipo == "error":
+                if self._cancelado.is_set(): raise EtlCanceladoError("Extracción cancelada por el usuario.") from valor
+                raise valor
+
+    def _detener(self):
+        if not self._proceso.is_alive(): return
+        self._proceso.terminate(); self._proceso.join(PLAZO_TERMINAR_S)
+        if self._proceso.is_alive():
+            self._proceso.kill(); self._proceso.join()
@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import time
 from datetime import datetime
 from pathlib import Path
 from typing import TYPE_CHECKING, Optional, List
@@ -11,9 +10,12 @@ if TYPE_CHECKING:
 
 from config.config import MODO_HEADLESS, HEADERS_API
 from src.utils.logger import configurar_logger
+from src.utils.tracing import span, anotar, con_reporte
 from src.scraper.url_builder import construir_url_api_ficha
+from src.scraper.api_handler import mapear_ficha
+from src.scraper.scraper_service import FICHA_SIN_CAMBIOS
 from src.utils.exceptions import (
-    ScrapingFase1Error, DatabaseLoadError, DatabaseTransformError,
+    EtlError, ScrapingFase1Error, DatabaseLoadError, DatabaseTransformError,
     ScrapingFase2Error, RecalculoError
 )
 
@@ -36,7 +38,8 @@ class EtlService:
     def _transform_puntajes_fase_1(self, progress_callback_text=None, progress_callback_percent=None):
         emit_text, emit_percent = self._create_progress_emitters(progress_callback_text, progress_callback_percent)
         try:
-            licitaciones_dicts = self.db_service.obtener_todas_candidatas_fase_1_para_recalculo()
+            with span("lectura"):
+                licitaciones_dicts = self.db_service.obtener_todas_candidatas_fase_1_para_recalculo()
             if not licitaciones_dicts: return
             
             total = len(licitaciones_dicts)
@@ -74,11 +77,13 @@ class EtlService:
                 if i % 100 == 0:
                     emit_percent(int(((i+1)/total)*100))
             
-            self.db_service.actualizar_puntajes_fase_1_en_lote(lista_actualizaciones)
+            with span("escritura"):
+                self.db_service.actualizar_puntajes_fase_1_en_lote(lista_actualizaciones)
             
         except Exception as e:
             raise DatabaseTransformError(f"Error cálculo puntajes: {e}") from e
 
+    @con_reporte("etl_live")
     def run_etl_live_to_db(self, progress_callback_text=None, progress_callback_percent=None, config=None):
         emit_text, emit_percent = self._create_progress_emitters(progress_callback_text, progress_callback_percent)
         date_from, date_to, max_paginas = config["date_from"], config["date_to"], config["max_paginas"]
@@ -86,12 +91,16 @@ class EtlService:
         emit_text("Iniciando Fase 1 (Buscando token)...")
         emit_percent(5)
         
+        self._reiniciar_limitador()
         try:
             filtros = {'date_from': date_from.strftime('%Y-%m-%d'), 'date_to': date_to.strftime('%Y-%m-%d')}
-            datos = self.scraper_service.run_scraper_listado(emit_text, filtros, max_paginas)
+            with span("listado"):
+                datos = self.scraper_service.run_scraper_listado(emit_text, filtros, max_paginas)
         except Exception as e:
             raise ScrapingFase1Error(f"Fallo scraping listado: {e}") from e
 
+        anotar(compras_listado=len(datos or []))
+        self._anotar_limitador()
         if not datos:
             emit_text("No se encontraron datos."); emit_percent(100); return [] # Retorna lista vacía
 
@@ -99,20 +108,26 @@ class EtlService:
         
         # --- CAMBIO: Capturar nuevos organismos ---
         nuevos_organismos = []
-        try:
-            nuevos_organismos = self.db_service.insertar_o_actualizar_licitaciones_raw(datos)
-        except Exception as e:
-            raise DatabaseLoadError(f"Fallo guardado BD: {e}") from e
-        # ------------------------------------------
-            
-        emit_percent(30); self._transform_puntajes_fase_1(emit_text, emit_percent)
+        # Carga y puntajes en una sola transacción: si el cálculo falla no quedan CAs sin puntuar
+        with self.db_service.unidad_de_trabajo():
+            try:
+                with span("carga", n=len(datos)):
+                    nuevos_organismos = self.db_service.insertar_o_actualizar_licitaciones_raw(datos)
+            except Exception as e:
+                raise DatabaseLoadError(f"Fallo guardado BD: {e}") from e
+            # ------------------------------------------
+
+            emit_percent(30)
+            with span("puntajes"): self._transform_puntajes_fase_1(emit_text, emit_percent)
         
         # ... (Fase 2 automática igual que antes) ...
         try:
-            candidatas = self.db_service.obtener_candidatas_para_fase_2(umbral_minimo=10)
-            if candidatas:
-                emit_text(f"Iniciando Fase 2 para {len(candidatas)} CAs Top...")
-                self._procesar_lista_fase_2(candidatas, emit_text, emit_percent)
+            with span("fase2"):
+                with span("candidatas"):
+                    candidatas = self.db_service.obtener_candidatas_para_fase_2(umbral_minimo=10)
+                if candidatas:
+                    emit_text(f"Iniciando Fase 2 para {len(candidatas)} CAs Top...")
+                    self._procesar_lista_fase_2(candidatas, emit_text, emit_percent)
         except Exception as e:
             logger.error(f"Error en Fase 2 automática: {e}") 
             
@@ -121,18 +136,41 @@ class EtlService:
         # --- RETORNO: Devolvemos la lista para la GUI ---
         return nuevos_organismos
 
+    @con_reporte("importacion_json")
+    def run_importacion_json(self, progress_callback_text=None, progress_callback_percent=None, datos: List[dict] = None):
+        """Carga compras ya descargadas (JSON de Fase 1) y calcula sus puntajes, sin scrapear."""
+        emit_text, emit_percent = self._create_progress_emitters(progress_callback_text, progress_callback_percent)
+        if not datos:
+            emit_text("No hay registros para importar."); emit_percent(100); return []
+
+        emit_text(f"Guardando {len(datos)} registros...")
+        with self.db_service.unidad_de_trabajo():
+            try:
+                with span("carga", n=len(datos)):
+                    nuevos_organismos = self.db_service.insertar_o_actualizar_licitaciones_raw(datos)
+            except Exception as e:
+                raise DatabaseLoadError(f"Fallo guardado BD: {e}") from e
+
+            emit_percent(30)
+            with span("puntajes"): self._transform_puntajes_fase_1(emit_text, emit_percent)
+        emit_text("Importación completa."); emit_percent(100)
+        return nuevos_organismos or []
+
+    @con_reporte("recalculo")
     def run_recalculo_total_fase_1(self, progress_callback_text=None, progress_callback_percent=None):
         emit_text, emit_percent = self._create_progress_emitters(progress_callback_text, progress_callback_percent)
         try:
             emit_text("Recargando reglas...")
-            self.score_engine.recargar_reglas()
-            self._transform_puntajes_fase_1(emit_text, emit_percent)
+            with span("reglas"): self.score_engine.recargar_reglas()
+            with span("puntajes"): self._transform_puntajes_fase_1(emit_text, emit_percent)
             emit_percent(100)
         except Exception as e:
             raise RecalculoError(f"Fallo recalculo: {e}") from e
 
+    @con_reporte("fase2_update")
     def run_fase2_update(self, progress_callback_text=None, progress_callback_percent=None, scopes: List[str] = None):
         emit_text, emit_percent = self._create_progress_emitters(progress_callback_text, progress_callback_percent)
+        self._reiniciar_limitador()
         
         try:
             # VERIFICACIÓN Y REFRESCO DE TOKEN
@@ -147,18 +185,18 @@ class EtlService:
             emit_text("Seleccionando CAs para actualizar...")
             
             lists_to_process = []
-            
-            if not scopes or 'all' in scopes:
-                lists_to_process.append(self.db_service.obtener_datos_tab3_seguimiento())
-                lists_to_process.append(self.db_service.obtener_datos_tab4_ofertadas())
-                lists_to_process.append(self.db_service.obtener_candidatas_top_para_actualizar(umbral_minimo=10))
-            else:
-                if 'seguimiento' in scopes:
+            with span("candidatas"):
+                if not scopes or 'all' in scopes:
                     lists_to_process.append(self.db_service.obtener_datos_tab3_seguimiento())
-                if 'ofertadas' in scopes:
                     lists_to_process.append(self.db_service.obtener_datos_tab4_ofertadas())
-                if 'candidatas' in scopes:
                     lists_to_process.append(self.db_service.obtener_candidatas_top_para_actualizar(umbral_minimo=10))
+                else:
+                    if 'seguimiento' in scopes:
+                        lists_to_process.append(self.db_service.obtener_datos_tab3_seguimiento())
+                    if 'ofertadas' in scopes:
+                        lists_to_process.append(self.db_service.obtener_datos_tab4_ofertadas())
+                    if 'candidatas' in scopes:
+                        lists_to_process.append(self.db_service.obtener_candidatas_top_para_actualizar(umbral_minimo=10))
             
             mapa = {}
             for lst in lists_to_process:
@@ -179,34 +217,115 @@ class EtlService:
 
     def _procesar_lista_fase_2(self, lista_cas, emit_text, emit_percent):
         total = len(lista_cas)
-        self.score_engine.recargar_reglas()
+        with span("reglas"): self.score_engine.recargar_reglas()
+        anotar(fichas_solicitadas=total)
+        sin_cambios = 0
 
         for i, lic in enumerate(lista_cas):
             percent = int(((i+1)/total)*90)
             emit_percent(percent)
             emit_text(f"Actualizando: {lic.codigo_ca}")
             
-            datos = self.scraper_service.scrape_ficha_detalle_api(None, lic.codigo_ca, emit_text)
+            with span("ficha"):
+                # Petición condicional solo si la BD ya tiene la ficha (si no, hay que escribirla igual)
+                datos, validadores = self.scraper_service.scrape_ficha_detalle_api(None, lic.codigo_ca, emit_text, condicional=lic.descripcion is not None)
             
-            if datos:
+            if datos is FICHA_SIN_CAMBIOS:
+                sin_cambios += 1
+            elif datos:
                 item_f1 = {
                     'nombre': lic.nombre, 
                     'estado_ca_texto': lic.estado_ca_texto, 
                     'organismo_comprador': lic.organismo.nombre if lic.organismo else ""
                 }
-                pts1, det1 = self.score_engine.calcular_puntuacion_fase_1(item_f1)
-                pts2, det2 = self.score_engine.calcular_puntuacion_fase_2(datos)
-                total_score = pts1 + pts2
-                full_detail = det1 + det2
-                self.db_service.actualizar_ca_con_fase_2(lic.codigo_ca, datos, total_score, full_detail)
+                self._guardar_ficha(lic.codigo_ca, item_f1, datos)
+                # Recién con la ficha en la BD: si el proceso muere antes, la próxima descarga es completa
+                self.scraper_service.confirmar_ficha(lic.codigo_ca, validadores)
             else:
                 logger.warning(f"No se pudo descargar ficha para {lic.codigo_ca}")
             
-            time.sleep(0.5)
+        anotar(fichas_sin_cambios=sin_cambios)
+        self._anotar_limitador()
+        if sin_cambios: logger.info(f"Fase 2: {sin_cambios} de {total} fichas sin cambios (no se reescribieron).")
+
+    def _reiniciar_limitador(self):
+        limitador = getattr(self.scraper_service, "limitador", None)
+        if limitador: limitador.reiniciar_estadisticas()
+
+    def _anotar_limitador(self):
+        """Tasa actual y bajadas del limitador de la API en el reporte de la ejecución."""
+        limitador = getattr(self.scraper_service, "limitador", None)
+        if limitador: anotar(limitador=limitador.estadisticas())
+
+    def _guardar_ficha(self, codigo_ca: str, item_f1: dict, datos: dict):
+        pts1, det1 = self.score_engine.calcular_puntuacion_fase_1(item_f1)
+        pts2, det2 = self.score_engine.calcular_puntuacion_fase_2(datos)
+        total_score = pts1 + pts2
+        full_detail = det1 + det2
+        with span("escritura"):
+            self.db_service.actualizar_ca_con_fase_2(codigo_ca, datos, total_score, full_detail)
+
+    @con_reporte("replay")
+    def run_replay_payloads(self, progress_callback_text=None, progress_callback_percent=None,
+                            desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                            listado: bool = True, fichas: bool = True) -> dict:
+        """
+        Vuelve a cargar y puntuar desde el almacén local de payloads, sin llamar a la API:
+        la última versión de cada compra del listado y de cada ficha obtenida en [desde, hasta).
+        Sirve para rellenar un campo nuevo del mapeo (p. ej. plazo_entrega) a velocidad de disco.
+        """
+        emit_text, emit_percent = self._create_progress_emitters(progress_callback_text, progress_callback_percent)
+        almacen = self.scraper_service.almacen
+        if almacen is None:
+            raise EtlError("El almacén de payloads está deshabilitado (PAYLOADS_HABILITADO).")
+        rango = (desde.timestamp() if desde else None, hasta.timestamp() if hasta else None)
+        resumen = {"listado": 0, "fichas": 0, "fichas_sin_ca": 0}
+
+        if listado:
+            with span("lectura_listado"):
+                compras = [payload for _codigo, _fecha, payload in almacen.iterar("listado", *rango)]
+            anotar(compras_replay=len(compras))
+            if compras:
+                emit_text(f"Reprocesando {len(compras)} compras del listado...")
+                with self.db_service.unidad_de_trabajo():
+                    try:
+                        with span("carga", n=len(compras)):
+                            self.db_service.insertar_o_actualizar_licitaciones_raw(compras)
+                    except Exception as e:
+                        raise DatabaseLoadError(f"Fallo guardado BD: {e}") from e
+                    with span("puntajes"): self._transform_puntajes_fase_1(emit_text, emit_percent)
+                resumen["listado"] = len(compras)
+
+        if fichas:
+            with span("lectura_fichas"):
+                guardadas = list(almacen.iterar("ficha", *rango))
+                por_codigo = {d["codigo_ca"]: d for d in self.db_service.obtener_todas_candidatas_fase_1_para_recalculo()}
+            anotar(fichas_replay=len(guardadas))
+            emit_text(f"Reprocesando {len(guardadas)} fichas guardadas...")
+            with span("reglas"): self.score_engine.recargar_reglas()
+            try:
+                with self.db_service.unidad_de_trabajo():
+                    for i, (codigo, _fecha, respuesta) in enumerate(guardadas):
+                        lic, datos = por_codigo.get(codigo), mapear_ficha(respuesta)
+                        if not lic or not datos:
+                            resumen["fichas_sin_ca"] += 1; continue
+                        item_f1 = {'nombre': lic['nombre'], 'estado_ca_texto': lic['estado_ca_texto'], 'organismo_comprador': lic['organismo_nombre']}
+                        self._guardar_ficha(codigo, item_f1, datos)
+                        resumen["fichas"] += 1
+                        if i % 100 == 0: emit_percent(int(((i + 1) / len(guardadas)) * 100))
+            except Exception as e:
+                raise ScrapingFase2Error(f"Fallo reproceso de fichas: {e}") from e
+
+        emit_text(f"Reproceso completo: {resumen['listado']} compras, {resumen['fichas']} fichas."); emit_percent(100)
+        return resumen
 
     def run_health_check(self, progress_callback_text=None, progress_callback_percent=None):
         return True
 
     def run_limpieza_automatica(self):
         try: self.db_service.limpiar_registros_antiguos()
-        except: pass
\ No newline at end of file
+        except: pass
+        try:
+            almacen = self.scraper_service.almacen
+            if almacen is not None: almacen.purgar()
+        except Exception as e: logger.warning(f"No se pudo purgar el almacén de payloads: {e}")
\ No newline at end of file
@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
 import os
-from datetime import datetime
+import json
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import TYPE_CHECKING, Dict, List
+from pickle import PicklingError
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 
 import pandas as pd
+from openpyxl import Workbook
+from sqlalchemy import select, func, text
 
 from src.db.session import SessionLocal
 from src.db.db_models import (
@@ -15,22 +22,64 @@ from src.db.db_models import (
 if TYPE_CHECKING:
     from src.db.db_service import DbService
 
-from src.utils.logger import configurar_logger
+from src.logic.export_writers import guardar_dataframes, crear_salida_tabla
+from src.utils.logger import configurar_logger, usar_archivo
 
 logger = configurar_logger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 
+# Filas por lote al leer la BD completa (cursor del lado del servidor)
+TAMANO_LOTE_EXPORT = 5000
+
+# Exportación en lote: lecturas de BD en hilos; la escritura de reportes grandes
+# va a un pool de procesos (con menos filas, lanzar procesos cuesta más que escribir).
+MAX_HILOS_EXPORT = 4
+MIN_FILAS_EXPORT_EN_PROCESO = 20000
+# Columna de DbService.obtener_datos_exportacion_tab -> encabezado del reporte (en orden)
+COLUMNAS_REPORTE_PESTAÑAS = {
+    "puntuacion_final": "Score", "codigo_ca": "Código CA", "nombre": "Nombre", "descripcion": "Descripcion",
+    "organismo_nombre": "Organismo", "direccion_entrega": "Dirección Entrega", "estado_ca_texto": "Estado",
+    "fecha_publicacion": "Fecha Publicación", "fecha_cierre": "Fecha Cierre",
+    "fecha_cierre_segundo_llamado": "Fecha Cierre 2do Llamado", "productos_solicitados": "Productos",
+    "proveedores_cotizando": "Proveedores", "es_favorito": "Favorito", "es_ofertada": "Ofertada",
+}
+TIPOS_REPORTE_PESTAÑAS = {
+    "Score": "Int64", "Proveedores": "Int64", "Favorito": "boolean", "Ofertada": "boolean",
+    "Código CA": "string", "Nombre": "string", "Descripcion": "string", "Organismo": "string",
+    "Dirección Entrega": "string", "Estado": "string", "Productos": "string",
+}
+PREFIJOS_REPORTE = {"tabs": "Reporte_Pestañas", "config": "Configuracion_Reglas", "bd_full": "BD_Completa", "bd_delta": "BD_Delta"}
+TABLAS_EXPORT = [CaLicitacion, CaSeguimiento, CaOrganismo, CaSector, CaKeyword, CaOrganismoRegla]
+
+# Exportación incremental: marcas por tabla (en base_path/export) y margen de
+# solapamiento para no perder filas confirmadas tarde con una fecha anterior.
+ARCHIVO_MARCAS_DELTA = "marcas_delta.json"
+MARGEN_DELTA = timedelta(minutes=5)
+
+
+def _iniciar_trabajador_export(contador):
+    """Cada trabajador del pool escribe su log en 'exportacion_<n>.log' (n = 0..trabajadores-1)."""
+    with contador.get_lock():
+        numero, contador.value = contador.value, contador.value + 1
+    usar_archivo(f"exportacion_{numero}.log")
+
 
 class ExcelService:
     def __init__(self, db_service: "DbService"):
         self.db_service = db_service
         logger.info("ExcelService inicializado.")
 
-    def ejecutar_exportacion_lote(self, lista_tareas: List[Dict], base_path: str) -> List[str]:
+    def ejecutar_exportacion_lote(self, lista_tareas: List[Dict], base_path: str,
+                                  progress_callback_text: Optional[Callable[[str], None]] = None,
+                                  progress_callback_percent: Optional[Callable[[int], None]] = None) -> List[str]:
         """
         Ejecuta múltiples exportaciones dentro de una carpeta organizada por fecha.
         Estructura: base_path/export/YYYYMMDD_HHMMSS/archivos...
+
+        Las tareas se agrupan por tipo para leer la BD una sola vez por tipo; las
+        lecturas corren en paralelo (hilos) y cada formato se escribe en cuanto su
+        lectura termina, en un pool de procesos si el volumen lo justifica.
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -42,88 +91,144 @@ class ExcelService:
         except Exception as e:
             return [f"ERROR CRÍTICO: No se pudo crear carpeta en {base_path}: {e}"]
 
-        resultados = []
+        # 2. Agrupar por tipo (conservando el orden de la lista para el resumen)
+        formatos_por_tipo: Dict[str, List[str]] = {}
+        opciones_por_tipo: Dict[str, Dict] = {}
         for tarea in lista_tareas:
-            tipo = tarea["tipo"]
-            formato = tarea["format"]
-            
-            try:
-                ruta = ""
-                if tipo == "tabs":
-                    ruta = self.generar_reporte_pestañas(tarea, session_folder)
-                elif tipo == "config":
-                    ruta = self.generar_reporte_configuracion(formato, session_folder)
-                elif tipo == "bd_full":
-                    ruta = self.generar_reporte_bd_completa(formato, session_folder)
-                
-                if ruta:
-                    resultados.append(f"[{tipo.upper()} - {formato.upper()}] -> {ruta}")
+            formatos = formatos_por_tipo.setdefault(tarea["tipo"], [])
+            if tarea["format"] not in formatos: formatos.append(tarea["format"])
+            opciones_por_tipo.setdefault(tarea["tipo"], tarea)
+
+        salidas: Dict[tuple, str] = {}
+        total = sum(len(f) for f in formatos_por_tipo.values()) or 1
+
+        def registrar(tipo: str, formato: str, texto: str):
+            salidas[(tipo, formato)] = texto
+            if progress_callback_text: progress_callback_text(f"Exportación {tipo} ({formato}): {'error' if texto.startswith('ERROR') else 'lista'}")
+            if progress_callback_percent: progress_callback_percent(int(len(salidas) * 100 / total))
+
+        if progress_callback_text: progress_callback_text(f"Exportando {total} archivo(s)...")
+        if progress_callback_percent: progress_callback_percent(0)
+
+        hilos = ThreadPoolExecutor(max_workers=MAX_HILOS_EXPORT, thread_name_prefix="export")
+        procesos = None
+        # futuro -> (etapa, tipo, formatos que cubre, DataFrames leídos si es una escritura)
+        pendientes = {}
+
+        def escribir_en_hilo(tipo, formato, dfs):
+            futuro = hilos.submit(guardar_dataframes, dfs, formato, PREFIJOS_REPORTE[tipo], session_folder)
+            pendientes[futuro] = ("escritura", tipo, [formato], dfs)
+
+        try:
+            for tipo, formatos in formatos_por_tipo.items():
+                if tipo == "bd_full":
+                    # Se lee en streaming y se escribe en todos los formatos en una pasada
+                    pendientes[hilos.submit(self.generar_reporte_bd_completa, formatos, session_folder)] = ("bd_full", tipo, formatos, None)
+                elif tipo == "bd_delta":
+                    pendientes[hilos.submit(self.generar_reporte_bd_delta, formatos, session_folder, base_path)] = ("bd_full", tipo, formatos, None)
+                elif tipo in ("tabs", "config"):
+                    pendientes[hilos.submit(self._leer_datos_reporte, tipo, opciones_por_tipo[tipo])] = ("lectura", tipo, formatos, None)
                 else:
-                    resultados.append(f"ERROR [{tipo.upper()}] -> Ruta vacía.")
+                    for formato in formatos: registrar(tipo, formato, f"ERROR [{tipo.upper()}] -> Tipo desconocido.")
 
-            except Exception as e:
-                logger.error(f"Error en lote ({tipo}): {e}", exc_info=True)
-                resultados.append(f"ERROR [{tipo.upper()}] -> {str(e)}")
-        
-        return resultados
-
-    def _convertir_a_dataframe(self, datos_dict: List[Dict]) -> pd.DataFrame:
-        datos = []
-        for item in datos_dict:
-            # Manejo seguro de fechas y zonas horarias
-            f_cierre = item.get("fecha_cierre")
-            f_cierre_2 = item.get("fecha_cierre_segundo_llamado")
-            
-            fecha_cierre_ingenua = f_cierre.replace(tzinfo=None) if f_cierre else None
-            fecha_cierre_2_ingenua = f_cierre_2.replace(tzinfo=None) if f_cierre_2 else None
-
-            datos.append({
-                "Score": item.get("puntuacion_final"),
-                "Código CA": item.get("codigo_ca"),
-                "Nombre": item.get("nombre"),
-                "Descripcion": item.get("descripcion"),
-                "Organismo": item.get("organismo_nombre"),
-                "Dirección Entrega": item.get("direccion_entrega"),
-                "Estado": item.get("estado_ca_texto"),
-                "Fecha Publicación": item.get("fecha_publicacion"),
-                "Fecha Cierre": fecha_cierre_ingenua,
-                "Fecha Cierre 2do Llamado": fecha_cierre_2_ingenua,
-                "Proveedores": item.get("proveedores_cotizando"),
-                "Productos": str(item.get("productos_solicitados")) if item.get("productos_solicitados") else None,
-                "Favorito": item.get("es_favorito"),
-                "Ofertada": item.get("es_ofertada"),
-            })
-        
-        columnas = [
-            "Score", "Código CA", "Nombre", "Descripcion", "Organismo",
-            "Dirección Entrega", "Estado", "Fecha Publicación", "Fecha Cierre",
-            "Fecha Cierre 2do Llamado", "Productos", "Proveedores",
-            "Favorito", "Ofertada"
-        ]
-        if not datos:
-            return pd.DataFrame(columns=columnas)
-        return pd.DataFrame(datos).reindex(columns=columnas)
+            while pendientes:
+                hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    etapa, tipo, formatos, dfs = pendientes.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except (BrokenProcessPool, PicklingError) as e:
+                        # Sin pool de procesos utilizable: se escribe en un hilo
+                        logger.warning(f"Pool de procesos no disponible ({e}); se escribe {tipo} en un hilo.")
+                        escribir_en_hilo(tipo, formatos[0], dfs)
+                        continue
+                    except Exception as e:
+                        logger.error(f"Error en lote ({tipo}): {e}", exc_info=True)
+                        for formato in formatos: registrar(tipo, formato, f"ERROR [{tipo.upper()}] -> {str(e)}")
+                        continue
 
-    def generar_reporte_pestañas(self, options: dict, target_dir: Path) -> str:
-        formato = options.get("format", "excel")
-        dfs_to_export: Dict[str, pd.DataFrame] = {}
+                    if etapa == "lectura":
+                        en_proceso = sum(len(df) for df in resultado.values()) >= MIN_FILAS_EXPORT_EN_PROCESO
+                        if en_proceso and procesos is None: procesos = self._crear_pool_procesos()
+                        for formato in formatos:
+                            if en_proceso and procesos is not None:
+                                try:
+                                    futuro_p = procesos.submit(guardar_dataframes, resultado, formato, PREFIJOS_REPORTE[tipo], session_folder)
+                                    pendientes[futuro_p] = ("escritura", tipo, [formato], resultado)
+                                    continue
+                                except (BrokenProcessPool, RuntimeError) as e:
+                                    logger.warning(f"Pool de procesos no disponible ({e}); se usan hilos.")
+                                    procesos.shutdown(wait=False); procesos = None
+                            escribir_en_hilo(tipo, formato, resultado)
+                    elif etapa == "bd_full":
+                        for formato in formatos: registrar(tipo, formato, self._linea_resultado(tipo, formato, resultado.get(formato)))
+                    else:
+                        registrar(tipo, formatos[0], self._linea_resultado(tipo, formatos[0], resultado))
+        finally:
+            hilos.shutdown(wait=True)
+            if procesos is not None: procesos.shutdown(wait=True)
 
+        return [salidas[(tarea["tipo"], tarea["format"])] for tarea in lista_tareas if (tarea["tipo"], tarea["format"]) in salidas]
+
+    @staticmethod
+    def _linea_resultado(tipo: str, formato: str, ruta: Optional[str]) -> str:
+        if ruta: return f"[{tipo.upper()} - {formato.upper()}] -> {ruta}"
+        return f"ERROR [{tipo.upper()}] -> Ruta vacía."
+
+    @staticmethod
+    def _crear_pool_procesos() -> Optional[ProcessPoolExecutor]:
         try:
-            # Usamos los métodos seguros de DbService que devuelven diccionarios
-            datos_tab1 = self.db_service.obtener_datos_exportacion_tab1()
-            datos_tab3 = self.db_service.obtener_datos_exportacion_tab3()
-            datos_tab4 = self.db_service.obtener_datos_exportacion_tab4()
-            
-            dfs_to_export["Candidatas"] = self._convertir_a_dataframe(datos_tab1)
-            dfs_to_export["Seguimiento"] = self._convertir_a_dataframe(datos_tab3)
-            dfs_to_export["Ofertadas"] = self._convertir_a_dataframe(datos_tab4)
+            # 'spawn' también en Linux: hacer fork de un proceso con hilos de Qt no es seguro
+            contexto = multiprocessing.get_context("spawn")
+            return ProcessPoolExecutor(max_workers=max(1, min(MAX_HILOS_EXPORT, os.cpu_count() or 1)), mp_context=contexto,
+                                       initializer=_iniciar_trabajador_export, initargs=(contexto.Value("i", 0),))
+        except Exception as e:
+            logger.warning(f"No se pudo crear el pool de procesos de exportación: {e}")
+            return None
+
+    def _leer_datos_reporte(self, tipo: str, opciones: Dict) -> Dict[str, pd.DataFrame]:
+        if tipo == "tabs": return self._leer_datos_pestañas()
+        return self._leer_datos_configuracion()
+
+    @staticmethod
+    def _fechas_sin_zona(serie: pd.Series) -> pd.Series:
+        """Quita la zona horaria conservando la hora local guardada (como replace(tzinfo=None))."""
+        try:
+            fechas = pd.to_datetime(serie)
+        except (ValueError, TypeError):
+            # Offsets distintos en la misma columna (cambio de horario): caso por caso
+            fechas = pd.to_datetime(serie.map(lambda v: v.replace(tzinfo=None) if v is not None else None))
+        return fechas.dt.tz_localize(None) if isinstance(fechas.dtype, pd.DatetimeTZDtype) else fechas
+
+    def _convertir_a_dataframe(self, columnas: List[str], filas: List[tuple]) -> pd.DataFrame:
+        df = pd.DataFrame.from_records(filas, columns=columnas)
+        for col in ("fecha_cierre", "fecha_cierre_segundo_llamado"):
+            df[col] = self._fechas_sin_zona(df[col])
+        # Lista vacía o nula -> sin productos
+        productos = df["productos_solicitados"]
+        con_productos = productos.map(bool, na_action="ignore").fillna(False).astype(bool)
+        df["productos_solicitados"] = productos.where(con_productos).map(
+            lambda p: json.dumps(p, ensure_ascii=False, default=str), na_action="ignore")
+
+        df = df.rename(columns=COLUMNAS_REPORTE_PESTAÑAS)[list(COLUMNAS_REPORTE_PESTAÑAS.values())]
+        # Tipos explícitos: Parquet/Arrow conservan columnas tipadas aunque estén vacías
+        return df.astype(TIPOS_REPORTE_PESTAÑAS)
+
+    def _leer_datos_pestañas(self) -> Dict[str, pd.DataFrame]:
+        dfs_to_export: Dict[str, pd.DataFrame] = {}
+        try:
+            for hoja, tab in (("Candidatas", "tab1"), ("Seguimiento", "tab3"), ("Ofertadas", "tab4")):
+                dfs_to_export[hoja] = self._convertir_a_dataframe(*self.db_service.obtener_datos_exportacion_tab(tab))
         except Exception as e:
             logger.error(f"Error obteniendo datos para reporte: {e}")
             raise e
+        return dfs_to_export
 
-        return self._guardar_archivos(dfs_to_export, formato, "Reporte_Pestañas", target_dir)
+    def generar_reporte_pestañas(self, options: dict, target_dir: Path) -> str:
+        formato = options.get("format", "excel")
+        return guardar_dataframes(self._leer_datos_pestañas(), formato, PREFIJOS_REPORTE["tabs"], target_dir)
 
-    def generar_reporte_configuracion(self, formato: str, target_dir: Path) -> str:
+    def _leer_datos_configuracion(self) -> Dict[str, pd.DataFrame]:
         logger.info("Exportando Configuración...")
         dfs_to_export = {}
         with SessionLocal() as session:
@@ -151,59 +256,133 @@ class ExcelService:
                     "Puntos": r.puntos
                 })
             dfs_to_export["Reglas_Organismos"] = pd.DataFrame(data_org)
+        return dfs_to_export
 
-        return self._guardar_archivos(dfs_to_export, formato, "Configuracion_Reglas", target_dir)
+    def generar_reporte_configuracion(self, formato: str, target_dir: Path) -> str:
+        return guardar_dataframes(self._leer_datos_configuracion(), formato, PREFIJOS_REPORTE["config"], target_dir)
+
+    def generar_reporte_bd_completa(self, formato, target_dir: Path):
+        """
+        Exporta todas las tablas sin cargarlas completas en memoria: se leen por
+        lotes con un cursor del lado del servidor y cada lote se escribe de inmediato
+        en cada formato pedido (CSV incremental, libro Excel 'write_only', Parquet/Arrow).
+        'formato' puede ser una lista: se lee la BD una vez y se escribe en todos;
+        en ese caso devuelve {formato: ruta}.
+        """
+        formatos = [formato] if isinstance(formato, str) else list(formato)
+        prefijo = PREFIJOS_REPORTE["bd_full"]
+        ruta_excel = target_dir / f"{prefijo}.xlsx"
+        libro = Workbook(write_only=True) if "excel" in formatos else None
 
-    def generar_reporte_bd_completa(self, formato: str, target_dir: Path) -> str:
-        dfs_to_export = {}
-        # Lista de modelos a exportar
-        tablas = [CaLicitacion, CaSeguimiento, CaOrganismo, CaSector, CaKeyword, CaOrganismoRegla]
-        
         try:
             with SessionLocal() as session:
-                connection = session.connection()
-                for model in tablas:
-                    # Pandas lee SQL directamente
-                    df = pd.read_sql_table(model.__tablename__, con=connection)
-                    
-                    # Limpieza de Zonas Horarias para Excel
-                    for col in df.columns:
-                        if pd.api.types.is_datetime64_any_dtype(df[col]):
-                            try:
-                                df[col] = df[col].dt.tz_localize(None)
-                            except: pass
-                    
-                    dfs_to_export[model.__tablename__] = df
+                connection = session.connection().execution_options(stream_results=True, yield_per=TAMANO_LOTE_EXPORT)
+                for model in TABLAS_EXPORT:
+                    tabla = model.__table__
+                    self._volcar_consulta(connection, select(tabla), tabla.name, list(tabla.columns), formatos, prefijo, target_dir, libro)
+            if libro is not None: libro.save(ruta_excel)
         except Exception as e:
-            logger.error(f"Error leyendo BD completa: {e}", exc_info=True)
+            logger.error(f"Error exportando BD completa: {e}", exc_info=True)
             raise e
-            
-        return self._guardar_archivos(dfs_to_export, formato, "BD_Completa", target_dir)
 
-    def _guardar_archivos(self, dfs: Dict[str, pd.DataFrame], formato: str, prefijo: str, target_dir: Path) -> str:
-        """Guarda los DataFrames en la carpeta indicada (target_dir)."""
-        
-        if formato == "excel":
-            nombre = f"{prefijo}.xlsx"
-            ruta = target_dir / nombre
-            try:
-                with pd.ExcelWriter(ruta, engine="openpyxl") as writer:
-                    for sheet, df in dfs.items():
-                        # Excel limita nombres de hoja a 31 caracteres
-                        safe_sheet = sheet[:30]
-                        df.to_excel(writer, sheet_name=safe_sheet, index=False)
-                return str(ruta)
-            except Exception as e:
-                logger.error(f"Error escribiendo Excel {prefijo}: {e}")
-                raise e
-        else:
-            # CSV: Guardamos múltiples archivos
-            try:
-                for sheet, df in dfs.items():
-                    nombre_csv = f"{prefijo}_{sheet}.csv"
-                    ruta_csv = target_dir / nombre_csv
-                    df.to_csv(ruta_csv, index=False, encoding='utf-8-sig')
-                return str(target_dir) 
-            except Exception as e:
-                logger.error(f"Error escribiendo CSVs {prefijo}: {e}")
-                raise e
\ No newline at end of file
+        rutas = {f: str(ruta_excel) if f == "excel" else str(target_dir) for f in formatos}
+        return rutas[formato] if isinstance(formato, str) else rutas
+
+    def generar_reporte_bd_delta(self, formato, target_dir: Path, base_path: str):
+        """
+        Exportación incremental: de las tablas con 'actualizado_en' solo se escriben
+        las filas cambiadas desde la marca guardada en la exportación anterior
+        (la primera vez, todas), más la lista completa de sus claves para que el
+        consumidor detecte las filas borradas. Las tablas de configuración van completas.
+        Escribe 'manifest.json' en target_dir. Los consumidores deben aplicar las filas
+        por clave primaria (upsert): con el margen de seguridad algunas se repiten.
+        """
+        formatos = [formato] if isinstance(formato, str) else list(formato)
+        prefijo = PREFIJOS_REPORTE["bd_delta"]
+        ruta_excel = target_dir / f"{prefijo}.xlsx"
+        libro = Workbook(write_only=True) if "excel" in formatos else None
+        ruta_marcas = Path(base_path) / "export" / ARCHIVO_MARCAS_DELTA
+        marcas = self._cargar_marcas_delta(ruta_marcas)
+        marcas_nuevas = dict(marcas)
+        manifiesto = {"generado_en": datetime.now().isoformat(timespec="seconds"), "modo": "delta", "formatos": formatos, "tablas": {}}
+
+        try:
+            with SessionLocal() as session:
+                connection = session.connection().execution_options(stream_results=True, yield_per=TAMANO_LOTE_EXPORT)
+                tope = self._inicio_transaccion_abierta_mas_antigua(connection)
+                for model in TABLAS_EXPORT:
+                    tabla = model.__table__
+                    claves = list(tabla.primary_key.columns)
+                    info = {"clave": [c.name for c in claves]}
+                    stmt = select(tabla)
+                    if "actualizado_en" in tabla.c:
+                        col = tabla.c.actualizado_en
+                        # Marca de esta exportación: el último cambio visible antes de leer
+                        hasta = connection.execute(select(func.max(col))).scalar()
+                        # ...pero no más allá de la transacción abierta más antigua: sus filas
+                        # llevarán now() = su inicio y aún no se ven
+                        if hasta and tope: hasta = min(hasta, tope)
+                        desde = marcas.get(tabla.name)
+                        if desde:
+                            stmt = stmt.where(col >= datetime.fromisoformat(desde) - MARGEN_DELTA)
+                        info.update(modo="delta" if desde else "completo", desde=desde, hasta=hasta.isoformat() if hasta else desde)
+                        if info["hasta"]: marcas_nuevas[tabla.name] = info["hasta"]
+                        info["filas_vigentes"] = self._volcar_consulta(connection, select(*claves), f"{tabla.name}_ids", claves, formatos, prefijo, target_dir, libro)
+                    else:
+                        info["modo"] = "completo"
+                    info["filas"] = self._volcar_consulta(connection, stmt.order_by(*claves), tabla.name, list(tabla.columns), formatos, prefijo, target_dir, libro)
+                    manifiesto["tablas"][tabla.name] = info
+            if libro is not None: libro.save(ruta_excel)
+
+            with open(target_dir / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+            # La marca solo avanza si la exportación terminó bien
+            self._guardar_marcas_delta(ruta_marcas, marcas_nuevas)
+        except Exception as e:
+            logger.error(f"Error exportando BD incremental: {e}", exc_info=True)
+            raise e
+
+        logger.info("Exportación incremental: " + ", ".join(f"{t} {i['filas']}" for t, i in manifiesto["tablas"].items()))
+        rutas = {f: str(ruta_excel) if f == "excel" else str(target_dir) for f in formatos}
+        return rutas[formato] if isinstance(formato, str) else rutas
+
+    @staticmethod
+    def _inicio_transaccion_abierta_mas_antigua(connection) -> Optional[datetime]:
+        """
+        PostgreSQL: inicio de la transacción más antigua aún abierta en esta BD (la propia
+        incluida). Las sesiones de otros roles solo se ven con permiso pg_read_all_stats.
+        En SQLite hay un solo escritor y no aplica: None.
+        """
+        if connection.dialect.name != "postgresql": return None
+        return connection.execute(text("SELECT min(xact_start) FROM pg_stat_activity WHERE datname = current_database()")).scalar()
+
+    @staticmethod
+    def _volcar_consulta(connection, stmt, nombre: str, columnas, formatos: List[str], prefijo: str, target_dir: Path, libro) -> int:
+        """Lee 'stmt' por lotes y escribe cada lote en todos los formatos. Devuelve las filas escritas."""
+        salidas, filas = [], 0
+        try:
+            for f in formatos: salidas.append(crear_salida_tabla(f, nombre, columnas, prefijo, target_dir, libro))
+            for lote in connection.execute(stmt).partitions():
+                for salida in salidas: salida.escribir(lote)
+                filas += len(lote)
+        finally:
+            for salida in salidas: salida.cerrar()
+        logger.debug(f"Exportación: {nombre} -> {filas} filas.")
+        return filas
+
+    @staticmethod
+    def _cargar_marcas_delta(ruta: Path) -> Dict[str, str]:
+        try:
+            with open(ruta, "r", encoding="utf-8") as f: return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Marcas de exportación ilegibles en {ruta} ({e}); se exporta todo.")
+            return {}
+
+    @staticmethod
+    def _guardar_marcas_delta(ruta: Path, marcas: Dict[str, str]):
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_suffix(".tmp")
+        with open(temporal, "w", encoding="utf-8") as f: json.dump(marcas, f, indent=2)
+        os.replace(temporal, ruta)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Escritores de archivos de exportación.
+
+- guardar_dataframes: reportes chicos ya armados como DataFrames (pestañas, configuración).
+- Salida*: destinos por tabla que reciben lotes de filas (BD completa en streaming).
+
+pyarrow (Parquet / Arrow IPC) y zstandard (CSV .zst) son opcionales: se importan
+solo al usar esos formatos. pandas y openpyxl también se importan al escribir,
+para que la GUI pueda leer FORMATOS_EXPORT sin cargarlos al arrancar.
+"""
+import csv
+import enum
+import gzip
+import importlib
+import io
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, Float, Integer, JSON, Numeric
+
+from src.utils.exceptions import DependenciaOpcionalError
+from src.utils.logger import configurar_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from openpyxl import Workbook
+
+logger = configurar_logger(__name__)
+
+# Formato -> etiqueta para la GUI
+FORMATOS_EXPORT = {
+    "excel": "Excel (.xlsx)",
+    "csv": "CSV (.csv)",
+    "csv_gz": "CSV comprimido (.csv.gz)",
+    "csv_zst": "CSV comprimido (.csv.zst)",
+    "parquet": "Parquet (.parquet)",
+    "arrow": "Arrow IPC (.arrow)",
+}
+EXTENSIONES = {"csv": ".csv", "csv_gz": ".csv.gz", "csv_zst": ".csv.zst", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Límite de filas por hoja de Excel (incluye el encabezado)
+MAX_FILAS_HOJA_EXCEL = 1_048_576
+
+
+def importar_opcional(modulo: str, formato: str):
+    """Importa una dependencia opcional o explica qué instalar para usar 'formato'."""
+    try:
+        return importlib.import_module(modulo)
+    except ImportError as e:
+        paquete = modulo.split(".")[0]
+        raise DependenciaOpcionalError(f"El formato '{formato}' requiere el paquete '{paquete}' (pip install {paquete}).") from e
+
+
+def _valor_exportable(valor):
+    """Convierte un valor de la BD a algo que CSV/Excel aceptan tal cual."""
+    if isinstance(valor, datetime) and valor.tzinfo is not None:
+        return valor.replace(tzinfo=None)
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False, default=str)
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    return valor
+
+
+def _valor_excel(valor, ilegales):
+    valor = _valor_exportable(valor)
+    # openpyxl rechaza caracteres de control dentro de las celdas
+    return ilegales.sub("", valor) if isinstance(valor, str) else valor
+
+
+def _abrir_texto(ruta: Path, formato: str):
+    """Abre un CSV de texto, comprimido según el formato."""
+    if formato == "csv_gz":
+        return gzip.open(ruta, "wt", encoding="utf-8", newline="")
+    if formato == "csv_zst":
+        zstd = importar_opcional("zstandard", formato)
+        binario = zstd.ZstdCompressor(level=6).stream_writer(open(ruta, "wb"), closefd=True)
+        return io.TextIOWrapper(binario, encoding="utf-8", newline="")
+    # CSV plano con BOM para que Excel lo abra con acentos
+    return open(ruta, "w", newline="", encoding="utf-8-sig")
+
+
+def guardar_dataframes(dfs: Dict[str, "pd.DataFrame"], formato: str, prefijo: str, target_dir: Path) -> str:
+    """
+    Guarda los DataFrames en la carpeta indicada (target_dir).
+    Función de módulo para poder ejecutarse en un proceso del pool de exportación.
+    """
+    if formato == "excel":
+        import pandas as pd
+        nombre = f"{prefijo}.xlsx"
+        ruta = target_dir / nombre
+        try:
+            with pd.ExcelWriter(ruta, engine="openpyxl") as writer:
+                for sheet, df in dfs.items():
+                    # Excel limita nombres de hoja a 31 caracteres
+                    safe_sheet = sheet[:30]
+                    df.to_excel(writer, sheet_name=safe_sheet, index=False)
+            return str(ruta)
+        except Exception as e:
+            logger.error(f"Error escribiendo Excel {prefijo}: {e}")
+            raise e
+
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+    # Un archivo por hoja
+    try:
+        for sheet, df in dfs.items():
+            ruta = target_dir / f"{prefijo}_{sheet}{EXTENSIONES[formato]}"
+            if formato in ("parquet", "arrow"):
+                pa = importar_opcional("pyarrow", formato)
+                tabla = pa.Table.from_pandas(df, preserve_index=False)
+                if formato == "parquet":
+                    importar_opcional("pyarrow.parquet", formato).write_table(tabla, ruta, compression="zstd")
+                else:
+                    with pa.ipc.new_file(ruta, tabla.schema) as writer: writer.write_table(tabla)
+            else:
+                with _abrir_texto(ruta, formato) as f:
+                    df.to_csv(f, index=False)
+        return str(target_dir)
+    except DependenciaOpcionalError:
+        raise
+    except Exception as e:
+        logger.error(f"Error escribiendo {formato} {prefijo}: {e}")
+        raise e
+
+
+# --- Destinos en streaming (BD completa) ---
+
+class SalidaCsv:
+    """CSV (plano o comprimido) que se escribe lote a lote."""
+    def __init__(self, ruta: Path, formato: str, columnas: List[str]):
+        self.ruta = ruta
+        self.filas = 0
+        self._f = _abrir_texto(ruta, formato)
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(columnas)
+
+    def escribir(self, lote):
+        self._writer.writerows([_valor_exportable(v) for v in fila] for fila in lote)
+        self.filas += len(lote)
+
+    def cerrar(self):
+        self._f.close()
+
+
+class SalidaHojasExcel:
+    """
+    Hojas de un libro 'write_only' compartido; si se supera el límite de Excel
+    continúa en 'nombre_2', 'nombre_3'...
+    """
+    def __init__(self, libro: "Workbook", nombre: str, columnas: List[str]):
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        self.libro, self.nombre, self.columnas = libro, nombre, columnas
+        self._ilegales = ILLEGAL_CHARACTERS_RE
+        self.filas = 0
+        self._hoja, self._n_hoja, self._en_hoja = None, 1, MAX_FILAS_HOJA_EXCEL
+
+    def escribir(self, lote):
+        for fila in lote:
+            if self._en_hoja >= MAX_FILAS_HOJA_EXCEL:
+                # Excel limita nombres de hoja a 31 caracteres
+                titulo = self.nombre[:30] if self._n_hoja == 1 else f"{self.nombre[:26]}_{self._n_hoja}"
+                self._hoja = self.libro.create_sheet(title=titulo); self._hoja.append(self.columnas)
+                self._n_hoja += 1; self._en_hoja = 1
+            self._hoja.append([_valor_excel(v, self._ilegales) for v in fila])
+            self._en_hoja += 1; self.filas += 1
+
+    def cerrar(self):
+        if self._hoja is None:
+            self.libro.create_sheet(title=self.nombre[:30]).append(self.columnas)
+
+
+def _tipo_arrow(pa, columna):
+    """Tipo Arrow según el tipo SQLAlchemy de la columna (JSON y Enum van como texto)."""
+    tipo = columna.type
+    if isinstance(tipo, Boolean): return pa.bool_()
+    if isinstance(tipo, Integer): return pa.int64()
+    if isinstance(tipo, (Float, Numeric)): return pa.float64()
+    if isinstance(tipo, DateTime): return pa.timestamp("us", tz="UTC") if tipo.timezone else pa.timestamp("us")
+    if isinstance(tipo, Date): return pa.date32()
+    return pa.string()
+
+
+def _conversor_arrow(columna):
+    tipo = columna.type
+    if isinstance(tipo, JSON):
+        return lambda v: None if v is None else json.dumps(v, ensure_ascii=False, default=str)
+    if isinstance(tipo, Enum):
+        return lambda v: v.value if isinstance(v, enum.Enum) else v
+    if isinstance(tipo, DateTime) and tipo.timezone:
+        # Las fechas con zona se guardan en UTC; sin zona (SQLite) se asumen UTC
+        return lambda v: v.astimezone(timezone.utc) if isinstance(v, datetime) and v.tzinfo else v
+    if isinstance(tipo, Date):
+        return lambda v: v.date() if isinstance(v, datetime) else v
+    return None
+
+
+class SalidaColumnar:
+    """Parquet o Arrow IPC con esquema tipado a partir de las columnas SQLAlchemy."""
+    def __init__(self, ruta: Path, formato: str, columnas: Sequence[Column]):
+        self.ruta = ruta
+        self.filas = 0
+        self._pa = pa = importar_opcional("pyarrow", formato)
+        self._schema = pa.schema([pa.field(c.name, _tipo_arrow(pa, c)) for c in columnas])
+        self._conversores = [_conversor_arrow(c) for c in columnas]
+        if formato == "parquet":
+            pq = importar_opcional("pyarrow.parquet", formato)
+            self._writer = pq.ParquetWriter(ruta, self._schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(ruta, self._schema)
+
+    def escribir(self, lote):
+        if not lote: return
+        arrays = []
+        for i, (campo, conv) in enumerate(zip(self._schema, self._conversores)):
+            valores = [fila[i] for fila in lote]
+            if conv: valores = [conv(v) for v in valores]
+            arrays.append(self._pa.array(valores, type=campo.type))
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+        self.filas += len(lote)
+
+    def cerrar(self):
+        self._writer.close()
+
+
+def crear_salida_tabla(formato: str, nombre: str, columnas: Sequence[Column], prefijo: str, target_dir: Path, libro: "Workbook" = None):
+    """
+    Destino en streaming para las filas de 'columnas' (una tabla o parte de ella).
+    En Excel es una hoja 'nombre' del libro; en el resto, el archivo '<prefijo>_<nombre>.<ext>'.
+    """
+    nombres = [c.name for c in columnas]
+    if formato == "excel":
+        return SalidaHojasExcel(libro, nombre, nombres)
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+    ruta = target_dir / f"{prefijo}_{nombre}{EXTENSIONES[formato]}"
+    if formato in ("parquet", "arrow"):
+        return SalidaColumnar(ruta, formato, columnas)
+    return SalidaCsv(ruta, formato, nombres)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador de tareas (sin Qt).
+
+Las tareas diarias viven en 'ca_tarea_programada' y cada ejecución queda en
+'ca_ejecucion_tarea' con su espera en cola, duración, resultado o error.
+
+- Recuperación: si la app estuvo cerrada a la hora de una tarea, al volver se
+  ejecuta una sola vez ('recuperada'), o se registra como OMITIDA si la tarea
+  tiene recuperar_perdidas=False.
+- Cola con prioridad (menor = antes) y límite de concurrencia por recurso
+  ('web', 'bd', 'disco'): una exportación no espera detrás de una Fase 2.
+
+Lo usan la ventana (gui_main) y el daemon de run_cli.py; cada uno aporta sus
+ejecutores: tipo de tarea -> función(parametros) que devuelve un resultado.
+"""
+
+import datetime
+import heapq
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from src.db.db_models import EstadoEjecucion
+from src.utils.logger import configurar_logger
+
+logger = configurar_logger(__name__)
+
+LIMITES_RECURSO = {"web": 1, "bd": 1, "disco": 1}
+MAX_TAREAS_SIMULTANEAS = 3
+# Más allá de este atraso sobre su hora, una tarea cuenta como perdida (se recupera u omite)
+TOLERANCIA_ATRASO = datetime.timedelta(minutes=10)
+INTERVALO_REVISION_S = 30
+
+# Piloto automático de Herramientas (settings.json) -> tareas persistentes
+TAREAS_AUTOPILOTO = {
+    "extraccion_diaria": {"ajuste": "auto_extract", "tipo": "extraer", "recurso": "web", "prioridad": 20,
+                          "parametros": {"dias_atras": 1, "max_paginas": 0}},
+    "actualizacion_diaria": {"ajuste": "auto_update", "tipo": "actualizar", "recurso": "web", "prioridad": 30,
+                             "parametros": {}},
+}
+
+
+def sincronizar_autopiloto(db_service, settings_manager):
+    """Refleja en la BD las horas y switches del piloto automático."""
+    for nombre, d in TAREAS_AUTOPILOTO.items():
+        db_service.guardar_tarea_programada(
+            nombre, d["tipo"], settings_manager.get_setting(f"{d['ajuste']}_time") or "08:00",
+            activa=bool(settings_manager.get_setting(f"{d['ajuste']}_enabled")),
+            parametros=d["parametros"], prioridad=d["prioridad"], recurso=d["recurso"])
+
+
+def crear_ejecutores(db_service, en_proceso: bool = False, progreso: Optional[Callable[[str], None]] = None) -> Dict[str, Callable]:
+    """
+    Ejecutores estándar. en_proceso=True corre el scraping en un proceso hijo (GUI);
+    el daemon lo corre en el mismo proceso. 'progreso' recibe los textos de avance.
+    """
+    def _etl(metodo: str, **kwargs):
+        if en_proceso:
+            from src.logic.etl_proceso import ProcesoEtl
+            return ProcesoEtl(metodo, **kwargs).ejecutar(progress_callback_text=progreso)
+        from src.logic.servicios import crear_etl_service
+        return getattr(crear_etl_service(db_service), metodo)(progress_callback_text=progreso, **kwargs)
+
+    def extraer(p: dict):
+        hasta = datetime.date.today() - datetime.timedelta(days=p.get("dias_atras", 1))
+        config = {"mode": "to_db", "date_from": hasta, "date_to": hasta, "max_paginas": p.get("max_paginas", 0)}
+        return {"nuevos_organismos": _etl("run_etl_live_to_db", config=config) or []}
+
+    def actualizar(p: dict):
+        _etl("run_fase2_update", scopes=p.get("alcance"))
+
+    def recalcular(p: dict):
+        from src.logic.servicios import crear_etl_service
+        crear_etl_service(db_service).run_recalculo_total_fase_1(progress_callback_text=progreso)
+
+    def limpiar(p: dict):
+        return {"eliminados": db_service.limpiar_registros_antiguos(dias_retencion=p.get("dias", 30))}
+
+    def exportar(p: dict):
+        from src.logic.excel_service import ExcelService
+        tareas = [{"tipo": p.get("tipo", "bd_delta"), "format": f, "scope": "all"} for f in p.get("formatos", ["parquet"])]
+        resultados = ExcelService(db_service).ejecutar_exportacion_lote(tareas, p["destino"], progress_callback_text=progreso)
+        errores = [r for r in resultados if r.startswith("ERROR")]
+        if errores: raise RuntimeError("; ".join(errores))
+        return {"archivos": resultados}
+
+    return {"extraer": extraer, "actualizar": actualizar, "recalcular": recalcular, "limpiar": limpiar, "exportar": exportar}
+
+
+def hora_local(valor: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """'valor' (por defecto ahora) con la zona local; uno sin zona se toma como hora local."""
+    return (valor or datetime.datetime.now()).astimezone()
+
+
+def horario_vigente(hora: str, ahora: datetime.datetime) -> datetime.datetime:
+    """Último horario diario 'HH:MM' ya alcanzado: hoy si ya pasó, si no ayer."""
+    h, m = (int(x) for x in hora.split(":"))
+    # Sin zona y de vuelta a la local: el desfase del horario puede no ser el de 'ahora' (cambio de hora)
+    horario = ahora.replace(hour=h, minute=m, second=0, microsecond=0, tzinfo=None)
+    if hora_local(horario) > ahora: horario -= datetime.timedelta(days=1)
+    return hora_local(horario)
+
+
+def _resumir(resultado: Any) -> Optional[dict]:
+    if resultado is None or isinstance(resultado, dict): return resultado
+    if isinstance(resultado, (list, tuple, set)): return {"cantidad": len(resultado)}
+    return {"valor": str(resultado)}
+
+
+@dataclass(order=True)
+class _EnCola:
+    prioridad: int
+    encolada_en: datetime.datetime
+    ejecucion_id: int
+    tarea: dict = field(compare=False)
+    origen: str = field(compare=False)
+
+
+class Planificador:
+    """
+    revisar() encola lo que corresponde y despacha; iniciar() lo hace cada 'intervalo'
+    segundos en un hilo propio. 'ocupado(recurso)' permite a quien lo usa retener
+    trabajos (p. ej. la GUI mientras corre una extracción manual).
+    'al_terminar(info)' se llama desde el hilo de la tarea al finalizar cada ejecución.
+    """
+    def __init__(self, db_service, ejecutores: Dict[str, Callable[[dict], Any]], limites: Optional[Dict[str, int]] = None,
+                 max_simultaneas: int = MAX_TAREAS_SIMULTANEAS, al_terminar: Optional[Callable[[dict], None]] = None,
+                 ocupado: Optional[Callable[[str], bool]] = None, reloj: Callable[[], datetime.datetime] = hora_local,
+                 intervalo: float = INTERVALO_REVISION_S):
+        self.db_service, self.ejecutores = db_service, ejecutores
+        self.limites = {**LIMITES_RECURSO, **(limites or {})}
+        self.max_simultaneas, self.intervalo = max_simultaneas, intervalo
+        self.al_terminar, self.ocupado = al_terminar, ocupado
+        self.reloj = lambda: hora_local(reloj())  # Siempre con zona: se compara con las fechas de la BD
+        self._cola: List[_EnCola] = []
+        self._en_curso = Counter()
+        self._lock = threading.Lock()
+        self._lock_bd = threading.Lock()  # Las escrituras del historial se hacen de a una
+        self._inactivo = threading.Condition(self._lock)
+        self._pool = ThreadPoolExecutor(max_workers=max_simultaneas, thread_name_prefix="planificador")
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # --- Ciclo ---
+    def iniciar(self):
+        """Reencola lo que quedó pendiente de la sesión anterior y arranca el hilo de revisión."""
+        with self._lock_bd: pendientes = self.db_service.recuperar_ejecuciones_pendientes()
+        for ejecucion, tarea in pendientes:
+            self._encolar(ejecucion["ejecucion_id"], tarea, ejecucion["encolada_en"] or self.reloj(), ejecucion["origen"])
+        self._hilo = threading.Thread(target=self._bucle, name="planificador-revision", daemon=True)
+        self._hilo.start()
+        logger.info(f"Planificador iniciado ({len(pendientes)} ejecuciones pendientes reencoladas).")
+
+    def detener(self, esperar: bool = False):
+        self._detener.set()
+        self._pool.shutdown(wait=esperar, cancel_futures=True)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try: self.revisar()
+            except Exception as e: logger.error(f"Planificador: error al revisar tareas: {e}", exc_info=True)
+            self._detener.wait(self.intervalo)
+
+    def esperar_inactivo(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no queden trabajos en cola ni en curso (pruebas y cierre ordenado)."""
+        with self._inactivo:
+            return self._inactivo.wait_for(lambda: not self._cola and not sum(self._en_curso.values()), timeout)
+
+    def reservar(self, recurso: str) -> bool:
+        """
+        Ocupa 'recurso' para un trabajo de fuera del planificador (p. ej. una extracción
+        manual de la GUI). False si ya está en uso; si no, hay que llamar a 'liberar'.
+        """
+        with self._lock:
+            if self._en_curso[recurso] >= self.limites.get(recurso, 1): return False
+            self._en_curso[recurso] += 1
+            return True
+
+    def liberar(self, recurso: str):
+        with self._lock:
+            self._en_curso[recurso] -= 1
+            self._inactivo.notify_all()
+        self._despachar()  # Lo que esperaba por el recurso puede salir ya
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {"en_cola": len(self._cola), "en_curso": {r: n for r, n in self._en_curso.items() if n}}
+
+    # --- Programación ---
+    def revisar(self):
+        ahora = self.reloj()
+        with self._lock_bd: tareas = self.db_service.obtener_tareas_programadas()
+        for tarea in tareas:
+            horario = horario_vigente(tarea["hora"], ahora)
+            if tarea["ultimo_horario"] and tarea["ultimo_horario"] >= horario: continue
+            # Varios días sin abrir la app se recuperan con una sola ejecución (la del último horario)
+            atrasada = ahora - horario > TOLERANCIA_ATRASO
+            if atrasada and not tarea["recuperar_perdidas"]:
+                logger.info(f"Planificador: '{tarea['nombre']}' de las {horario:%d-%m %H:%M} se perdió; se omite.")
+                with self._lock_bd:
+                    self.db_service.registrar_ejecucion_tarea(tarea["tarea_id"], horario, "recuperada", estado=EstadoEjecucion.OMITIDA,
+                                                              error="Horario perdido (la aplicación no estaba abierta).")
+                continue
+            origen = "recuperada" if atrasada else "programada"
+            with self._lock_bd: ejecucion_id = self.db_service.registrar_ejecucion_tarea(tarea["tarea_id"], horario, origen)
+            logger.info(f"Planificador: '{tarea['nombre']}' encolada ({origen}, {horario:%d-%m %H:%M}).")
+            self._encolar(ejecucion_id, tarea, ahora, origen)
+        self._despachar()
+
+    def _encolar(self, ejecucion_id: int, tarea: dict, encolada_en: datetime.datetime, origen: str):
+        with self._lock: heapq.heappush(self._cola, _EnCola(tarea["prioridad"], encolada_en, ejecucion_id, tarea, origen))
+
+    def _despachar(self):
+        if self._detener.is_set(): return
+        with self._lock:
+            retenidos = []
+            while self._cola and sum(self._en_curso.values()) < self.max_simultaneas:
+                item = heapq.heappop(self._cola)
+                recurso = item.tarea["recurso"]
+                if self._en_curso[recurso] >= self.limites.get(recurso, 1) or (self.ocupado and self.ocupado(recurso)):
+                    retenidos.append(item); continue
+                self._en_curso[recurso] += 1
+                self._pool.submit(self._ejecutar, item)
+            for item in retenidos: heapq.heappush(self._cola, item)
+
+    def _ejecutar(self, item: _EnCola):
+        tarea, inicio = item.tarea, self.reloj()
+        info = {"ejecucion_id": item.ejecucion_id, "tarea": tarea["nombre"], "tipo": tarea["tipo"], "origen": item.origen,
+                "espera_s": max(0.0, (inicio - item.encolada_en).total_seconds()), "resultado": None, "error": None}
+        try:
+            with self._lock_bd:
+                self.db_service.actualizar_ejecucion_tarea(item.ejecucion_id, estado=EstadoEjecucion.EN_CURSO, iniciada_en=inicio, espera_s=info["espera_s"])
+            t0 = time.perf_counter()
+            try:
+                ejecutor = self.ejecutores.get(tarea["tipo"])
+                if ejecutor is None: raise ValueError(f"Tipo de tarea desconocido: '{tarea['tipo']}'")
+                info["resultado"] = _resumir(ejecutor(tarea["parametros"]))
+                info["estado"] = EstadoEjecucion.OK
+            except Exception as e:
+                logger.error(f"Planificador: '{tarea['nombre']}' falló: {e}", exc_info=True)
+                info["estado"], info["error"] = EstadoEjecucion.ERROR, f"{type(e).__name__}: {e}"
+            info["duracion_s"] = round(time.perf_counter() - t0, 3)
+            with self._lock_bd:
+                self.db_service.actualizar_ejecucion_tarea(item.ejecucion_id, estado=info["estado"], finalizada_en=self.reloj(),
+                                                           duracion_s=info["duracion_s"], resultado=info["resultado"], error=info["error"])
+            logger.info(f"Planificador: '{tarea['nombre']}' {info['estado'].value} en {info['duracion_s']:.1f} s (esperó {info['espera_s']:.1f} s).")
+            if self.al_terminar: self.al_terminar({**info, "estado": info["estado"].value})
+        except Exception as e:
+            logger.error(f"Planificador: no se pudo registrar la ejecución {item.ejecucion_id}: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._en_curso[tarea["recurso"]] -= 1
+                self._inactivo.notify_all()
+            self._despachar()
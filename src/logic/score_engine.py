@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import unicodedata
 import json
+import threading
 from typing import Dict, List, Tuple
 from src.utils.logger import configurar_logger
 from config.config import PUNTOS_SEGUNDO_LLAMADO
@@ -15,18 +16,26 @@ class ScoreEngine:
         self.reglas_prioritarias: Dict[int, int] = {}
         self.reglas_no_deseadas: set = set()
         self.organismo_name_to_id_map: Dict[str, int] = {}
-        self.recargar_reglas()
+        # Las reglas se cargan al primer cálculo (o antes, con 'precargar_reglas' en segundo plano)
+        self._reglas_cargadas = False
+        self._lock_reglas = threading.Lock()
+
+    def precargar_reglas(self):
+        """Carga las reglas si aún no están en memoria (pensado para un hilo de fondo)."""
+        if self._reglas_cargadas: return
+        with self._lock_reglas:
+            if not self._reglas_cargadas: self.recargar_reglas()
 
     def recargar_reglas(self):
         logger.info("ScoreEngine: Recargando reglas y keywords a memoria segura...")
         
         # 1. Cargar Keywords y convertirlas a diccionarios (DTOs) inmediatamente
         # Esto evita el error de "DetachedInstance" o lectura de valores vacíos
-        self.keywords_cache = []
+        keywords_cache = []
         try:
             keywords_orm = self.db_service.get_all_keywords()
             for kw in keywords_orm:
-                self.keywords_cache.append({
+                keywords_cache.append({
                     "keyword": kw.keyword,
                     "norm": self._norm(kw.keyword), # Pre-normalizamos para velocidad
                     "p_nom": kw.puntos_nombre or 0,
@@ -37,34 +46,41 @@ class ScoreEngine:
             logger.error(f"Error cargando keywords: {e}")
 
         # 2. Cargar Reglas de Organismos
-        self.reglas_prioritarias = {}
-        self.reglas_no_deseadas = set()
+        reglas_prioritarias = {}
+        reglas_no_deseadas = set()
         try:
             reglas = self.db_service.get_all_organismo_reglas()
             for r in reglas:
                 tipo_val = r.tipo.value if hasattr(r.tipo, 'value') else r.tipo
                 if tipo_val == 'prioritario': 
-                    self.reglas_prioritarias[r.organismo_id] = r.puntos
+                    reglas_prioritarias[r.organismo_id] = r.puntos
                 elif tipo_val == 'no_deseado': 
-                    self.reglas_no_deseadas.add(r.organismo_id)
+                    reglas_no_deseadas.add(r.organismo_id)
         except Exception as e:
             logger.error(f"Error cargando reglas organismos: {e}")
 
         # 3. Mapa de Nombres de Organismos
-        self.organismo_name_to_id_map = {}
+        organismo_name_to_id_map = {}
         try:
             orgs = self.db_service.get_all_organisms()
             for o in orgs:
                 if o.nombre: 
-                    self.organismo_name_to_id_map[self._norm(o.nombre)] = o.organismo_id
+                    organismo_name_to_id_map[self._norm(o.nombre)] = o.organismo_id
         except: pass
 
+        # Se publican al final: un cálculo en otro hilo nunca ve reglas a medio cargar
+        self.keywords_cache = keywords_cache
+        self.reglas_prioritarias, self.reglas_no_deseadas = reglas_prioritarias, reglas_no_deseadas
+        self.organismo_name_to_id_map = organismo_name_to_id_map
+        self._reglas_cargadas = True
+
     def _norm(self, txt): 
         if not txt: return ""
         s = ''.join(c for c in unicodedata.normalize('NFD', str(txt).lower()) if unicodedata.category(c) != 'Mn')
         return " ".join(s.split())
 
     def calcular_puntuacion_fase_1(self, licitacion_raw: dict) -> Tuple[int, List[str]]:
+        self.precargar_reglas()
         org_norm = self._norm(licitacion_raw.get("organismo_comprador"))
         nom_norm = self._norm(licitacion_raw.get("nombre"))
         
@@ -110,6 +126,7 @@ class ScoreEngine:
         return max(0, puntaje), detalle
 
     def calcular_puntuacion_fase_2(self, datos_ficha: dict) -> Tuple[int, List[str]]:
+        self.precargar_reglas()
         puntaje = 0
         detalle = []
         
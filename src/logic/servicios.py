@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Fábrica de servicios.
+
+Arma el grafo DbService -> ScraperService / ScoreEngine -> EtlService fuera de la GUI:
+lo usan el proceso aislado de ETL y los scripts de línea de comandos.
+"""
+
+from src.db.db_service import DbService
+from src.db.session import SessionLocal
+from src.logic.etl_service import EtlService
+from src.logic.score_engine import ScoreEngine
+from src.scraper.scraper_service import ScraperService
+
+
+def crear_db_service() -> DbService:
+    return DbService(SessionLocal)
+
+
+def crear_etl_service(db_service: DbService = None) -> EtlService:
+    db_service = db_service or crear_db_service()
+    return EtlService(db_service, ScraperService(), ScoreEngine(db_service))
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén local de las respuestas crudas de la API (compras del listado y fichas).
+
+El scraper guarda cada payload tal como llegó, antes de mapearlo, para poder
+volver a derivar campos sin scrapear de nuevo (EtlService.run_replay_payloads,
+'run_cli.py replay'):
+  - Segmentos de solo-agregar (<fecha>_<pid>.seg): un bloque zlib por payload.
+    Cada proceso escribe su propio segmento, así la GUI, el proceso del ETL y
+    el daemon nunca agregan al mismo archivo.
+  - Índice SQLite (indice.sqlite): tipo, codigo_ca y fecha de obtención ->
+    segmento, offset y largo del bloque.
+Nada se reescribe: la versión vigente de una CA es la más reciente. 'purgar'
+(desde la limpieza automática) borra las reemplazadas hace más de
+PAYLOADS_RETENCION_DIAS y los segmentos que quedan vacíos.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from config.config import PAYLOADS_HABILITADO, PAYLOADS_DIR, PAYLOADS_RETENCION_DIAS
+from src.utils.logger import configurar_logger
+
+logger = configurar_logger(__name__)
+
+TIPOS = ("listado", "ficha")
+MAX_SEGMENTO_BYTES = 64 * 1024 * 1024
+NIVEL_COMPRESION = 6
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS payload (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    codigo_ca TEXT NOT NULL,
+    obtenido_en REAL NOT NULL,
+    segmento TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    largo INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_payload_codigo ON payload (tipo, codigo_ca, obtenido_en);
+CREATE INDEX IF NOT EXISTS ix_payload_fecha ON payload (tipo, obtenido_en);
+"""
+
+# Última versión de cada CA (SQLite toma las columnas sueltas de la fila del MAX),
+# ordenada por posición en disco para leer los segmentos de corrido
+SQL_VIGENTES = """
+SELECT codigo_ca, obtenido_en, segmento, offset, largo FROM (
+    SELECT codigo_ca, MAX(obtenido_en) AS obtenido_en, segmento, offset, largo
+    FROM payload WHERE tipo = ? AND obtenido_en >= ? AND obtenido_en < ?
+    GROUP BY codigo_ca
+) ORDER BY segmento, offset
+"""
+
+# Versiones con otra más reciente de la misma CA (por fecha, y por id a igual fecha)
+SQL_PURGA = """
+DELETE FROM payload WHERE obtenido_en < ? AND EXISTS (
+    SELECT 1 FROM payload AS nueva WHERE nueva.tipo = payload.tipo AND nueva.codigo_ca = payload.codigo_ca
+    AND (nueva.obtenido_en > payload.obtenido_en OR (nueva.obtenido_en = payload.obtenido_en AND nueva.id > payload.id))
+)
+"""
+
+
+class AlmacenPayloads:
+    def __init__(self, directorio: Union[str, Path]):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segmento = None  # (nombre, archivo abierto para agregar)
+        self._indice = sqlite3.connect(str(self.directorio / "indice.sqlite"), timeout=30, check_same_thread=False)
+        self._indice.execute("PRAGMA journal_mode=WAL")
+        self._indice.executescript(ESQUEMA)
+
+    def _archivo(self):
+        if self._segmento and self._segmento[1].tell() < MAX_SEGMENTO_BYTES: return self._segmento
+        if self._segmento: self._segmento[1].close()
+        nombre = f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}.seg"
+        self._segmento = (nombre, open(self.directorio / nombre, "ab"))
+        return self._segmento
+
+    def guardar(self, tipo: str, registros: Iterable[Tuple[str, Dict]], obtenido_en: Optional[float] = None) -> int:
+        """Agrega (codigo_ca, payload) al segmento y luego al índice. Devuelve cuántos guardó."""
+        if tipo not in TIPOS: raise ValueError(f"Tipo de payload desconocido: {tipo}")
+        obtenido_en = obtenido_en or time.time()
+        bloques = [(str(codigo), zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), NIVEL_COMPRESION))
+                   for codigo, payload in registros if codigo]
+        if not bloques: return 0
+        with self._lock:
+            nombre, archivo = self._archivo()
+            offset, filas = archivo.tell(), []
+            for codigo, bloque in bloques:
+                filas.append((tipo, codigo, obtenido_en, nombre, offset, len(bloque)))
+                offset += len(bloque)
+            # Primero los datos: una fila del índice nunca apunta a bytes que no están en disco
+            archivo.write(b"".join(bloque for _c, bloque in bloques)); archivo.flush()
+            with self._indice:
+                self._indice.executemany("INSERT INTO payload (tipo, codigo_ca, obtenido_en, segmento, offset, largo) VALUES (?, ?, ?, ?, ?, ?)", filas)
+        return len(filas)
+
+    def guardar_listado(self, compras: Iterable[Dict]) -> int:
+        return self.guardar("listado", ((c.get("codigo", c.get("id")), c) for c in compras))
+
+    def guardar_ficha(self, codigo_ca: str, respuesta: Dict) -> int:
+        return self.guardar("ficha", [(codigo_ca, respuesta)])
+
+    def _leer(self, archivos: Dict, segmento: str, offset: int, largo: int) -> Dict:
+        if segmento not in archivos:
+            if self._segmento and self._segmento[0] == segmento: self._segmento[1].flush()
+            archivos[segmento] = open(self.directorio / segmento, "rb")
+        archivo = archivos[segmento]
+        archivo.seek(offset)
+        return json.loads(zlib.decompress(archivo.read(largo)))
+
+    def iterar(self, tipo: str, desde: Optional[float] = None, hasta: Optional[float] = None) -> Iterator[Tuple[str, float, Dict]]:
+        """(codigo_ca, obtenido_en, payload) de la versión más reciente de cada CA obtenida en [desde, hasta)."""
+        with self._lock:
+            filas = self._indice.execute(SQL_VIGENTES, (tipo, desde or 0, hasta or float("inf"))).fetchall()
+        archivos = {}
+        try:
+            for codigo, obtenido_en, segmento, offset, largo in filas:
+                try:
+                    yield codigo, obtenido_en, self._leer(archivos, segmento, offset, largo)
+                except (OSError, zlib.error, ValueError) as e:
+                    logger.warning(f"Payload ilegible ({tipo} {codigo} en {segmento}@{offset}): {e}")
+        finally:
+            for archivo in archivos.values(): archivo.close()
+
+    def ultimo(self, tipo: str, codigo_ca: str) -> Optional[Dict]:
+        with self._lock:
+            fila = self._indice.execute("SELECT segmento, offset, largo FROM payload WHERE tipo = ? AND codigo_ca = ? ORDER BY obtenido_en DESC, id DESC LIMIT 1",
+                                        (tipo, str(codigo_ca))).fetchone()
+        if fila is None: return None
+        archivos = {}
+        try: return self._leer(archivos, *fila)
+        finally:
+            for archivo in archivos.values(): archivo.close()
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            por_tipo = {tipo: {"payloads": n, "cas": cas} for tipo, n, cas in
+                        self._indice.execute("SELECT tipo, COUNT(*), COUNT(DISTINCT codigo_ca) FROM payload GROUP BY tipo")}
+        return {"tipos": por_tipo, "bytes": sum(f.stat().st_size for f in self.directorio.glob("*.seg")), "directorio": str(self.directorio)}
+
+    def purgar(self, dias: float = PAYLOADS_RETENCION_DIAS, ahora: Optional[float] = None) -> Dict[str, int]:
+        """
+        Borra del índice las versiones reemplazadas obtenidas hace más de 'dias' y los
+        segmentos que quedan sin ningún payload. Un segmento modificado dentro del plazo
+        no se toca: otro proceso puede estar agregándole datos aún sin indexar.
+        """
+        limite = (ahora or time.time()) - dias * 86400
+        with self._lock:
+            with self._indice:
+                payloads = self._indice.execute(SQL_PURGA, (limite,)).rowcount
+            usados = {segmento for (segmento,) in self._indice.execute("SELECT DISTINCT segmento FROM payload")}
+            if self._segmento: usados.add(self._segmento[0])
+        segmentos = 0
+        for ruta in self.directorio.glob("*.seg"):
+            if ruta.name in usados: continue
+            try:
+                if ruta.stat().st_mtime >= limite: continue
+                ruta.unlink(); segmentos += 1
+            except OSError as e:
+                logger.warning(f"No se pudo borrar el segmento {ruta.name}: {e}")
+        if payloads or segmentos: logger.info(f"Payloads: {payloads} versiones y {segmentos} segmentos purgados.")
+        return {"payloads": payloads, "segmentos": segmentos}
+
+    def cerrar(self):
+        with self._lock:
+            if self._segmento: self._segmento[1].close(); self._segmento = None
+            self._indice.close()
+
+
+_almacen: Optional[AlmacenPayloads] = None
+_lock_almacen = threading.Lock()
+
+
+def almacen() -> Optional[AlmacenPayloads]:
+    """El almacén de PAYLOADS_DIR (uno por proceso), o None si está deshabilitado o no se pudo abrir."""
+    global _almacen, PAYLOADS_HABILITADO
+    if not PAYLOADS_HABILITADO: return None
+    with _lock_almacen:
+        if _almacen is None:
+            try:
+                _almacen = AlmacenPayloads(PAYLOADS_DIR)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Almacén de payloads no disponible ({PAYLOADS_DIR}): {e}")
+                PAYLOADS_HABILITADO = False
+        return _almacen
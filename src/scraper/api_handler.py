@@ -5,7 +5,7 @@ Valida y extrae datos de las respuestas JSON.
 Adaptado para usar el logger centralizado.
 
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
 from src.utils.logger import configurar_logger
 
 logger = configurar_logger(__name__)
@@ -47,4 +47,46 @@ def extraer_metadata_paginacion(datos_json: Dict) -> Dict:
         }
     except (KeyError, TypeError) as e:
         logger.error(f"ERROR al extraer metadata: {e}")
-        return default
\ No newline at end of file
+        return default
+
+def mapear_ficha(datos: Optional[Dict]) -> Optional[Dict]:
+    """
+    Convierte la respuesta de la ficha en los campos de Fase 2 (None si no es válida).
+    Se usa al scrapear y al reprocesar payloads guardados (EtlService.run_replay_payloads).
+    """
+    if datos and datos.get('success') == 'OK' and 'payload' in datos:
+        payload = datos['payload']
+        
+        # --- LÓGICA DE ESTADO ---
+        # A veces la API devuelve 'estado' como texto ("Desierta")
+        # y a veces usa 'estado_convocatoria' (int) o 'id_estado' (int).
+        # Priorizamos el texto que viene directamente si existe.
+        estado_texto = payload.get('estado')
+        if not estado_texto and payload.get('motivo_desierta'):
+            estado_texto = "Desierta"
+        
+        # Si el estado es "Publicada", verificamos si es 2do llamado por si acaso
+        if estado_texto == "Publicada" and payload.get('fecha_cierre_segundo_llamado'):
+            # (Opcional) Podríamos dejar solo "Publicada" y que la GUI decida mostrar "(2° Llamado)"
+            # pero para consistencia con tu reporte:
+            pass 
+
+        return {
+            'descripcion': payload.get('descripcion'),
+            'direccion_entrega': payload.get('direccion_entrega'),
+            'fecha_cierre_p1': payload.get('fecha_cierre_primer_llamado'),
+            'fecha_cierre_p2': payload.get('fecha_cierre_segundo_llamado'),
+            'productos_solicitados': payload.get('productos_solicitados', []),
+            
+            # CORRECCION 3: Usar el campo de texto directo para el estado
+            'estado': estado_texto, 
+            
+            'cantidad_provedores_cotizando': payload.get('cantidad_provedores_cotizando'),
+            
+            # CORRECCION 4: Asegurar extracción de estado_convocatoria (int)
+            'estado_convocatoria': payload.get('estado_convocatoria'),
+            
+            # CORRECCION 5: Extraer plazo de entrega
+            'plazo_entrega': payload.get('plazo_entrega') 
+        }
+    return None
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de peticiones condicionales para las fichas (Fase 2).
+
+Por cada ficha se guarda el ETag, el Last-Modified y un hash del cuerpo de la
+última respuesta escrita en la BD (ScraperService.confirmar_ficha). La siguiente vez el scraper envía If-None-Match /
+If-Modified-Since: con 304, o con un cuerpo idéntico si el servidor no usa
+validadores, la ficha se da por sin cambios y no se parsea ni se escribe en la BD.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+
+from config.config import CACHE_FICHAS_HABILITADO, CACHE_FICHAS_ARCHIVO
+from src.utils.logger import configurar_logger
+
+logger = configurar_logger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cache_ficha (
+    codigo_ca TEXT PRIMARY KEY,
+    etag TEXT,
+    ultima_modificacion TEXT,
+    huella TEXT NOT NULL,
+    verificada_en REAL NOT NULL
+)
+"""
+
+
+def huella(cuerpo: bytes) -> str:
+    return hashlib.sha1(cuerpo).hexdigest()
+
+
+class Validadores(NamedTuple):
+    etag: Optional[str]
+    ultima_modificacion: Optional[str]
+    huella: str
+
+    def cabeceras(self) -> Dict[str, str]:
+        cabeceras = {}
+        if self.etag: cabeceras["If-None-Match"] = self.etag
+        if self.ultima_modificacion: cabeceras["If-Modified-Since"] = self.ultima_modificacion
+        return cabeceras
+
+
+class CacheFichas:
+    def __init__(self, ruta: Union[str, Path]):
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(str(ruta), timeout=30, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")  # Perder la última entrada solo cuesta una descarga
+        self._conexion.execute(ESQUEMA)
+
+    def obtener(self, codigo_ca: str) -> Optional[Validadores]:
+        with self._lock:
+            fila = self._conexion.execute("SELECT etag, ultima_modificacion, huella FROM cache_ficha WHERE codigo_ca = ?", (codigo_ca,)).fetchone()
+        return Validadores(*fila) if fila else None
+
+    def guardar(self, codigo_ca: str, validadores: Validadores):
+        with self._lock, self._conexion:
+            self._conexion.execute("INSERT OR REPLACE INTO cache_ficha VALUES (?, ?, ?, ?, ?)", (codigo_ca, *validadores, time.time()))
+
+    def cerrar(self):
+        with self._lock: self._conexion.close()
+
+
+_cache: Optional[CacheFichas] = None
+_lock_cache = threading.Lock()
+
+
+def cache_fichas() -> Optional[CacheFichas]:
+    """La caché de CACHE_FICHAS_ARCHIVO (una por proceso), o None si está deshabilitada o no se pudo abrir."""
+    global _cache, CACHE_FICHAS_HABILITADO
+    if not CACHE_FICHAS_HABILITADO: return None
+    with _lock_cache:
+        if _cache is None:
+            try:
+                _cache = CacheFichas(CACHE_FICHAS_ARCHIVO)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Caché de fichas no disponible ({CACHE_FICHAS_ARCHIVO}): {e}")
+                CACHE_FICHAS_HABILITADO = False
+        return _cache
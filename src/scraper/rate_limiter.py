@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Limitador de tasa compartido para las peticiones a la API (listado y fichas).
+
+Cubeta de fichas (token bucket) cuya tasa se ajusta con AIMD:
+  - Cada respuesta rápida y sin error sube la tasa de forma aditiva
+    (+incremento peticiones/s por cada segundo de tráfico sano).
+  - Un 429, un 5xx, un error de red o un pico de latencia (sobre latencia_max_s
+    o varias veces la latencia media) la multiplica por 'factor'. Las bajadas se
+    espacian 'enfriamiento_s' para que una ráfaga de errores cuente como una sola.
+  - Un 429 además detiene todas las peticiones durante su Retry-After.
+Reemplaza las pausas fijas del scraper; su estado queda en el reporte de la
+ejecución (estadisticas()).
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Union
+
+from config.config import (
+    DELAY_RETRY, LIMITE_TASA_INICIAL, LIMITE_TASA_MIN, LIMITE_TASA_MAX, LIMITE_LATENCIA_MAX_S
+)
+from src.utils.logger import configurar_logger
+
+logger = configurar_logger(__name__)
+
+MAX_EVENTOS = 50
+ALFA_LATENCIA = 0.2  # Peso de la última respuesta en la latencia media (EWMA)
+
+
+def segundos_retry_after(valor: Union[str, int, float, None]) -> Optional[float]:
+    """Retry-After en segundos (acepta segundos o fecha HTTP). None si no viene o no se entiende."""
+    if valor is None or valor == "": return None
+    try:
+        return max(0.0, float(valor))
+    except (TypeError, ValueError):
+        pass
+    try:
+        fecha = parsedate_to_datetime(str(valor))
+    except (TypeError, ValueError):
+        return None
+    if fecha.tzinfo is None: fecha = fecha.replace(tzinfo=timezone.utc)
+    return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+
+
+class LimitadorAdaptativo:
+    def __init__(self, tasa_inicial: float = LIMITE_TASA_INICIAL, tasa_min: float = LIMITE_TASA_MIN,
+                 tasa_max: float = LIMITE_TASA_MAX, rafaga: float = 1.0, incremento: float = 0.5, factor: float = 0.5,
+                 latencia_max_s: float = LIMITE_LATENCIA_MAX_S, multiplo_pico: float = 4.0, enfriamiento_s: float = 2.0,
+                 pausa_429_s: float = DELAY_RETRY, reloj: Callable[[], float] = time.monotonic,
+                 dormir: Callable[[float], None] = time.sleep):
+        """'reloj' y 'dormir' se pueden reemplazar en las pruebas."""
+        self.tasa_min, self.tasa_max = tasa_min, tasa_max
+        self.tasa = min(max(tasa_inicial, tasa_min), tasa_max)
+        self.rafaga, self.incremento, self.factor = rafaga, incremento, factor
+        self.latencia_max_s, self.multiplo_pico, self.enfriamiento_s = latencia_max_s, multiplo_pico, enfriamiento_s
+        self.pausa_429_s = pausa_429_s
+        self._reloj, self._dormir = reloj, dormir
+        self._lock = threading.Lock()
+        self._fichas, self._ultima_recarga = rafaga, reloj()
+        self._pausa_hasta = 0.0
+        self._ultima_bajada = None
+        self._latencia_media = None
+        self.reiniciar_estadisticas()
+
+    def reiniciar_estadisticas(self):
+        """Pone en cero los contadores; la tasa aprendida se conserva entre ejecuciones."""
+        with self._lock:
+            self._inicio = self._reloj()
+            self._contadores = {"peticiones": 0, "exitos": 0, "errores_429": 0, "errores_servidor": 0, "errores_red": 0,
+                                "picos_latencia": 0, "subidas": 0, "bajadas": 0}
+            self._espera_total = 0.0
+            self._tasa_min_vista = self._tasa_max_vista = self.tasa
+            self._eventos: List[Dict] = []
+
+    def adquirir(self) -> float:
+        """Espera hasta tener una ficha (y a que termine una pausa por 429). Devuelve los segundos esperados."""
+        esperado = 0.0
+        while True:
+            with self._lock:
+                ahora = self._reloj()
+                self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultima_recarga) * self.tasa)
+                self._ultima_recarga = ahora
+                if ahora < self._pausa_hasta:
+                    espera = self._pausa_hasta - ahora
+                elif self._fichas >= 1:
+                    self._fichas -= 1
+                    self._espera_total += esperado
+                    return esperado
+                else:
+                    espera = (1 - self._fichas) / self.tasa
+            self._dormir(espera)
+            esperado += espera
+
+    def registrar(self, latencia_s: float, estado: Optional[int], retry_after: Union[str, float, None] = None):
+        """
+        Informa el resultado de una petición: 'estado' es el código HTTP, o None si
+        falló la conexión. Los demás 4xx (401, 404...) no mueven la tasa.
+        """
+        with self._lock:
+            self._contadores["peticiones"] += 1
+            if estado == 429:
+                self._contadores["errores_429"] += 1
+                pausa = segundos_retry_after(retry_after)
+                self._pausa_hasta = max(self._pausa_hasta, self._reloj() + (self.pausa_429_s if pausa is None else pausa))
+                self._fichas = 0.0  # Tras la pausa se reanuda de a una, sin ráfaga
+                self._bajar("429")
+            elif estado is None or estado >= 500:
+                self._contadores["errores_red" if estado is None else "errores_servidor"] += 1
+                self._bajar("error_red" if estado is None else f"http_{estado}")
+            elif estado < 400:
+                self._contadores["exitos"] += 1
+                media = self._latencia_media
+                if latencia_s > self.latencia_max_s or (media is not None and latencia_s > self.multiplo_pico * max(media, 0.05)):
+                    self._contadores["picos_latencia"] += 1
+                    self._bajar("latencia", latencia_s=round(latencia_s, 3))
+                else:
+                    self._subir()
+                self._latencia_media = latencia_s if media is None else media + ALFA_LATENCIA * (latencia_s - media)
+
+    def _subir(self):
+        if self.tasa >= self.tasa_max: return
+        self.tasa = min(self.tasa_max, self.tasa + self.incremento / self.tasa)
+        self._contadores["subidas"] += 1
+        self._tasa_max_vista = max(self._tasa_max_vista, self.tasa)
+
+    def _bajar(self, motivo: str, **detalle):
+        ahora = self._reloj()
+        if self._ultima_bajada is not None and ahora - self._ultima_bajada < self.enfriamiento_s: return
+        self._ultima_bajada = ahora
+        anterior, self.tasa = self.tasa, max(self.tasa_min, self.tasa * self.factor)
+        self._contadores["bajadas"] += 1
+        self._tasa_min_vista = min(self._tasa_min_vista, self.tasa)
+        if len(self._eventos) < MAX_EVENTOS:
+            self._eventos.append({"t_s": round(ahora - self._inicio, 3), "motivo": motivo,
+                                  "tasa_anterior": round(anterior, 3), "tasa": round(self.tasa, 3), **detalle})
+        logger.info(f"Limitador: {motivo}, tasa {anterior:.2f} -> {self.tasa:.2f} peticiones/s")
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {"tasa": round(self.tasa, 3), "tasa_min_vista": round(self._tasa_min_vista, 3),
+                    "tasa_max_vista": round(self._tasa_max_vista, 3), **self._contadores,
+                    "espera_total_s": round(self._espera_total, 3),
+                    "latencia_media_s": round(self._latencia_media, 3) if self._latencia_media is not None else None,
+                    "eventos_bajada": list(self._eventos)}
+
+
+_limitador: Optional[LimitadorAdaptativo] = None
+_lock_limitador = threading.Lock()
+
+
+def limitador() -> LimitadorAdaptativo:
+    """El limitador del proceso: lo comparten todas las instancias de ScraperService."""
+    global _limitador
+    with _lock_limitador:
+        if _limitador is None: _limitador = LimitadorAdaptativo()
+        return _limitador
@@ -1,28 +1,103 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
 import time
-import random
-from playwright.sync_api import sync_playwright, Playwright, Page, Response
-from typing import Optional, Dict, Callable, List
+import subprocess
+import threading
+from typing import TYPE_CHECKING, Optional, Dict, Callable, List, Tuple, Union
+
+# Playwright es pesado de importar: se carga recién al abrir el navegador
+if TYPE_CHECKING:
+    from playwright.sync_api import Playwright, Page
 
 from src.utils.logger import configurar_logger
-from . import api_handler
+from src.utils.tracing import span
+from . import api_handler, almacen_payloads
+from .almacen_payloads import AlmacenPayloads
+from .cache_http import CacheFichas, Validadores, cache_fichas, huella
+from .rate_limiter import LimitadorAdaptativo, limitador
 from .url_builder import (
     construir_url_listado,
     construir_url_api_ficha,
     construir_url_api_listado
 )
 from config.config import (
-    MODO_HEADLESS, MAX_RETRIES, DELAY_RETRY, HEADERS_API
+    MODO_HEADLESS, MAX_RETRIES, HEADERS_API, TIMEOUT_REQUESTS
 )
 
 logger = configurar_logger('scraper_service')
 
+# La verificación de navegadores se hace una sola vez, antes del primer scraping
+_navegadores_verificados = False
+_lock_navegadores = threading.Lock()
+
+
+def verificar_navegadores_playwright(progress_callback: Optional[Callable[[str], None]] = None):
+    """
+    Verifica e instala los navegadores de Playwright si no existen.
+    Crítico para el primer uso del .exe en un equipo limpio.
+    """
+    global _navegadores_verificados
+    with _lock_navegadores:
+        if _navegadores_verificados: return
+        _navegadores_verificados = True
+        # Solo forzamos la instalación si estamos en modo compilado (.exe)
+        if not getattr(sys, 'frozen', False): return
+        try:
+            logger.info("Verificando entorno de navegadores Playwright...")
+            if progress_callback: progress_callback("Verificando componentes web...")
+            subprocess.run(["playwright", "install", "chromium"], check=True, env=os.environ)
+            logger.info("Navegadores verificados correctamente.")
+        except Exception as e:
+            # No es fatal: si el navegador sí estaba instalado, el scraping funciona igual
+            logger.error(f"Error verificando navegadores: {e}")
+
+
+# Lo devuelve scrape_ficha_detalle_api cuando la ficha no cambió desde la última descarga
+FICHA_SIN_CAMBIOS = object()
+
+
+class _TokenExpirado(Exception):
+    """La API respondió 401: hay que volver a capturar credenciales."""
+
+
+class _RespuestaRequests:
+    """Respuesta de requests con la interfaz de la de Playwright (ok, status, headers, json())."""
+    def __init__(self, respuesta):
+        self.ok, self.status, self.headers, self.json = respuesta.ok, respuesta.status_code, respuesta.headers, respuesta.json
+
+
+class _ClienteRequests:
+    """Cliente HTTP con la interfaz de APIRequestContext de Playwright (solo 'get')."""
+    def __init__(self, sesion, headers: Dict):
+        self.sesion, self.headers = sesion, headers
+
+    def get(self, url: str) -> _RespuestaRequests:
+        return _RespuestaRequests(self.sesion.get(url, headers=self.headers, timeout=TIMEOUT_REQUESTS))
+
+
 class ScraperService:
-    def __init__(self):
+    def __init__(self, autenticador: Optional[Callable[[Callable[[str], None]], Dict]] = None,
+                 almacen: Optional[AlmacenPayloads] = None, cache: Optional[CacheFichas] = None,
+                 limitador_tasa: Optional[LimitadorAdaptativo] = None):
+        """
+        'autenticador(progress_callback) -> headers' reemplaza la captura del token con el
+        navegador: el listado y las fichas van directo por HTTP. Lo usan las pruebas de
+        carga contra el servidor simulado (benchmarks/mock_api.py).
+        'almacen' guarda las respuestas crudas (por defecto el de PAYLOADS_DIR, si está habilitado)
+        y 'cache' los validadores de las fichas (por defecto el de CACHE_FICHAS_ARCHIVO).
+        'limitador_tasa' espacia todas las peticiones a la API (por defecto el del proceso).
+        """
         logger.info("ScraperService inicializado.")
         self.headers_sesion = {} 
+        self.autenticador = autenticador
+        self.almacen = almacen if almacen is not None else almacen_payloads.almacen()
+        self.cache_fichas = cache if cache is not None else cache_fichas()
+        self.limitador = limitador_tasa if limitador_tasa is not None else limitador()
+        self._sesion_http = None  # requests.Session: reutiliza conexiones entre fichas
 
-    def _obtener_credenciales(self, p: Playwright, progress_callback: Callable[[str], None]):
+    def _obtener_credenciales(self, p: "Playwright", progress_callback: Callable[[str], None]):
+        verificar_navegadores_playwright(progress_callback)
         logger.info(f"Iniciando navegador (Headless={MODO_HEADLESS})...")
         progress_callback("Abriendo Chrome para autenticación...")
         
@@ -120,136 +195,192 @@ class ScraperService:
 
     def refrescar_sesion(self, progress_callback: Callable[[str], None]):
         """Fuerza la obtención de un nuevo token iniciando el navegador."""
-        with sync_playwright() as p:
-            self._obtener_credenciales(p, progress_callback)
+        with span("credenciales"):
+            if self.autenticador:
+                self.headers_sesion = self.autenticador(progress_callback); return
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                self._obtener_credenciales(p, progress_callback)
+
+    def _http(self):
+        if self._sesion_http is None:
+            import requests
+            self._sesion_http = requests.Session()
+        return self._sesion_http
 
     def run_scraper_listado(self, progress_callback: Callable[[str], None], filtros: Optional[Dict] = None, max_paginas: Optional[int] = None) -> List[Dict]:
         logger.info(f"INICIANDO FASE 1. Filtros: {filtros}")
+
+        if self.autenticador:
+            def cliente(renovar: bool = False):
+                if renovar or not self.headers_sesion: self.refrescar_sesion(progress_callback)
+                return _ClienteRequests(self._http(), self.headers_sesion)
+            todas_las_compras = self._recorrer_listado(cliente, progress_callback, filtros, max_paginas)
+        else:
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                try:
+                    with span("credenciales"): self._obtener_credenciales(p, progress_callback)
+                except Exception as e:
+                    logger.error(f"Fallo crítico obteniendo token: {e}")
+                    raise e
+
+                # CORRECCION 2: Usar MODO_HEADLESS también en Fase 1
+                browser = p.chromium.launch(headless=MODO_HEADLESS)
+                def cliente(renovar: bool = False):
+                    if renovar:
+                        with span("credenciales"): self._obtener_credenciales(p, progress_callback)
+                    return browser.new_context(extra_http_headers=self.headers_sesion).request
+                try:
+                    todas_las_compras = self._recorrer_listado(cliente, progress_callback, filtros, max_paginas)
+                finally:
+                    try: browser.close()
+                    except: pass
+
+        unicas = {c.get('codigo', c.get('id')): c for c in todas_las_compras if c.get('codigo', c.get('id'))}
+        return list(unicas.values())
+
+    def _recorrer_listado(self, cliente: Callable, progress_callback: Callable[[str], None], filtros: Optional[Dict], max_paginas: Optional[int]) -> List[Dict]:
+        """Pagina el listado. 'cliente(renovar)' entrega el cliente HTTP (con token nuevo si renovar=True)."""
         todas_las_compras = []
+        api_request = cliente()
+        try:
+            current_page = 1
+            total_paginas = 1
+            LIMIT_SAFETY_PAGES = 500 
 
-        with sync_playwright() as p:
-            try:
-                self._obtener_credenciales(p, progress_callback)
-            except Exception as e:
-                logger.error(f"Fallo crítico obteniendo token: {e}")
-                raise e
-            
-            # CORRECCION 2: Usar MODO_HEADLESS también en Fase 1
-            browser = p.chromium.launch(headless=MODO_HEADLESS)
-            context = browser.new_context(extra_http_headers=self.headers_sesion)
-            api_request = context.request 
+            while True:
+                if max_paginas and max_paginas > 0 and current_page > max_paginas:
+                    break
+                if current_page > total_paginas and total_paginas > 0:
+                    break
+                if current_page > LIMIT_SAFETY_PAGES:
+                    logger.warning("Se alcanzó el límite de seguridad de páginas.")
+                    break
 
-            try:
-                current_page = 1
-                total_paginas = 1
-                LIMIT_SAFETY_PAGES = 500 
+                progress_callback(f"Procesando página {current_page}...")
+                url = construir_url_api_listado(current_page, filtros)
+                with span("pagina", pagina=current_page):
+                    try:
+                        datos = self._ejecutar_peticion_api(api_request, url)
+                    except _TokenExpirado:
+                        # Token vencido a mitad del listado: se renueva una vez y se reintenta la página
+                        logger.warning(f"Token expirado en página {current_page}; renovando credenciales.")
+                        progress_callback("Token expirado. Renovando credenciales...")
+                        api_request = cliente(renovar=True)
+                        try: datos = self._ejecutar_peticion_api(api_request, url)
+                        except _TokenExpirado: datos = None
 
-                while True:
-                    if max_paginas and max_paginas > 0 and current_page > max_paginas:
-                        break
-                    if current_page > total_paginas and total_paginas > 0:
-                        break
-                    if current_page > LIMIT_SAFETY_PAGES:
-                        logger.warning("Se alcanzó el límite de seguridad de páginas.")
-                        break
+                if not datos:
+                    logger.error(f"Fallo en página {current_page}, deteniendo.")
+                    break
 
-                    progress_callback(f"Procesando página {current_page}...")
-                    url = construir_url_api_listado(current_page, filtros)
-                    datos = self._ejecutar_peticion_api(api_request, url)
-                    
-                    if not datos:
-                        logger.error(f"Fallo en página {current_page}, deteniendo.")
-                        break
+                meta = api_handler.extraer_metadata_paginacion(datos)
+                items = api_handler.extraer_resultados(datos)
 
-                    meta = api_handler.extraer_metadata_paginacion(datos)
-                    items = api_handler.extraer_resultados(datos)
-                    
-                    if current_page == 1:
-                        total_paginas = meta.get('pageCount', 0)
-                        logger.info(f"Total páginas encontradas: {total_paginas}")
-                        if total_paginas == 0:
-                            break
-                    
-                    todas_las_compras.extend(items)
-                    current_page += 1
-                    time.sleep(random.uniform(0.5, 1.0))
+                if current_page == 1:
+                    total_paginas = meta.get('pageCount', 0)
+                    logger.info(f"Total páginas encontradas: {total_paginas}")
+                    if total_paginas == 0:
+                        break
 
-            except Exception as e:
-                logger.critical(f"Error Fase 1: {e}")
-                raise e
-            finally:
-                try: browser.close()
-                except: pass
+                self._guardar_payloads(lambda almacen: almacen.guardar_listado(items))
+                todas_las_compras.extend(items)
+                current_page += 1
 
-        unicas = {c.get('codigo', c.get('id')): c for c in todas_las_compras if c.get('codigo', c.get('id'))}
-        return list(unicas.values())
+        except Exception as e:
+            logger.critical(f"Error Fase 1: {e}")
+            raise e
+        return todas_las_compras
 
-    def _fetch_api_con_requests(self, url: str) -> Optional[Dict]:
-        import requests
+    def _get_con_requests(self, url: str, cabeceras: Optional[Dict] = None, renovar_si_expira: bool = True):
+        """GET directo con el token de la sesión (lo renueva una vez si expiró). None si la petición falla."""
         try:
             headers = self.headers_sesion if self.headers_sesion else HEADERS_API
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            return None
+            for intento in range(1, MAX_RETRIES + 1):
+                response = self._peticion_limitada(lambda: self._http().get(url, headers={**headers, **(cabeceras or {})}, timeout=10), intento)
+                if response.status_code != 429: break  # Con 429 el limitador ya pausó hasta el Retry-After
+            if response.status_code == 401 and renovar_si_expira and self.headers_sesion:
+                logger.warning("Token expirado al descargar ficha; renovando credenciales.")
+                self.refrescar_sesion(lambda _msg: None)
+                return self._get_con_requests(url, cabeceras, renovar_si_expira=False)
+            return response
         except Exception as e:
             logger.error(f"Error request directo: {e}")
             return None
 
-    def scrape_ficha_detalle_api(self, page: Page, codigo_ca: str, progress_callback: Callable[[str], None]) -> Optional[Dict]:
+    def scrape_ficha_detalle_api(self, page: "Page", codigo_ca: str, progress_callback: Callable[[str], None],
+                                 condicional: bool = True) -> Tuple[Union[Dict, None, object], Optional[Validadores]]:
         """
-        Extrae el detalle completo de una ficha.
+        Extrae el detalle completo de una ficha: devuelve (ficha, validadores).
         CORREGIDO: Ahora extrae plazo_entrega y mapea correctamente el estado.
+        La respuesta cruda queda en el almacén de payloads antes de mapearla.
+        Con 'condicional' (y la ficha en la caché) la ficha es FICHA_SIN_CAMBIOS si el
+        servidor responde 304 o el cuerpo es idéntico al de la última descarga.
+        Los validadores no se guardan aquí: el ETL llama a confirmar_ficha después de
+        escribir la ficha en la BD, así una escritura interrumpida no deja la caché
+        diciendo "sin cambios" sobre una ficha que la BD no tiene.
         """
         url_api = construir_url_api_ficha(codigo_ca)
-        datos = self._fetch_api_con_requests(url_api)
-        
-        if datos and datos.get('success') == 'OK' and 'payload' in datos:
-            payload = datos['payload']
-            
-            # --- LÓGICA DE ESTADO ---
-            # A veces la API devuelve 'estado' como texto ("Desierta")
-            # y a veces usa 'estado_convocatoria' (int) o 'id_estado' (int).
-            # Priorizamos el texto que viene directamente si existe.
-            estado_texto = payload.get('estado')
-            if not estado_texto and payload.get('motivo_desierta'):
-                estado_texto = "Desierta"
-            
-            # Si el estado es "Publicada", verificamos si es 2do llamado por si acaso
-            if estado_texto == "Publicada" and payload.get('fecha_cierre_segundo_llamado'):
-                # (Opcional) Podríamos dejar solo "Publicada" y que la GUI decida mostrar "(2° Llamado)"
-                # pero para consistencia con tu reporte:
-                pass 
-
-            return {
-                'descripcion': payload.get('descripcion'),
-                'direccion_entrega': payload.get('direccion_entrega'),
-                'fecha_cierre_p1': payload.get('fecha_cierre_primer_llamado'),
-                'fecha_cierre_p2': payload.get('fecha_cierre_segundo_llamado'),
-                'productos_solicitados': payload.get('productos_solicitados', []),
-                
-                # CORRECCION 3: Usar el campo de texto directo para el estado
-                'estado': estado_texto, 
-                
-                'cantidad_provedores_cotizando': payload.get('cantidad_provedores_cotizando'),
-                
-                # CORRECCION 4: Asegurar extracción de estado_convocatoria (int)
-                'estado_convocatoria': payload.get('estado_convocatoria'),
-                
-                # CORRECCION 5: Extraer plazo de entrega
-                'plazo_entrega': payload.get('plazo_entrega') 
-            }
-        return None
+        previo = self.cache_fichas.obtener(codigo_ca) if (self.cache_fichas and condicional) else None
+        response = self._get_con_requests(url_api, previo.cabeceras() if previo else None)
+        if response is None: return None, None
+        if response.status_code == 304 and previo: return FICHA_SIN_CAMBIOS, None
+        if response.status_code != 200: return None, None
+
+        validadores = Validadores(response.headers.get("ETag"), response.headers.get("Last-Modified"), huella(response.content))
+        if previo and validadores.huella == previo.huella:
+            # El contenido ya está en la BD (previo solo existe tras una escritura confirmada)
+            if validadores != previo: self.cache_fichas.guardar(codigo_ca, validadores)
+            return FICHA_SIN_CAMBIOS, None
+        try:
+            with span("json"): datos = response.json()
+        except ValueError as e:
+            logger.error(f"Ficha {codigo_ca} con JSON inválido: {e}")
+            return None, None
+        if not (datos and datos.get('success') == 'OK'): return api_handler.mapear_ficha(datos), None
+        self._guardar_payloads(lambda almacen: almacen.guardar_ficha(codigo_ca, datos))
+        return api_handler.mapear_ficha(datos), validadores
+
+    def confirmar_ficha(self, codigo_ca: str, validadores: Optional[Validadores]):
+        """Guarda los validadores de una ficha ya escrita en la BD: la próxima petición será condicional."""
+        if self.cache_fichas and validadores: self.cache_fichas.guardar(codigo_ca, validadores)
+
+    def _guardar_payloads(self, guardar: Callable):
+        """Guarda en el almacén local; un fallo del almacén nunca detiene el scraping."""
+        if self.almacen is None: return
+        try:
+            with span("payloads"): guardar(self.almacen)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el payload crudo: {e}")
+
+    def _peticion_limitada(self, pedir: Callable, intento: int):
+        """Espera turno en el limitador, hace la petición y le informa la latencia y el estado (None si no hubo respuesta)."""
+        with span("limite"): self.limitador.adquirir()
+        response, inicio = None, time.perf_counter()
+        try:
+            with span("peticion", intento=intento):
+                response = pedir()
+            return response
+        finally:
+            estado = retry_after = None
+            if response is not None:
+                estado = getattr(response, "status", None) or response.status_code
+                cabeceras = getattr(response, "headers", None) or {}
+                retry_after = cabeceras.get("retry-after") or cabeceras.get("Retry-After")
+            self.limitador.registrar(time.perf_counter() - inicio, estado, retry_after)
 
     def _ejecutar_peticion_api(self, api_request, url):
+        # Sin pausas fijas entre intentos: el limitador baja la tasa ante errores y respeta el Retry-After de los 429
         for intento in range(1, MAX_RETRIES + 1):
             try:
-                response = api_request.get(url)
+                response = self._peticion_limitada(lambda: api_request.get(url), intento)
                 if response.ok:
-                    return response.json()
-                elif response.status == 429:
-                    time.sleep(DELAY_RETRY * 2)
+                    with span("json"): return response.json()
+                elif response.status == 401:
+                    raise _TokenExpirado()
+            except _TokenExpirado:
+                raise
             except Exception as e:
                 logger.debug(f"Error intento {intento}: {e}")
-            time.sleep(DELAY_RETRY)
         return None
\ No newline at end of file
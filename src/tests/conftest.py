@@ -58,4 +58,11 @@ def db_service(db_session):
     # Creamos un fake_factory
     fake_factory = lambda: db_session
     service = DbService(fake_factory)
-    return service
\ No newline at end of file
+    return service
+
+
+@pytest.fixture(autouse=True)
+def reportes_en_tmp(monkeypatch, tmp_path):
+    """Los reportes de ejecución (@con_reporte) se escriben en tmp_path, no en data/logs/runs."""
+    from src.utils import tracing
+    monkeypatch.setattr(tracing, "DIR_REPORTES", tmp_path / "runs")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del almacén de payloads crudos y del reproceso de fichas sin API.
+"""
+
+import os
+import time
+from datetime import datetime
+
+from src.db.db_models import CaLicitacion
+from src.logic.etl_service import EtlService
+from src.logic.score_engine import ScoreEngine
+from src.scraper import almacen_payloads
+from src.scraper.almacen_payloads import AlmacenPayloads
+
+
+def _ficha(descripcion, plazo=None):
+    return {"success": "OK", "payload": {"descripcion": descripcion, "estado": "Publicada", "plazo_entrega": plazo, "productos_solicitados": []}}
+
+
+class _ScraperSinApi:
+    def __init__(self, almacen): self.almacen = almacen
+
+
+def test_almacen_y_replay_de_fichas(db_service, db_session, tmp_path):
+    almacen = AlmacenPayloads(tmp_path)
+    assert almacen.guardar_listado([{"codigo": "A-1", "nombre": "Uno"}, {"codigo": "B-2", "nombre": "Dos"}, {"nombre": "sin código"}]) == 2
+    almacen.guardar_ficha("A-1", _ficha("vieja"))
+    almacen.guardar("ficha", [("A-1", _ficha("nueva", plazo=5))], obtenido_en=2e9)  # Más reciente
+    almacen.guardar_ficha("Z-9", _ficha("sin CA en la BD"))
+
+    assert almacen.ultimo("ficha", "A-1")["payload"]["descripcion"] == "nueva"
+    vigentes = {codigo: datos for codigo, _t, datos in almacen.iterar("ficha")}
+    assert set(vigentes) == {"A-1", "Z-9"} and vigentes["A-1"]["payload"]["plazo_entrega"] == 5
+    # Con rango, la vigente es la última dentro del rango
+    assert {c: d["payload"]["descripcion"] for c, _t, d in almacen.iterar("ficha", hasta=1.9e9)} == {"A-1": "vieja", "Z-9": "sin CA en la BD"}
+    assert almacen.estadisticas()["tipos"]["ficha"] == {"payloads": 3, "cas": 2}
+
+    db_session.add(CaLicitacion(codigo_ca="A-1", nombre="Uno")); db_session.commit()
+    etl = EtlService(db_service, _ScraperSinApi(almacen), ScoreEngine(db_service))
+    resumen = etl.run_replay_payloads(listado=False)
+    assert resumen == {"listado": 0, "fichas": 1, "fichas_sin_ca": 1}
+    licitacion = db_session.query(CaLicitacion).filter_by(codigo_ca="A-1").one()
+    assert licitacion.descripcion == "nueva" and licitacion.plazo_entrega == 5
+    almacen.cerrar()
+
+
+def test_purga_de_versiones_reemplazadas(tmp_path, monkeypatch):
+    ahora, dia = time.time(), 86400
+    class _Reloj:
+        @staticmethod
+        def now(): return datetime(2020, 1, 1)
+    monkeypatch.setattr(almacen_payloads, "datetime", _Reloj)  # Segmento viejo con otro nombre
+    viejo = AlmacenPayloads(tmp_path)
+    viejo.guardar("ficha", [("A-1", _ficha("vieja")), ("Z-9", _ficha("única"))], obtenido_en=ahora - 60 * dia)
+    viejo.cerrar()
+    [segmento_viejo] = tmp_path.glob("*.seg")
+    os.utime(segmento_viejo, (ahora - 60 * dia, ahora - 60 * dia))
+    monkeypatch.undo()
+
+    almacen = AlmacenPayloads(tmp_path)
+    almacen.guardar("ficha", [("A-1", _ficha("reciente"))], obtenido_en=ahora - 40 * dia)
+    almacen.guardar("ficha", [("A-1", _ficha("nueva"))], obtenido_en=ahora)
+    assert almacen.purgar(dias=30, ahora=ahora) == {"payloads": 2, "segmentos": 0}
+    # Las reemplazadas de A-1 se fueron; la única de Z-9 sigue aunque sea vieja (y con ella su segmento)
+    assert almacen.estadisticas()["tipos"]["ficha"] == {"payloads": 2, "cas": 2}
+    assert almacen.ultimo("ficha", "Z-9")["payload"]["descripcion"] == "única"
+
+    # Sin filas en el índice, el segmento viejo se borra
+    almacen.guardar("ficha", [("Z-9", _ficha("otra"))], obtenido_en=ahora)
+    assert almacen.purgar(dias=30, ahora=ahora) == {"payloads": 1, "segmentos": 1}
+    assert not segmento_viejo.exists() and almacen.ultimo("ficha", "A-1")["payload"]["descripcion"] == "nueva"
+    almacen.cerrar()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la búsqueda de texto completo (en SQLite usa el índice FTS5).
+"""
+
+from src.db.db_models import CaLicitacion, CaOrganismo, CaSector
+
+
+def _cargar_datos(db_session):
+    sector = CaSector(nombre="Salud")
+    db_session.add(sector); db_session.flush()
+    org = CaOrganismo(nombre="Hospital Regional de Concepción", sector_id=sector.sector_id)
+    db_session.add(org); db_session.flush()
+    cas = [
+        CaLicitacion(codigo_ca="1-1-COT", nombre="Compra de guantes quirúrgicos", organismo_id=org.organismo_id),
+        CaLicitacion(codigo_ca="2-2-COT", nombre="Servicio de aseo", descripcion="Incluye lavado de vehículos y camión"),
+        CaLicitacion(codigo_ca="3-3-COT", nombre="Insumos varios",
+                     productos_solicitados=[{"nombre": "Neumático", "descripcion": "Para camión aljibe"}]),
+    ]
+    db_session.add_all(cas); db_session.commit()
+    return {ca.codigo_ca: ca.ca_id for ca in cas}
+
+
+def test_busqueda_sin_acentos_y_por_prefijo(db_service, db_session):
+    ids = _cargar_datos(db_session)
+
+    # Sin acentos encuentra texto acentuado, y al revés
+    assert db_service.buscar_licitaciones_texto("concepcion") == [ids["1-1-COT"]]
+    assert db_service.buscar_licitaciones_texto("quirúrgico") == [ids["1-1-COT"]]
+    # Prefijo sobre descripción y productos
+    assert db_service.buscar_licitaciones_texto("neumat") == [ids["3-3-COT"]]
+    assert db_service.buscar_licitaciones_texto("vehic") == [ids["2-2-COT"]]
+    # Todos los términos deben aparecer
+    assert db_service.buscar_licitaciones_texto("camion aljibe") == [ids["3-3-COT"]]
+    assert db_service.buscar_licitaciones_texto("") == []
+
+
+def test_busqueda_se_actualiza_y_ordena_por_relevancia(db_service, db_session):
+    ids = _cargar_datos(db_session)
+    assert set(db_service.buscar_licitaciones_texto("camion")) == {ids["2-2-COT"], ids["3-3-COT"]}
+    # Para filtrar en memoria: todas las coincidencias, sin el tope del ranking
+    assert db_service.ids_coincidentes_texto("camion") == {ids["2-2-COT"], ids["3-3-COT"]}
+    assert len(db_service.buscar_licitaciones_texto("camion", limite=1)) == 1
+    assert db_service.ids_coincidentes_texto("") == set()
+
+    # Un acierto en el nombre pesa más que en descripción o productos
+    nueva = CaLicitacion(codigo_ca="4-4-COT", nombre="Arriendo de camión")
+    db_session.add(nueva); db_session.commit()
+    nueva_id = nueva.ca_id
+    assert db_service.buscar_licitaciones_texto("camion")[0] == nueva_id
+
+    db_session.delete(db_session.get(CaLicitacion, nueva_id)); db_session.commit()
+    assert nueva_id not in db_service.buscar_licitaciones_texto("camion")
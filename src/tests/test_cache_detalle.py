@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la caché LRU de detalles de DbService.
+"""
+
+from src.db import db_service as modulo_db
+from src.db.db_models import CaLicitacion
+
+
+def test_cache_detalle_e_invalidacion(db_service, db_session):
+    db_session.add_all([CaLicitacion(codigo_ca=f"C-{i}", nombre=f"CA {i}") for i in range(3)])
+    db_session.commit()
+    ids = [ca.ca_id for ca in db_session.query(CaLicitacion).order_by(CaLicitacion.ca_id)]
+
+    assert db_service.detalle_en_cache(ids[0]) is None
+    primera = db_service.get_licitacion_by_id(ids[0])
+    assert db_service.get_licitacion_by_id(ids[0]) is primera
+
+    # Precarga en lote: solo trae lo que falta
+    assert db_service.precargar_detalles(ids) == 2
+    assert db_service.precargar_detalles(ids) == 0
+
+    # Una escritura de seguimiento descarta solo esa CA
+    db_service.agregar_nota(ids[1], "revisar")
+    assert db_service.detalle_en_cache(ids[1]) is None
+    assert db_service.detalle_en_cache(ids[0]) is primera
+    assert db_service.get_licitacion_by_id(ids[1]).seguimiento.notas == "revisar"
+
+    # Un cambio masivo vacía la caché
+    db_service.actualizar_puntajes_fase_1_en_lote([(ids[0], 7)])
+    assert db_service.detalle_en_cache(ids[0]) is None
+
+
+def test_cache_detalle_lru(db_service, db_session, monkeypatch):
+    monkeypatch.setattr(modulo_db, "TAMANO_CACHE_DETALLE", 2)
+    db_session.add_all([CaLicitacion(codigo_ca=f"L-{i}", nombre=f"CA {i}") for i in range(3)])
+    db_session.commit()
+    a, b, c = [ca.ca_id for ca in db_session.query(CaLicitacion).order_by(CaLicitacion.ca_id)]
+
+    db_service.get_licitacion_by_id(a); db_service.get_licitacion_by_id(b)
+    db_service.detalle_en_cache(a)  # 'a' pasa a ser la más reciente
+    db_service.get_licitacion_by_id(c)
+    assert db_service.detalle_en_cache(b) is None
+    assert db_service.detalle_en_cache(a) is not None and db_service.detalle_en_cache(c) is not None
+
+
+def test_lectura_concurrente_con_invalidacion_no_se_guarda(db_service, db_session, monkeypatch):
+    db_session.add_all([CaLicitacion(codigo_ca=f"G-{i}", nombre=f"CA {i}") for i in range(2)])
+    db_session.commit()
+    a, b = [ca.ca_id for ca in db_session.query(CaLicitacion).order_by(CaLicitacion.ca_id)]
+
+    # Otra escritura invalida mientras se consulta: lo leído puede ser anterior al cambio
+    sesion_original = db_service._sesion
+    def sesion_con_escritura():
+        db_service.invalidar_detalle(a)
+        return sesion_original()
+    monkeypatch.setattr(db_service, "_sesion", sesion_con_escritura)
+    assert db_service.get_licitacion_by_id(a) is not None
+    assert db_service.precargar_detalles([a, b]) == 2
+    assert db_service.detalle_en_cache(a) is None and db_service.detalle_en_cache(b) is None
+
+    monkeypatch.setattr(db_service, "_sesion", sesion_original)
+    assert db_service.precargar_detalles([a, b]) == 2 and db_service.detalle_en_cache(a) is not None
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de las peticiones condicionales de fichas (ETag / hash del cuerpo).
+"""
+
+import json
+
+from src.scraper.almacen_payloads import AlmacenPayloads
+from src.scraper.cache_http import CacheFichas
+from src.scraper.rate_limiter import LimitadorAdaptativo
+from src.scraper.scraper_service import FICHA_SIN_CAMBIOS, ScraperService
+
+
+class _Respuesta:
+    def __init__(self, estado, cuerpo=None, headers=None):
+        self.status_code, self.headers = estado, headers or {}
+        self.content = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else b""
+        self.json = lambda: json.loads(self.content)
+
+
+class _SesionFalsa:
+    """Responde con ETag si 'etag' y 304 cuando llega el mismo If-None-Match."""
+    def __init__(self, etag):
+        self.etag, self.cuerpo, self.pedidas = etag, {"success": "OK", "payload": {"descripcion": "v1"}}, []
+
+    def get(self, url, headers, timeout):
+        self.pedidas.append(headers)
+        if self.etag and headers.get("If-None-Match") == self.etag: return _Respuesta(304)
+        return _Respuesta(200, self.cuerpo, {"ETag": self.etag} if self.etag else {})
+
+
+def test_ficha_condicional_por_etag_y_por_hash(tmp_path):
+    for etag in ('"abc"', None):
+        scraper = ScraperService(almacen=AlmacenPayloads(tmp_path / str(bool(etag))), cache=CacheFichas(tmp_path / f"{bool(etag)}.sqlite"),
+                                 limitador_tasa=LimitadorAdaptativo(tasa_inicial=1000, tasa_max=1000))
+        scraper._sesion_http = sesion = _SesionFalsa(etag)
+
+        ficha, validadores = scraper.scrape_ficha_detalle_api(None, "A-1", print)
+        assert ficha["descripcion"] == "v1"
+        # Sin confirmar (p. ej. el proceso murió antes de escribir en la BD) la descarga sigue siendo completa
+        assert scraper.scrape_ficha_detalle_api(None, "A-1", print)[0]["descripcion"] == "v1"
+        assert "If-None-Match" not in sesion.pedidas[-1]
+        scraper.confirmar_ficha("A-1", validadores)
+        assert scraper.scrape_ficha_detalle_api(None, "A-1", print) == (FICHA_SIN_CAMBIOS, None)
+        assert ("If-None-Match" in sesion.pedidas[-1]) == bool(etag)
+        assert scraper.scrape_ficha_detalle_api(None, "A-1", print, condicional=False)[0]["descripcion"] == "v1"
+
+        sesion.cuerpo = {"success": "OK", "payload": {"descripcion": "v2"}}; sesion.etag = etag and '"def"'
+        ficha, validadores = scraper.scrape_ficha_detalle_api(None, "A-1", print)
+        assert ficha["descripcion"] == "v2" and validadores.etag == sesion.etag
+        assert scraper.almacen.estadisticas()["tipos"]["ficha"]["payloads"] == 4  # Las respuestas sin cambios no se guardan
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de ProcesoEtl: protocolo con el proceso hijo ('spawn'), errores y cancelación.
+El hijo corre el _proceso_hijo real con un EtlService de prueba en lugar del verdadero.
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from src.logic import etl_proceso
+from src.logic.etl_proceso import ProcesoEtl
+from src.utils.exceptions import EtlCanceladoError
+
+
+class _ErrorNoSerializable(Exception):
+    def __init__(self, mensaje):
+        super().__init__(mensaje)
+        self.lock = threading.Lock()  # pickle no puede con esto
+
+
+class _EtlDePrueba:
+    def run_fase2_update(self, progress_callback_text, progress_callback_percent, escenario):
+        progress_callback_text("inicio")
+        if escenario == "ok":
+            progress_callback_percent(50)
+            return {"fichas": 3}
+        if escenario == "error": raise ValueError("ficha inválida")
+        if escenario == "no_serializable": raise _ErrorNoSerializable("con lock")
+        if escenario == "avanza":
+            # Cada avance revisa la cancelación
+            for i in range(600): progress_callback_percent(i % 100); time.sleep(0.05)
+        if escenario in ("colgado", "ignora_sigterm"):
+            if escenario == "ignora_sigterm": signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            progress_callback_text("colgado")
+            time.sleep(60)  # Sin avances: nunca ve la cancelación
+
+
+def _hijo_de_prueba(*args):
+    """Se ejecuta en el hijo: reemplaza la fábrica de servicios y sigue como _proceso_hijo."""
+    servicios = types.ModuleType("src.logic.servicios")
+    servicios.crear_etl_service = _EtlDePrueba
+    sys.modules["src.logic.servicios"] = servicios
+    etl_proceso._proceso_hijo(*args)
+
+
+@pytest.fixture
+def proceso_de_prueba(monkeypatch):
+    monkeypatch.setattr(etl_proceso, "_proceso_hijo", _hijo_de_prueba)
+    monkeypatch.setattr(etl_proceso, "PLAZO_CANCELACION_S", 0.5)
+    monkeypatch.setattr(etl_proceso, "PLAZO_TERMINAR_S", 0.5)
+    return lambda escenario: ProcesoEtl("run_fase2_update", escenario=escenario)
+
+
+def test_resultado_y_avance(proceso_de_prueba):
+    proceso, textos, porcentajes = proceso_de_prueba("ok"), [], []
+    assert proceso.ejecutar(textos.append, porcentajes.append) == {"fichas": 3}
+    assert textos == ["inicio"] and porcentajes == [50]
+    assert not proceso.en_curso and proceso._proceso.exitcode == 0
+
+
+def test_error_del_hijo(proceso_de_prueba):
+    with pytest.raises(ValueError, match="ficha inválida"):
+        proceso_de_prueba("error").ejecutar()
+
+
+def test_error_no_serializable_llega_como_runtime_error(proceso_de_prueba):
+    with pytest.raises(RuntimeError, match="_ErrorNoSerializable: con lock"):
+        proceso_de_prueba("no_serializable").ejecutar()
+
+
+def test_cancelacion_en_el_siguiente_avance(proceso_de_prueba):
+    proceso = proceso_de_prueba("avanza")
+    inicio = time.monotonic()
+    with pytest.raises(EtlCanceladoError):
+        proceso.ejecutar(lambda _msg: proceso.cancelar())
+    # El hijo terminó por su cuenta, antes del plazo para detenerlo
+    assert proceso._proceso.exitcode == 0 and time.monotonic() - inicio < 10
+
+
+@pytest.mark.parametrize("escenario, senal", [("colgado", "SIGTERM"), ("ignora_sigterm", "SIGKILL")])
+def test_hijo_colgado_se_detiene_tras_el_plazo(proceso_de_prueba, escenario, senal):
+    proceso = proceso_de_prueba(escenario)
+    avisos = []
+    def al_avanzar(msg):
+        avisos.append(msg)
+        if msg == "colgado": proceso.cancelar()
+
+    with pytest.raises(EtlCanceladoError, match="proceso detenido"):
+        proceso.ejecutar(al_avanzar)
+    assert avisos == ["inicio", "colgado"] and not proceso.en_curso
+    # terminate() primero; kill() si el hijo lo ignora
+    if os.name == "posix": assert proceso._proceso.exitcode == -getattr(signal, senal)
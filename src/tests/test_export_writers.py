@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de los formatos de exportación (CSV comprimido, Parquet y dependencias opcionales).
+"""
+
+import gzip
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+from sqlalchemy import update
+
+from src.db.db_models import CaLicitacion
+from src.logic.export_writers import guardar_dataframes, importar_opcional
+from src.utils.exceptions import DependenciaOpcionalError
+
+
+def test_csv_gz_y_parquet(tmp_path):
+    df = pd.DataFrame({"Score": pd.array([10, None], dtype="Int64"), "Nombre": ["Guantes", "Ñandú"]})
+
+    assert guardar_dataframes({"Hoja": df}, "csv_gz", "Reporte", tmp_path) == str(tmp_path)
+    with gzip.open(tmp_path / "Reporte_Hoja.csv.gz", "rt", encoding="utf-8") as f:
+        assert f.read().splitlines() == ["Score,Nombre", "10,Guantes", ",Ñandú"]
+
+    pytest.importorskip("pyarrow")
+    guardar_dataframes({"Hoja": df}, "parquet", "Reporte", tmp_path)
+    leido = pd.read_parquet(tmp_path / "Reporte_Hoja.parquet")
+    assert leido["Nombre"].tolist() == ["Guantes", "Ñandú"]
+    assert str(leido["Score"].dtype) == "Int64"
+
+
+def test_dependencia_opcional_faltante():
+    with pytest.raises(DependenciaOpcionalError, match="pip install paquete_que_no_existe"):
+        importar_opcional("paquete_que_no_existe.sub", "parquet")
+
+
+def test_reporte_pestañas_desde_columnas(db_service, db_session):
+    from src.logic.excel_service import ExcelService
+    cierre = datetime(2025, 1, 2, 12, tzinfo=timezone(timedelta(hours=-3)))
+    db_service.insertar_o_actualizar_licitaciones_raw([
+        {"codigo": "E-1", "nombre": "Guantes", "organismo": "Hospital", "estado": "Publicada", "fecha_cierre": cierre},
+        {"codigo": "E-2", "nombre": "Mesas", "organismo": "Hospital", "estado": "Publicada"},
+    ])
+    db_session.execute(update(CaLicitacion).where(CaLicitacion.codigo_ca == "E-1").values(productos_solicitados=[{"nombre": "Ñandú"}]))
+    db_session.commit()
+    ca_id = db_session.query(CaLicitacion.ca_id).filter_by(codigo_ca="E-2").scalar()
+    db_service.gestionar_favorito(ca_id, True)
+
+    dfs = ExcelService(db_service)._leer_datos_pestañas()
+    candidatas, seguimiento = dfs["Candidatas"], dfs["Seguimiento"]
+    assert candidatas["Código CA"].tolist() == ["E-1"] and seguimiento["Código CA"].tolist() == ["E-2"]
+    assert candidatas["Productos"][0] == '[{"nombre": "Ñandú"}]' and pd.isna(seguimiento["Productos"][0])
+    assert candidatas["Fecha Cierre"][0] == pd.Timestamp("2025-01-02 12:00")
+    assert seguimiento["Favorito"][0] and not candidatas["Favorito"][0]
+    assert candidatas["Organismo"][0] == "Hospital"
+    assert dfs["Ofertadas"].empty and list(dfs["Ofertadas"].columns) == list(candidatas.columns)
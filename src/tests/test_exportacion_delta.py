@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la marca 'actualizado_en' que usa la exportación incremental.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from src.db.db_models import CaLicitacion
+
+
+def _marca(db_session, codigo):
+    db_session.expire_all()
+    return db_session.query(CaLicitacion).filter_by(codigo_ca=codigo).one().actualizado_en
+
+
+def test_actualizado_en_solo_cambia_con_cambios_reales(db_service, db_session):
+    compra = {"codigo": "D-1", "nombre": "Guantes", "organismo": "Hospital", "estado": "Publicada", "monto_disponible_CLP": 1000}
+    db_service.insertar_o_actualizar_licitaciones_raw([compra])
+    assert _marca(db_session, "D-1") is not None
+
+    # Se retrocede la marca para distinguir si los pasos siguientes la tocan
+    antigua = datetime(2020, 1, 1)
+    db_session.execute(update(CaLicitacion).values(puntaje_detalle=["Sin detalle"], actualizado_en=antigua)); db_session.commit()
+    ca_id = db_session.query(CaLicitacion.ca_id).filter_by(codigo_ca="D-1").scalar()
+
+    # Mismo contenido: ni el upsert ni el recálculo la marcan como cambiada
+    db_service.insertar_o_actualizar_licitaciones_raw([compra])
+    db_service.actualizar_puntajes_fase_1_en_lote([(ca_id, 0, ["Sin detalle"])])
+    assert _marca(db_session, "D-1") == antigua
+
+    # Un cambio real sí la actualiza
+    db_service.insertar_o_actualizar_licitaciones_raw([{**compra, "estado": "Cerrada"}])
+    assert _marca(db_session, "D-1") > antigua + timedelta(days=1)
+
+    db_session.execute(update(CaLicitacion).values(actualizado_en=antigua)); db_session.commit()
+    db_service.actualizar_puntajes_fase_1_en_lote([(ca_id, 15, ["Keyword: guantes"])])
+    assert _marca(db_session, "D-1") > antigua + timedelta(days=1)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del filtrado por claves precalculadas de LicitacionProxyModel.
+"""
+
+import itertools
+from datetime import date, datetime
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QStandardItem, QStandardItemModel
+
+from src.gui.gui_models import (
+    SCORE_ILEGIBLE, LicitacionProxyModel, crear_parametros_filtro, es_refinamiento, filas_que_cumplen
+)
+
+# (nombre, puntaje mostrado, monto, estado, estado_convocatoria, publicación, cierre, ca_id)
+FILAS = [
+    ("Compra de guantes", 20, 500000, "Publicada", 2, date(2025, 1, 10), datetime(2025, 1, 20, 15, 0), 1),
+    ("Servicio de aseo", 0, 50000, "Cerrada", 1, datetime(2025, 1, 5, 9, 30), date(2025, 1, 25), 2),
+    ("Guantes quirúrgicos", "s/i", "no es monto", "Publicada", 0, None, None, 3),
+    ("Sillas", None, None, "Desierta", None, date(2025, 2, 1), datetime(2025, 2, 10, 8, 0), 4),
+    ("Mesas y sillas", 7, 150000, "Cerrada", 2, date(2025, 1, 20), None, 5),
+]
+
+
+def _modelo(filas=FILAS):
+    modelo = QStandardItemModel(0, 8)
+    for nombre, score, monto, estado, estado_id, pub, cierre, ca_id in filas:
+        items = [QStandardItem() for _ in range(8)]
+        items[0].setData(score, Qt.DisplayRole); items[0].setData(ca_id, Qt.UserRole + 1)
+        items[1].setData(nombre, Qt.UserRole)
+        items[3].setData(estado_id, Qt.UserRole); items[3].setData(estado, Qt.UserRole + 2)
+        items[4].setData(pub, Qt.UserRole)
+        items[5].setData(cierre, Qt.UserRole)
+        items[6].setData(monto, Qt.UserRole)
+        modelo.appendRow(items)
+    return modelo
+
+
+def _proxy(filas=FILAS):
+    proxy = LicitacionProxyModel()
+    proxy.setSourceModel(_modelo(filas))
+    return proxy
+
+
+def _acepta_como_antes(fila, p):
+    """Semántica del filterAcceptsRow original, que leía el modelo fila a fila."""
+    nombre, score, monto, estado, estado_id, pub, cierre, _ca_id = fila
+    if not p["show_zeros"]:
+        try:
+            if int(score or 0) == 0: return False
+        except (TypeError, ValueError): pass
+    if p["texto"] and p["texto"] not in str(nombre or "").lower(): return False
+    if p["estados"] and estado not in p["estados"]: return False
+    if p["2do_llamado"] and int(estado_id or 0) != 2: return False
+    if p["monto"] > 0:
+        try:
+            if float(monto or 0) < p["monto"]: return False
+        except (TypeError, ValueError): return False
+    for valor, desde, hasta in ((pub, p["pub_from"], p["pub_to"]), (cierre, p["close_from"], p["close_to"])):
+        if desde or hasta:
+            if not valor: return False
+            d = valor.date() if isinstance(valor, datetime) else valor
+            if (desde and d < desde) or (hasta and d > hasta): return False
+    return True
+
+
+def test_equivale_al_filtro_original():
+    proxy = _proxy()
+    combinaciones = itertools.product(
+        ("", "guantes", "sillas"), (0, 100000), (False, True), (False, True), ((), ("Publicada",), ("Cerrada", "Desierta")),
+        ((None, None), (date(2025, 1, 6), date(2025, 1, 20))), ((None, None), (date(2025, 1, 20), date(2025, 1, 20))))
+    for texto, monto, ceros, segundo, estados, (p_desde, p_hasta), (c_desde, c_hasta) in combinaciones:
+        params = crear_parametros_filtro(texto, monto, ceros, segundo, estados, p_desde, p_hasta, c_desde, c_hasta)
+        esperado = [i for i, fila in enumerate(FILAS) if _acepta_como_antes(fila, params)]
+        assert filas_que_cumplen(proxy._claves(), params) == esperado, params
+
+
+def test_puntaje_ilegible_no_se_oculta_como_cero():
+    proxy = _proxy()
+    assert proxy._k_score[2] == SCORE_ILEGIBLE and proxy._k_score[3] == 0  # "s/i" vs sin puntaje
+    visibles = filas_que_cumplen(proxy._claves(), crear_parametros_filtro(show_zeros=False))
+    assert visibles == [0, 2, 4]
+
+
+def test_filtros_de_fecha_y_estado():
+    claves = _proxy()._claves()
+    def filas(**kwargs): return filas_que_cumplen(claves, crear_parametros_filtro(show_zeros=True, **kwargs))
+    # Las fechas con hora se comparan por día; sin fecha, la fila queda fuera del rango
+    assert filas(pub_from=date(2025, 1, 5), pub_to=date(2025, 1, 5)) == [1]
+    assert filas(close_from=date(2025, 1, 20), close_to=date(2025, 1, 20)) == [0]
+    assert filas(close_to=date(2025, 1, 31)) == [0, 1]
+    assert filas(pub_from=date(2025, 1, 15)) == [3, 4]
+    assert filas(estados=("Cerrada",)) == [1, 4]
+    assert filas(estados=("Cerrada",), segundo_llamado=True) == [4]
+
+
+def test_es_refinamiento():
+    base = crear_parametros_filtro("gua", estados=("Publicada", "Cerrada"), pub_from=date(2025, 1, 1))
+    assert es_refinamiento(base, crear_parametros_filtro("guan", estados=("Publicada",), pub_from=date(2025, 1, 2)))
+    assert es_refinamiento(base, crear_parametros_filtro("gua", 1000, estados=("Cerrada",), pub_from=date(2025, 1, 1)))
+    assert not es_refinamiento(None, base)
+    assert not es_refinamiento(base, crear_parametros_filtro("gu", estados=("Publicada",), pub_from=date(2025, 1, 1)))
+    assert not es_refinamiento(base, crear_parametros_filtro("gua", show_zeros=True, estados=("Publicada",), pub_from=date(2025, 1, 1)))
+    assert not es_refinamiento(base, crear_parametros_filtro("gua", pub_from=date(2025, 1, 1)))  # Quita el filtro de estado
+    assert not es_refinamiento(base, crear_parametros_filtro("gua", estados=("Publicada",)))  # Quita la fecha
+    # Búsqueda de texto completo (por prefijo): una palabra más corta o distinta no refina
+    completo = crear_parametros_filtro("guantes")
+    assert es_refinamiento(completo, crear_parametros_filtro("guantesx"))
+    assert not es_refinamiento(completo, crear_parametros_filtro("sillas guantes"))
+
+
+def test_refinamiento_solo_revisa_filas_visibles():
+    proxy = _proxy()
+    proxy.aplicar_filtrado(proxy.calcular_filas(proxy.preparar_filtrado(crear_parametros_filtro(show_zeros=True, estados=("Publicada", "Cerrada")))))
+    assert proxy._ultimo_resultado[2] == [0, 1, 2, 4]
+
+    trabajo = proxy.preparar_filtrado(crear_parametros_filtro(monto=100000, show_zeros=True, estados=("Cerrada",)))
+    assert trabajo["candidatas"] == [0, 1, 2, 4]  # La 3 (Desierta) ni se revisa
+    assert proxy.calcular_filas(trabajo)["filas"] == filas_que_cumplen(proxy._claves(), trabajo["params"]) == [4]
+
+    # Si las claves cambian, el resultado anterior ya no sirve para refinar
+    proxy.sourceModel().removeRow(0)
+    trabajo = proxy.preparar_filtrado(crear_parametros_filtro(monto=200000, show_zeros=True, estados=("Cerrada",)))
+    assert trabajo["candidatas"] is None
@@ -0,0 +1,46 @@
+import gzip
+import logging
+
+from src.utils import logger as modulo_logger
+from src.utils.logger import ArchivoRotativo, configurar_niveles
+
+
+def _registro(mensaje, creado=None):
+    registro = logging.LogRecord("prueba", logging.INFO, __file__, 1, mensaje, None, None)
+    if creado is not None: registro.created = creado
+    return registro
+
+
+def test_rotacion_por_tamano_y_dia(tmp_path):
+    archivo = ArchivoRotativo(tmp_path / "app.log", max_bytes=200, max_archivos=2)
+    for n in range(12): archivo.handle(_registro(f"linea {n} " + "x" * 40))
+    archivo.handle(_registro("manana", creado=archivo._proxima_rotacion + 1))  # Cambio de día
+    archivo.close()
+
+    rotados = sorted(tmp_path.glob("app.log.*.gz"))
+    assert len(rotados) == 2  # Solo se conservan max_archivos
+    assert gzip.decompress(rotados[-1].read_bytes()).decode("utf-8").startswith("linea")
+    assert (tmp_path / "app.log").read_text(encoding="utf-8").strip() == "manana"
+
+
+def test_niveles_por_modulo():
+    try:
+        assert configurar_niveles("src.scraper=info; sql_lenta=WARNING, malo=NADA") == {"src.scraper": logging.INFO, "sql_lenta": logging.WARNING}
+        assert not logging.getLogger("src.scraper.scraper_service").isEnabledFor(logging.DEBUG)
+        configurar_niveles({"sql_lenta": "ERROR"})
+        assert logging.getLogger("src.scraper").level == logging.NOTSET  # Vuelve a heredar
+        assert modulo_logger.niveles() == {"sql_lenta": "ERROR"}
+    finally:
+        configurar_niveles("")
+
+
+def _sin_archivo_propio():
+    return modulo_logger.archivo_handler is None
+
+
+def test_app_log_solo_en_proceso_principal():
+    import multiprocessing
+    assert modulo_logger.archivo_handler.baseFilename.endswith(modulo_logger.ARCHIVO_LOG)
+    # Un hijo (p. ej. del pool de exportación) no toca app.log hasta elegir su archivo
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        assert pool.apply(_sin_archivo_propio) is True
@@ -0,0 +1,34 @@
+import logging
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.db.db_models import Base
+from src.db.db_service import DbService
+from src.utils import metricas_sql
+from src.utils.metricas_sql import accion, instrumentar, normalizar_sentencia
+
+
+def test_llamador_lentas_y_n_mas_1(monkeypatch, caplog):
+    # Engine propio: los eventos quedan registrados en él y no deben afectar a otras pruebas
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(metricas_sql, "metricas", metricas_sql.MetricasSql())
+    instrumentar(engine, umbral_lenta_ms=0, repeticiones_n_mas_1=3)
+    db = DbService(sessionmaker(bind=engine))
+
+    with caplog.at_level(logging.WARNING):
+        with accion("abrir_config") as actual:
+            for _ in range(4): db.get_all_keywords()
+
+    metodos = dict(metricas_sql.metricas.por_metodo)
+    assert metodos["DbService.get_all_keywords"][0] == 4
+    assert sum(actual.sentencias.values()) == 4
+    assert metricas_sql.metricas.por_accion["abrir_config"][3] == 1
+    mensajes = [r.getMessage() for r in caplog.records]
+    assert any("Posible N+1 en 'abrir_config'" in m for m in mensajes)
+    assert sum("DbService.get_all_keywords" in m for m in mensajes if r"N+1" not in m) == 4  # log de lentas (umbral 0)
+    assert "DbService.get_all_keywords" in metricas_sql.formatear_reporte()
+    assert normalizar_sentencia("SELECT *\n FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?...)"
+    assert normalizar_sentencia("INSERT INTO t VALUES " + ", ".join(["(?, ?)"] * 10_000)).startswith("INSERT INTO t VALUES (?...), (?...)")
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de filtros en BD y paginación por keyset de las pestañas.
+"""
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from src.db.db_models import CaLicitacion, CaSeguimiento
+
+
+def test_filtros_en_bd(db_service, db_session):
+    db_session.add_all([
+        CaLicitacion(codigo_ca="A", nombre="Compra de Guantes", puntuacion_final=20, monto_clp=500000,
+                     estado_ca_texto="Publicada", estado_convocatoria=2, fecha_publicacion=date(2025, 1, 10),
+                     fecha_cierre=datetime(2025, 1, 20, 15, 0)),
+        CaLicitacion(codigo_ca="B", nombre="Servicio 100%_aseo", puntuacion_final=10, monto_clp=50000,
+                     estado_ca_texto="Cerrada", fecha_publicacion=date(2025, 1, 5)),
+        CaLicitacion(codigo_ca="C", nombre="Sin puntaje", puntuacion_final=0, monto_clp=900000),
+    ])
+    db_session.commit()
+
+    def codigos(filter_state=None, texto=""):
+        filas, total, _ = db_service.obtener_pagina_tab("tab1", filter_state, texto, umbral_minimo=0)
+        assert total == len(filas)
+        return [f.codigo_ca for f in filas]
+
+    assert codigos() == ["A", "B"]
+    assert codigos({"show_zeros": True}) == ["A", "B", "C"]
+    assert codigos({"monto": 100000}) == ["A"]
+    assert codigos({"selected_states": ["Cerrada"]}) == ["B"]
+    assert codigos({"2do_llamado": True}) == ["A"]
+    assert codigos({"pub_from": date(2025, 1, 6), "pub_to": date(2025, 1, 10)}) == ["A"]
+    # 'close_to' incluye todo el día
+    assert codigos({"close_from": date(2025, 1, 20), "close_to": date(2025, 1, 20)}) == ["A"]
+    assert codigos(texto="GUANT") == ["A"]
+    # Los comodines de LIKE se buscan literalmente
+    assert codigos(texto="%_") == ["B"]
+
+
+def test_paginacion_keyset(db_service, db_session):
+    base = datetime(2025, 3, 1, 12, 0)
+    db_session.add_all(
+        [CaLicitacion(codigo_ca=f"T1-{i}", nombre="x", puntuacion_final=10 + i % 3) for i in range(7)]
+        + [CaLicitacion(codigo_ca=f"T3-{i}", nombre="y", puntuacion_final=10,
+                        fecha_cierre=base + timedelta(days=i % 2) if i < 4 else None) for i in range(6)]
+    )
+    db_session.commit()
+    # Las T3 pasan a seguimiento (fuera de candidatas)
+    for ca_id in db_session.scalars(select(CaLicitacion.ca_id).where(CaLicitacion.codigo_ca.like("T3-%"))):
+        db_session.add(CaSeguimiento(ca_id=ca_id, es_favorito=True))
+    db_session.commit()
+
+    def recorrer(tab):
+        vistos, cursor = [], None
+        while True:
+            filas, total, cursor = db_service.obtener_pagina_tab(tab, cursor=cursor, limite=2)
+            vistos += filas
+            if cursor is None: return vistos, total
+
+    filas, total = recorrer("tab1")
+    assert total == 7 and len({f.ca_id for f in filas}) == 7
+    assert [f.puntuacion_final for f in filas] == sorted((f.puntuacion_final for f in filas), reverse=True)
+
+    filas, total = recorrer("tab3")
+    assert total == 6 and len({f.ca_id for f in filas}) == 6
+    cierres = [f.fecha_cierre for f in filas]
+    assert cierres[4:] == [None, None] and cierres[:4] == sorted(cierres[:4])
+
+
+def test_filtro_texto_sin_tope_del_ranking(db_service, db_session):
+    db_session.add_all([CaLicitacion(codigo_ca=f"X-{i}", nombre="Otro", descripcion="neumáticos", puntuacion_final=10)
+                        for i in range(5)])
+    db_session.commit()
+    # El ranking se corta en 'limite', pero el filtro usa todas las coincidencias
+    assert len(db_service.buscar_licitaciones_texto("neumat", limite=2)) == 2
+    filas, total, _ = db_service.obtener_pagina_tab("tab1", None, "neumat", umbral_minimo=0)
+    assert total == 5 and len(filas) == 5
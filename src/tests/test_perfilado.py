@@ -0,0 +1,29 @@
+import json
+import pstats
+import time
+
+from src.utils import perfilado
+
+
+def test_perfiles_por_modo(monkeypatch, tmp_path):
+    monkeypatch.setattr(perfilado, "DIR_PERFILES", tmp_path)
+    monkeypatch.setattr(perfilado, "UMBRAL_MIN_MS", 0)
+    monkeypatch.setattr(perfilado, "_estado", {"activo": False, "modo": "cprofile"})
+
+    @perfilado.perfilado("lenta")
+    def lenta(): time.sleep(0.05); return 1
+
+    assert lenta() == 1 and not list(tmp_path.iterdir())  # Inactivo: no deja archivos
+
+    perfilado.configurar(True, "cprofile")
+    lenta()
+    (archivo,) = tmp_path.glob("*_lenta_*ms.pstats")
+    assert any(f[2] == "lenta" for f in pstats.Stats(str(archivo)).stats)
+
+    perfilado.configurar(True, "muestreo")
+    lenta()
+    (archivo,) = tmp_path.glob("*_lenta_*ms.speedscope.json")
+    datos = json.loads(archivo.read_text(encoding="utf-8"))
+    perfil = datos["profiles"][0]
+    assert perfil["type"] == "sampled" and perfil["samples"] and len(perfil["samples"]) == len(perfil["weights"])
+    assert any(f["name"].endswith("lenta") for f in datos["shared"]["frames"])
@@ -0,0 +1,87 @@
+import datetime
+import threading
+
+from src.db.db_models import CaTareaProgramada
+from src.logic.planificador import Planificador
+
+AHORA = datetime.datetime(2025, 11, 20, 12, 0)
+
+
+def _crear_tarea(db_service, nombre, hora="08:00", **kwargs):
+    tarea_id = db_service.guardar_tarea_programada(nombre, kwargs.pop("tipo", "prueba"), hora, **kwargs)
+    # Simula que el último horario atendido fue hace dos días (la app estuvo cerrada)
+    with db_service.session_factory() as session:
+        session.get(CaTareaProgramada, tarea_id).ultimo_horario = AHORA - datetime.timedelta(days=2)
+        session.commit()
+    return tarea_id
+
+
+def test_recupera_una_sola_vez_y_registra_metricas(db_service):
+    _crear_tarea(db_service, "extraccion", tipo="ok")
+    _crear_tarea(db_service, "falla", tipo="falla")
+    llamadas = []
+    def falla(p): raise RuntimeError("sin conexión")
+    planificador = Planificador(db_service, {"ok": lambda p: llamadas.append(p) or [1, 2, 3], "falla": falla}, reloj=lambda: AHORA)
+
+    planificador.revisar()
+    assert planificador.esperar_inactivo(timeout=5)
+    planificador.revisar()  # El horario ya quedó atendido: no se repite
+    assert planificador.esperar_inactivo(timeout=5)
+    planificador.detener(esperar=True)
+
+    historial = {e["tarea"]: e for e in db_service.obtener_historial_ejecuciones()}
+    assert len(llamadas) == 1 and len(historial) == 2
+    ok, error = historial["extraccion"], historial["falla"]
+    assert ok["origen"] == "recuperada" and ok["estado"] == "ok"
+    assert ok["programada_para"] == datetime.datetime(2025, 11, 20, 8, 0).astimezone()
+    assert ok["resultado"] == {"cantidad": 3} and ok["duracion_s"] is not None and ok["espera_s"] >= 0
+    assert error["estado"] == "error" and "sin conexión" in error["error"]
+
+
+def test_horario_perdido_sin_recuperacion_se_omite(db_service):
+    _crear_tarea(db_service, "actualizacion", recuperar_perdidas=False)
+    llamadas = []
+    planificador = Planificador(db_service, {"prueba": llamadas.append}, reloj=lambda: AHORA)
+    planificador.revisar()
+    assert planificador.esperar_inactivo(timeout=5)
+    planificador.detener(esperar=True)
+
+    [ejecucion] = db_service.obtener_historial_ejecuciones()
+    assert ejecucion["estado"] == "omitida" and not llamadas
+
+
+def test_prioridad_y_limite_por_recurso(db_service):
+    _crear_tarea(db_service, "fase2", "11:55", tipo="web", parametros={"nombre": "fase2"}, prioridad=30, recurso="web")
+    _crear_tarea(db_service, "fase1", "11:55", tipo="web", parametros={"nombre": "fase1"}, prioridad=20, recurso="web")
+    _crear_tarea(db_service, "exportacion", "11:55", tipo="disco", prioridad=90, recurso="disco")
+    orden, simultaneas, exportada = [], [], threading.Event()
+
+    def web(p):
+        orden.append(p["nombre"]); simultaneas.append(p["nombre"])
+        assert len(simultaneas) == 1  # Límite 'web' = 1
+        # La exportación termina mientras la web sigue ocupada: no hace cola detrás
+        assert exportada.wait(5)
+        simultaneas.remove(p["nombre"])
+    def disco(p): exportada.set()
+
+    planificador = Planificador(db_service, {"web": web, "disco": disco}, reloj=lambda: AHORA)
+    planificador.revisar()
+    assert planificador.esperar_inactivo(timeout=5)
+    planificador.detener(esperar=True)
+
+    assert orden == ["fase1", "fase2"]
+    assert {e["estado"] for e in db_service.obtener_historial_ejecuciones()} == {"ok"}
+
+
+def test_reserva_externa_retiene_y_bloquea_web(db_service):
+    _crear_tarea(db_service, "fase1", "11:55", tipo="web", recurso="web")
+    llamadas = []
+    planificador = Planificador(db_service, {"web": llamadas.append}, reloj=lambda: AHORA)
+    assert planificador.reservar("web")  # Extracción manual en curso
+    planificador.revisar()
+    assert not planificador.esperar_inactivo(timeout=0.3) and not llamadas
+    assert not planificador.reservar("web")  # Una segunda manual no entra
+    planificador.liberar("web")
+    assert planificador.esperar_inactivo(timeout=5)
+    planificador.detener(esperar=True)
+    assert len(llamadas) == 1
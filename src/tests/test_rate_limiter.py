@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del limitador de tasa adaptativo (AIMD sobre una cubeta de fichas).
+"""
+
+from src.scraper.rate_limiter import LimitadorAdaptativo, segundos_retry_after
+
+
+class _Reloj:
+    def __init__(self): self.ahora = 0.0
+    def __call__(self): return self.ahora
+    def dormir(self, segundos): self.ahora += segundos
+
+
+def _limitador(reloj, **opciones):
+    return LimitadorAdaptativo(**{"tasa_inicial": 2.0, "tasa_min": 0.5, "tasa_max": 4.0, "latencia_max_s": 5.0, "pausa_429_s": 5.0,
+                                  "reloj": reloj, "dormir": reloj.dormir, **opciones})
+
+
+def test_espaciado_y_subida_aditiva():
+    reloj = _Reloj()
+    limitador = _limitador(reloj)
+    for _ in range(3): limitador.adquirir()
+    assert reloj.ahora == 1.0  # Una ficha de ráfaga y luego 1/2 s por petición
+
+    for _ in range(100): limitador.registrar(0.1, 200)
+    assert limitador.tasa == 4.0  # Sube hasta el máximo y no lo pasa
+    limitador.registrar(0.1, 404)
+    assert limitador.estadisticas()["bajadas"] == 0
+
+
+def test_bajada_por_429_con_retry_after_y_por_pico_de_latencia():
+    reloj = _Reloj()
+    limitador = _limitador(reloj, enfriamiento_s=2.0)
+    limitador.registrar(0.1, 429, retry_after="3")
+    limitador.registrar(0.1, 503)  # Dentro del enfriamiento: no vuelve a bajar
+    assert limitador.tasa == 1.0
+    limitador.adquirir()
+    assert reloj.ahora == 3.0  # Respeta el Retry-After
+
+    for _ in range(5): limitador.registrar(0.1, 200)
+    antes = limitador.tasa
+    limitador.registrar(0.9, 200)  # Muy por sobre la latencia media
+    assert limitador.tasa == antes / 2
+
+    estadisticas = limitador.estadisticas()
+    assert [e["motivo"] for e in estadisticas["eventos_bajada"]] == ["429", "latencia"]
+    assert estadisticas["errores_429"] == 1 and estadisticas["errores_servidor"] == 1 and estadisticas["picos_latencia"] == 1
+    limitador.reiniciar_estadisticas()
+    assert limitador.estadisticas()["eventos_bajada"] == [] and limitador.tasa == antes / 2  # La tasa aprendida se conserva
+
+
+def test_retry_after_en_segundos_o_fecha():
+    assert segundos_retry_after("2") == 2.0 and segundos_retry_after(None) is None and segundos_retry_after("mañana") is None
+    assert segundos_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # Fecha pasada
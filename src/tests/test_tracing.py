@@ -0,0 +1,25 @@
+import pytest
+
+from src.utils import tracing
+from src.utils.tracing import ejecucion, span, formatear_resumen
+
+
+def test_spans_anidados_y_errores(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "DIR_REPORTES", tmp_path)
+    with span("fuera"): pass  # Sin ejecución en curso no se registra nada
+
+    with pytest.raises(ValueError):
+        with ejecucion("prueba") as reporte:
+            with span("listado"):
+                for n in range(3):
+                    with span("pagina", pagina=n): pass
+            with span("fase2"):
+                with span("ficha"): raise ValueError("sin ficha")
+
+    datos = tracing.ultimo_reporte()
+    etapas = {e["ruta"]: e for e in datos["etapas"]}
+    assert set(etapas) == {"listado", "listado/pagina", "fase2", "fase2/ficha"}
+    assert etapas["listado/pagina"]["n"] == 3 and etapas["fase2/ficha"]["errores"] == 1
+    assert datos["error"] == "ValueError: sin ficha" and reporte.spans[0]["meta"] == {"pagina": 0}
+    assert len(list(tmp_path.glob("*_prueba.json"))) == 1
+    assert "listado/pagina" in formatear_resumen(datos)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la unidad de trabajo de DbService (varias operaciones, una sesión y una transacción).
+"""
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.db.db_models import Base, CaLicitacion, CaSeguimiento
+from src.db.db_service import DbService
+from src.utils.exceptions import TransaccionRevertidaError
+
+
+@pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")  # Clave nula a propósito
+def test_unidad_de_trabajo_confirma_o_revierte_todo():
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    fabrica = sessionmaker(bind=engine, autoflush=False)
+    sesiones = []
+    db = DbService(lambda: sesiones.append(fabrica()) or sesiones[-1])
+    with fabrica() as s:
+        s.add_all([CaLicitacion(codigo_ca=f"U-{i}", nombre=f"CA {i}", puntuacion_final=10) for i in range(2)]); s.commit()
+        a, b = s.scalars(select(CaLicitacion.ca_id).order_by(CaLicitacion.ca_id)).all()
+
+    # Favorito + recarga: una sola sesión, y la recarga ya ve el cambio
+    with db.unidad_de_trabajo():
+        db.gestionar_favorito(a, True)
+        (candidatas, total, cursor), seguimiento, ofertadas = db.obtener_datos_pestanas(umbral_minimo=5)
+    assert len(sesiones) == 1
+    assert [ca.ca_id for ca in candidatas] == [b] and total == 1 and cursor is None and [ca.ca_id for ca in seguimiento] == [a]
+    assert seguimiento[0].seguimiento.es_favorito  # Utilizable tras cerrar la sesión
+
+    # Si una operación falla (aunque el método se trague el error), no se guarda nada
+    with pytest.raises(TransaccionRevertidaError):
+        with db.unidad_de_trabajo():
+            db.agregar_nota(b, "no debe quedar")
+            db.agregar_nota(None, "x")  # Sin clave: el flush falla y el método hace rollback
+    with pytest.raises(ValueError):
+        with db.unidad_de_trabajo():
+            db.agregar_nota(b, "tampoco"); raise ValueError("fallo en medio")
+    with fabrica() as s:
+        assert s.get(CaSeguimiento, b) is None and s.get(CaSeguimiento, a).es_favorito
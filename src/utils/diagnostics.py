@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Herramientas de diagnóstico.
+
+Perfil de tiempos de importación (equivalente a 'python -X importtime'):
+importa un módulo en un proceso limpio y ordena los módulos por tiempo.
+
+EJECUCIÓN:
+    python -m src.utils.diagnostics importtime                  # arranque de la GUI
+    python -m src.utils.diagnostics importtime src.logic.excel_service --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+# Dependencias que no deberían cargarse al arrancar la GUI
+DEPENDENCIAS_PESADAS = ("pandas", "numpy", "openpyxl", "pyarrow", "playwright")
+
+
+@dataclass
+class TiempoImportacion:
+    modulo: str
+    propio_us: int
+    acumulado_us: int
+    nivel: int
+
+
+def perfil_importacion(modulo: str = "src.gui.gui_main") -> List[TiempoImportacion]:
+    """Importa 'modulo' en un proceso nuevo con '-X importtime' y devuelve los tiempos por módulo."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(BASE_DIR), os.environ.get("PYTHONPATH")]))}
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                             cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        ultima = proceso.stderr.strip().splitlines()[-1:] or ["sin detalle"]
+        raise RuntimeError(f"No se pudo importar '{modulo}': {ultima[0]}")
+
+    tiempos = []
+    for linea in proceso.stderr.splitlines():
+        # "import time:   propio |   acumulado |   [sangría]paquete"
+        if not linea.startswith("import time:") or "self [us]" in linea: continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        nivel = (len(nombre) - len(nombre.lstrip(" "))) // 2
+        tiempos.append(TiempoImportacion(nombre.strip(), int(propio), int(acumulado), nivel))
+    return tiempos
+
+
+def formatear_reporte(modulo: str, tiempos: List[TiempoImportacion], top: int = 20) -> str:
+    # Un módulo puede aparecer más de una vez (p. ej. al cargarse vía su paquete): se agrupa por nombre
+    por_modulo = {}
+    for t in tiempos:
+        previo = por_modulo.get(t.modulo)
+        por_modulo[t.modulo] = t if previo is None else TiempoImportacion(
+            t.modulo, previo.propio_us + t.propio_us, max(previo.acumulado_us, t.acumulado_us), min(previo.nivel, t.nivel))
+    tiempos = list(por_modulo.values())
+
+    total = por_modulo[modulo].acumulado_us if modulo in por_modulo else sum(t.propio_us for t in tiempos)
+    lineas = [f"Importación de '{modulo}': {total / 1000:.0f} ms, {len(tiempos)} módulos", ""]
+
+    lineas.append(f"{'acumulado ms':>12}  {'propio ms':>9}  módulo  (top {top} por tiempo acumulado)")
+    for t in sorted(tiempos, key=lambda t: t.acumulado_us, reverse=True)[:top]:
+        lineas.append(f"{t.acumulado_us / 1000:12.1f}  {t.propio_us / 1000:9.1f}  {t.modulo}")
+
+    lineas += ["", f"{'propio ms':>12}  módulo  (top {top} por tiempo propio)"]
+    for t in sorted(tiempos, key=lambda t: t.propio_us, reverse=True)[:top]:
+        lineas.append(f"{t.propio_us / 1000:12.1f}  {t.modulo}")
+
+    cargadas = {t.modulo: t.acumulado_us for t in tiempos if t.modulo in DEPENDENCIAS_PESADAS}
+    lineas += ["", "Dependencias pesadas cargadas:"]
+    lineas += [f"  {m}: {us / 1000:.0f} ms" for m, us in cargadas.items()] or ["  ninguna"]
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnósticos de Monitor CA.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_imp = sub.add_parser("importtime", help="Perfil de tiempos de importación de un módulo.")
+    p_imp.add_argument("modulo", nargs="?", default="src.gui.gui_main")
+    p_imp.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.comando == "importtime":
+        try:
+            print(formatear_reporte(args.modulo, perfil_importacion(args.modulo), args.top))
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
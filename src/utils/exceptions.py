@@ -31,4 +31,16 @@ class RecalculoError(EtlError):
     pass
 class ScraperHealthError(Exception):
     """Error específico para el chequeo de salud del scraper."""
-    pass
\ No newline at end of file
+    pass
+
+class DependenciaOpcionalError(Exception):
+    """Lanzado al usar una función que requiere un paquete opcional no instalado."""
+    pass
+
+class EtlCanceladoError(EtlError):
+    """Lanzado cuando el usuario cancela una extracción en curso."""
+    pass
+
+class TransaccionRevertidaError(Exception):
+    """Lanzado al cerrar una unidad de trabajo de DbService en la que alguna operación falló."""
+    pass
@@ -6,11 +6,31 @@ Proporciona una función 'configurar_logger' que puede ser llamada
 por cualquier módulo para obtener un logger con un nombre específico,
 asegurando que todos los logs sigan el mismo formato y vayan
 a los mismos destinos (consola y archivo).
+
+Los módulos no escriben el archivo: el logger raíz solo tiene un QueueHandler
+que deja cada registro en una cola, y un hilo (QueueListener) los escribe en
+lotes. Así el scraper y los Workers no esperan al disco en sus bucles.
+  - app.log rota al pasar LOG_MAX_MB o al cambiar de día; los anteriores quedan
+    comprimidos (app.log.<fecha>.gz) y se conservan LOG_MAX_ARCHIVOS.
+  - Niveles por módulo en caliente: 'configurar_niveles("src.scraper=INFO, sql_lenta=WARNING")'
+    (variable de entorno LOG_NIVELES o clave 'niveles_log' de settings.json).
+  - Solo el proceso principal escribe app.log. Los procesos hijos (ETL, pool de
+    exportación) no escriben archivo hasta elegir el suyo con 'usar_archivo'.
 """
 
+import atexit
+import gzip
 import logging
+import multiprocessing
+import os
+import queue
+import shutil
 import sys
+import time
+from datetime import datetime, timedelta
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
 from pathlib import Path
+from typing import Dict, Union
 
 # Define el directorio de logs dentro de /data/
 # (../.. para salir de src/utils y llegar a la raíz)
@@ -22,30 +42,169 @@ LOG_DIR.mkdir(parents=True, exist_ok=True)
 # Define el formato de los logs
 FORMATO_LOG = "%(asctime)s - %(levelname)-8s - %(name)-15s - %(message)s"
 
-# Configura el logging básico (solo a archivo)
-logging.basicConfig(
-    level=logging.DEBUG,
-    format=FORMATO_LOG,
-    filename=LOG_DIR / "app.log",  # Archivo de log principal
-    filemode="a",  # 'a' para añadir (append), 'w' para sobrescribir
-    encoding="utf-8",
-)
+ARCHIVO_LOG = "app.log"  # Archivo de log principal
+LOG_MAX_MB = float(os.getenv("LOG_MAX_MB", "10"))
+LOG_MAX_ARCHIVOS = int(os.getenv("LOG_MAX_ARCHIVOS", "14"))
 
-# --- Configuración del Handler de Consola ---
+
+class ArchivoRotativo(BaseRotatingHandler):
+    """
+    Archivo de log que rota al superar 'max_bytes' o al cambiar de día. El archivo
+    rotado se comprime con gzip (en el hilo del listener, no en el de quien loguea).
+    No vacía el buffer en cada registro: lo hace 'vaciar' (al quedar la cola vacía)
+    o de inmediato para ERROR o superior.
+    """
+
+    def __init__(self, ruta: Union[str, Path], max_bytes: int, max_archivos: int, comprimir: bool = True):
+        super().__init__(str(ruta), "a", encoding="utf-8", delay=True)
+        self.max_bytes, self.max_archivos, self.comprimir = max_bytes, max_archivos, comprimir
+        inicio = os.path.getmtime(self.baseFilename) if os.path.exists(self.baseFilename) else time.time()
+        self._proxima_rotacion = self._medianoche_siguiente(inicio)
+
+    @staticmethod
+    def _medianoche_siguiente(instante: float) -> float:
+        dia = datetime.fromtimestamp(instante).date() + timedelta(days=1)
+        return datetime(dia.year, dia.month, dia.day).timestamp()
+
+    def shouldRollover(self, record) -> bool:
+        if record.created >= self._proxima_rotacion: return True
+        if not self.max_bytes: return False
+        if self.stream is None:
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) >= self.max_bytes
+        return self.stream.tell() >= self.max_bytes
+
+    def doRollover(self):
+        if self.stream: self.stream.close(); self.stream = None
+        self._proxima_rotacion = self._medianoche_siguiente(time.time())
+        if not os.path.exists(self.baseFilename) or not os.path.getsize(self.baseFilename): return
+        destino = f"{self.baseFilename}.{datetime.now():%Y%m%d_%H%M%S_%f}"
+        os.replace(self.baseFilename, destino)
+        if self.comprimir:
+            try:
+                with open(destino, "rb") as origen, gzip.open(destino + ".gz", "wb") as comprimido:
+                    shutil.copyfileobj(origen, comprimido)
+                os.remove(destino)
+            except OSError as e:
+                sys.stderr.write(f"No se pudo comprimir {destino}: {e}\n")
+        nombre = os.path.basename(self.baseFilename) + "."
+        carpeta = os.path.dirname(self.baseFilename)
+        rotados = sorted(f for f in os.listdir(carpeta) if f.startswith(nombre))
+        for viejo in rotados[:-self.max_archivos] if self.max_archivos else []:
+            try: os.remove(os.path.join(carpeta, viejo))
+            except OSError: pass
+
+    def emit(self, record):
+        super().emit(record)
+        if record.levelno >= logging.ERROR: self.vaciar()
+
+    def flush(self): pass  # Ver 'vaciar'
+
+    def vaciar(self):
+        super().flush()
+
+
+class _OyenteEnLotes(QueueListener):
+    """QueueListener que vacía los buffers de los handlers solo cuando la cola queda vacía."""
+
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                (getattr(handler, "vaciar", None) or handler.flush)()
+        return self.queue.get(block)
+
+
+def _crear_archivo(nombre: str) -> ArchivoRotativo:
+    archivo = ArchivoRotativo(LOG_DIR / nombre, int(LOG_MAX_MB * 1024 * 1024), LOG_MAX_ARCHIVOS)
+    archivo.setLevel(logging.DEBUG)
+    archivo.setFormatter(logging.Formatter(FORMATO_LOG))
+    return archivo
 
 
-# 1. Crear el handler de consola
+# --- Configuración del Handler de Consola ---
+# LOG_CONSOLA=false la apaga. Sin stdout (app empaquetada) no se usa; la CLI con --json la pasa a stderr.
 consola_handler = logging.StreamHandler(sys.stdout)
 consola_handler.setLevel(logging.INFO)  # Muestra INFO o superior en consola
+consola_handler.setFormatter(logging.Formatter(FORMATO_LOG))
+_con_consola = os.getenv("LOG_CONSOLA", "True").lower() == "true" and sys.stdout is not None
+
+# Dos procesos rotando el mismo archivo se pisan (en Windows ni siquiera pueden renombrarlo)
+archivo_handler = _crear_archivo(ARCHIVO_LOG) if multiprocessing.parent_process() is None else None
 
-# 2. Crear el formateador y asignarlo al handler
-formateador = logging.Formatter(FORMATO_LOG)
-consola_handler.setFormatter(formateador)
 
-# 3. Añadir el handler al logger raíz
+def _handlers():
+    return tuple(h for h in (archivo_handler, consola_handler if _con_consola else None) if h is not None)
+
+
+# --- Cola: el logger raíz solo encola, el listener escribe ---
+_cola: "queue.SimpleQueue" = queue.SimpleQueue()
+_oyente = _OyenteEnLotes(_cola, *_handlers(), respect_handler_level=True)
+_oyente.start()
+
 root_logger = logging.getLogger()
-if not any(isinstance(h, logging.StreamHandler) for h in root_logger.handlers):
-    root_logger.addHandler(consola_handler)
+root_logger.setLevel(logging.DEBUG)
+for _h in [h for h in root_logger.handlers if not isinstance(h, QueueHandler)]:
+    root_logger.removeHandler(_h)
+if not any(isinstance(h, QueueHandler) for h in root_logger.handlers):
+    root_logger.addHandler(QueueHandler(_cola))
+
+
+def detener():
+    """Escribe lo pendiente y detiene el listener (al salir; se puede llamar más de una vez)."""
+    if _oyente._thread is not None:
+        _oyente.stop()
+    if archivo_handler is not None: archivo_handler.close()
+
+
+atexit.register(detener)
+
+
+def usar_archivo(nombre: str):
+    """Cambia (o en un proceso hijo, elige) el archivo de destino: cada proceso rota el suyo."""
+    global archivo_handler
+    reiniciar = _oyente._thread is not None
+    if reiniciar: _oyente.stop()
+    if archivo_handler is not None: archivo_handler.close()
+    archivo_handler = _crear_archivo(nombre)
+    _oyente.handlers = _handlers()
+    if reiniciar: _oyente.start()
+
+
+_niveles: Dict[str, int] = {}  # Niveles por módulo aplicados con 'configurar_niveles'
+
+
+def _leer_niveles(niveles: Union[str, Dict[str, str], None]) -> Dict[str, int]:
+    if isinstance(niveles, str):
+        niveles = dict(p.split("=", 1) for p in niveles.replace(";", ",").split(",") if "=" in p)
+    resultado = {}
+    for modulo, nivel in (niveles or {}).items():
+        valor = logging.getLevelName(str(nivel).strip().upper())
+        if modulo.strip() and isinstance(valor, int): resultado[modulo.strip()] = valor
+    return resultado
+
+
+def configurar_niveles(niveles: Union[str, Dict[str, str], None]) -> Dict[str, int]:
+    """
+    Aplica niveles por módulo ("src.scraper=INFO, sql_lenta=WARNING" o un dict).
+    Los módulos que ya no aparecen vuelven a heredar el nivel del logger raíz.
+    """
+    nuevos = _leer_niveles(niveles)
+    for modulo in set(_niveles) - set(nuevos):
+        logging.getLogger(modulo).setLevel(logging.NOTSET)
+    for modulo, nivel in nuevos.items():
+        logging.getLogger(modulo).setLevel(nivel)
+    _niveles.clear(); _niveles.update(nuevos)
+    return dict(nuevos)
+
+
+def niveles() -> Dict[str, str]:
+    return {modulo: logging.getLevelName(nivel) for modulo, nivel in _niveles.items()}
+
+
+def configurar_niveles_desde_settings(settings_manager):
+    configurar_niveles(settings_manager.get_setting("niveles_log") or os.getenv("LOG_NIVELES", ""))
+
+
+configurar_niveles(os.getenv("LOG_NIVELES", ""))
 
 
 def configurar_logger(nombre_modulo: str) -> logging.Logger:
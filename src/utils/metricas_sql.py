@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas de las sentencias SQL de un engine de SQLAlchemy.
+
+'instrumentar(engine)' engancha los eventos del cursor y registra, por cada
+sentencia, la latencia, las filas y el método de DbService que la originó
+(el más externo de la pila, es decir, el que llamó la GUI o el ETL):
+  - las que superan 'umbral_lenta_ms' van al log 'sql_lenta' con su llamador,
+  - 'accion(nombre)' cuenta las sentencias de una acción (una tarea de Worker,
+    una ejecución del ETL) y avisa si una misma sentencia se repite muchas
+    veces (patrón N+1: una consulta por fila en vez de una para todas),
+  - 'formatear_reporte()' agrega todo por método, sentencia y acción
+    (Herramientas > Avanzado > Métricas SQL).
+"""
+
+import contextvars
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from src.utils.logger import configurar_logger
+from src.utils.tracing import anotar
+
+logger = configurar_logger(__name__)
+logger_lentas = configurar_logger("sql_lenta")
+
+LARGO_SENTENCIA = 160  # caracteres de SQL que se guardan / muestran
+_FUERA = "(fuera de DbService)"
+_CONTEXTLIB = "contextlib.py"
+
+_acciones: contextvars.ContextVar[tuple] = contextvars.ContextVar("acciones_sql", default=())
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_LISTA = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+
+
+def normalizar_sentencia(sql: str) -> str:
+    """Une los espacios y colapsa las listas de parámetros (IN (?, ?, ?) -> IN (?...))."""
+    # Se recorta antes de las regex: un upsert de miles de filas no se recorre entero
+    return _RE_LISTA.sub("(?...)", _RE_ESPACIOS.sub(" ", sql[:LARGO_SENTENCIA * 4]).strip())[:LARGO_SENTENCIA]
+
+
+class _Accion:
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.sentencias = Counter()  # (metodo, sql) -> veces
+        self.total_ms = 0.0
+        self.avisadas = set()  # N+1 ya informados por una acción anidada
+
+
+class MetricasSql:
+    def __init__(self, umbral_lenta_ms: float = 250.0, repeticiones_n_mas_1: int = 20):
+        self.umbral_lenta_ms = umbral_lenta_ms
+        self.repeticiones_n_mas_1 = repeticiones_n_mas_1
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.por_metodo: Dict[str, list] = {}     # metodo -> [n, total_ms, max_ms, filas]
+            self.por_sentencia: Dict[tuple, list] = {}  # (metodo, sql) -> [n, total_ms, max_ms, filas]
+            self.por_accion: Dict[str, list] = {}     # accion -> [veces, sentencias, max_sentencias, n+1]
+            self.lentas = 0
+            self.desde = time.time()
+
+    def registrar(self, metodo: str, sql: str, duracion_ms: float, filas: int):
+        with self._lock:
+            for tabla, clave in ((self.por_metodo, metodo), (self.por_sentencia, (metodo, sql))):
+                n, total, maximo, f = tabla.get(clave, (0, 0.0, 0.0, 0))
+                tabla[clave] = [n + 1, total + duracion_ms, max(maximo, duracion_ms), f + max(filas, 0)]
+            if duracion_ms >= self.umbral_lenta_ms: self.lentas += 1
+        acciones = _acciones.get()
+        for accion in acciones:
+            accion.sentencias[(metodo, sql)] += 1; accion.total_ms += duracion_ms
+        if duracion_ms >= self.umbral_lenta_ms:
+            logger_lentas.warning(f"{duracion_ms:.0f} ms, {filas if filas >= 0 else '?'} filas, {metodo}"
+                                  f"{f' [{acciones[-1].nombre}]' if acciones else ''}: {sql}")
+
+    def cerrar_accion(self, accion: _Accion):
+        total = sum(accion.sentencias.values())
+        repetidas = [(clave, n) for clave, n in accion.sentencias.most_common(3) if n >= self.repeticiones_n_mas_1]
+        for (metodo, sql), n in repetidas:
+            if (metodo, sql) in accion.avisadas: continue
+            accion.avisadas.add((metodo, sql))
+            logger.warning(f"Posible N+1 en '{accion.nombre}': {n} veces la misma sentencia desde {metodo}: {sql}")
+        with self._lock:
+            veces, sentencias, maximo, n_mas_1 = self.por_accion.get(accion.nombre, (0, 0, 0, 0))
+            self.por_accion[accion.nombre] = [veces + 1, sentencias + total, max(maximo, total), n_mas_1 + (1 if repetidas else 0)]
+        if total:
+            # Si la acción es parte de una ejecución del ETL, su resumen queda en el reporte de tiempos
+            anotar(sql={"sentencias": total, "total_ms": round(accion.total_ms, 1),
+                        "mas_repetidas": [{"metodo": m, "sql": s, "veces": n} for (m, s), n in accion.sentencias.most_common(5)]})
+
+    def resumen(self, top: int = 15) -> dict:
+        def filas(tabla, clave_orden=1):
+            return sorted(tabla.items(), key=lambda kv: kv[1][clave_orden], reverse=True)[:top]
+        with self._lock:
+            return {"desde": self.desde, "lentas": self.lentas, "umbral_lenta_ms": self.umbral_lenta_ms,
+                    "metodos": filas(self.por_metodo), "sentencias": filas(self.por_sentencia),
+                    "acciones": filas(self.por_accion, 2)}
+
+
+metricas = MetricasSql()
+
+
+@contextmanager
+def accion(nombre: str):
+    """
+    Cuenta las sentencias de una acción (en este hilo / contexto) y busca patrones N+1.
+    Las acciones se pueden anidar: cada sentencia cuenta para todas las abiertas.
+    """
+    actual = _Accion(nombre)
+    token = _acciones.set(_acciones.get() + (actual,))
+    try:
+        yield actual
+    finally:
+        _acciones.reset(token)
+        metricas.cerrar_accion(actual)
+        for externa in _acciones.get(): externa.avisadas |= actual.avisadas
+
+
+def _llamador(archivo: str, clase: str) -> str:
+    """
+    Método más externo de 'archivo' en la pila actual. Se deja de subir en el
+    primer frame de otro archivo tras los de 'archivo' (los de contextlib no
+    cuentan: unidad_de_trabajo hace commit desde su __exit__).
+    """
+    frame, encontrado = sys._getframe(2), None
+    while frame is not None:
+        nombre_archivo = frame.f_code.co_filename
+        if nombre_archivo.endswith(archivo): encontrado = frame.f_code.co_name
+        elif encontrado and not nombre_archivo.endswith(_CONTEXTLIB): break
+        frame = frame.f_back
+    return f"{clase}.{encontrado}" if encontrado else _FUERA
+
+
+def instrumentar(engine, archivo_llamador: str = "db_service.py", clase_llamador: str = "DbService",
+                 umbral_lenta_ms: Optional[float] = None, repeticiones_n_mas_1: Optional[int] = None):
+    from sqlalchemy import event
+    if umbral_lenta_ms is not None: metricas.umbral_lenta_ms = umbral_lenta_ms
+    if repeticiones_n_mas_1 is not None: metricas.repeticiones_n_mas_1 = repeticiones_n_mas_1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_sql_inicio", []).append((time.perf_counter(), _llamador(archivo_llamador, clase_llamador)))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        pila = conn.info.get("metricas_sql_inicio")
+        if not pila: return
+        inicio, metodo = pila.pop()
+        filas = getattr(cursor, "rowcount", -1)
+        metricas.registrar(metodo, normalizar_sentencia(statement), (time.perf_counter() - inicio) * 1000, filas if isinstance(filas, int) else -1)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto):
+        conexion = contexto.connection
+        if conexion is not None and conexion.info.get("metricas_sql_inicio"): conexion.info["metricas_sql_inicio"].pop()
+
+
+def formatear_reporte(top: int = 15) -> str:
+    r = metricas.resumen(top)
+    desde = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["desde"]))
+    lineas = [f"Desde {desde}. Sentencias lentas (>= {r['umbral_lenta_ms']:.0f} ms): {r['lentas']}", "",
+              f"{'método':<48} {'n':>7} {'total ms':>10} {'media ms':>9} {'max ms':>9} {'filas':>9}"]
+    for metodo, (n, total, maximo, filas) in r["metodos"]:
+        lineas.append(f"{metodo[:48]:<48} {n:>7} {total:>10.1f} {total / n:>9.2f} {maximo:>9.1f} {filas:>9}")
+    lineas += ["", "Sentencias con más tiempo:"]
+    for (metodo, sql), (n, total, maximo, _f) in r["sentencias"]:
+        lineas.append(f"  {total:>9.1f} ms  {n:>6}x  {metodo}: {sql}")
+    lineas += ["", f"{'acción':<48} {'veces':>6} {'sentencias':>10} {'max/acción':>10} {'N+1':>5}"]
+    for nombre, (veces, sentencias, maximo, n_mas_1) in r["acciones"]:
+        lineas.append(f"{nombre[:48]:<48} {veces:>6} {sentencias:>10} {maximo:>10} {n_mas_1:>5}")
+    return "\n".join(lineas)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilado opcional para diagnosticar lentitud en la app empaquetada.
+
+Se activa desde Herramientas > Avanzado (claves 'perfilado_habilitado' y
+'perfilado_modo' de settings.json). Con el modo activo, 'perfilar(nombre)' y el
+decorador 'perfilado(nombre)' guardan un archivo por llamada en data/logs/profiles:
+  - "cprofile": <fecha>_<nombre>_<ms>ms.pstats  (python -m pstats, snakeviz)
+  - "muestreo": <fecha>_<nombre>_<ms>ms.speedscope.json  (https://www.speedscope.app)
+El muestreo toma la pila del hilo perfilado cada INTERVALO_MUESTREO_S, así que
+no altera los tiempos como cProfile y sirve para llamadas largas.
+
+Inactivo, 'perfilar' solo revisa un booleano.
+"""
+
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from src.utils.logger import LOG_DIR, configurar_logger
+
+logger = configurar_logger(__name__)
+
+DIR_PERFILES = LOG_DIR / "profiles"
+MODOS = ("cprofile", "muestreo")
+MAX_PERFILES = 200          # archivos que se conservan en DIR_PERFILES
+UMBRAL_MIN_MS = 50          # llamadas más rápidas no dejan archivo
+INTERVALO_MUESTREO_S = 0.005
+
+_estado = {"activo": False, "modo": "cprofile"}
+# cProfile no admite dos perfiles a la vez (en 3.12+ usa sys.monitoring, que es global)
+_lock_cprofile = threading.Lock()
+
+
+def configurar(activo: bool, modo: str = "cprofile"):
+    _estado["activo"] = bool(activo)
+    _estado["modo"] = modo if modo in MODOS else "cprofile"
+    if activo: logger.info(f"Perfilado activo (modo {_estado['modo']}): {DIR_PERFILES}")
+
+
+def configurar_desde_settings(settings_manager):
+    configurar(settings_manager.get_setting("perfilado_habilitado"), settings_manager.get_setting("perfilado_modo"))
+
+
+def estado() -> dict:
+    return dict(_estado)
+
+
+@contextmanager
+def perfilar(nombre: str, modo: Optional[str] = None):
+    """Perfila el bloque si el perfilado está activo (o si se indica 'modo' explícitamente)."""
+    modo = modo or (_estado["modo"] if _estado["activo"] else None)
+    if modo is None:
+        yield; return
+    if modo == "muestreo":
+        muestreador = _Muestreador(threading.get_ident())
+        muestreador.start()
+        try:
+            yield
+        finally:
+            muestreador.detener()
+            _guardar(nombre, muestreador.duracion_ms, ".speedscope.json", lambda ruta: muestreador.escribir_speedscope(ruta, nombre))
+        return
+    if not _lock_cprofile.acquire(blocking=False):
+        # Ya hay otro bloque perfilándose (otro hilo o una llamada anidada): este se omite
+        yield; return
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    try:
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+    finally:
+        _lock_cprofile.release()
+        _guardar(nombre, (time.perf_counter() - inicio) * 1000, ".pstats", lambda ruta: pstats.Stats(perfil).dump_stats(ruta))
+
+
+def perfilado(nombre: Optional[str] = None):
+    """Decorador: ejecuta la función dentro de 'perfilar' (por defecto con su nombre calificado)."""
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__qualname__
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _estado["activo"]: return funcion(*args, **kwargs)
+            with perfilar(etiqueta):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def sin_perfilado(funcion):
+    """Marca una tarea que 'perfilar_tarea' no debe perfilar (p. ej. la que solo espera a otro proceso)."""
+    funcion.sin_perfilado = True
+    return funcion
+
+
+def perfilar_tarea(tarea):
+    """'perfilar' para una tarea de Worker, nombrada por la función."""
+    if not _estado["activo"] or getattr(tarea, "sin_perfilado", False): return nullcontext()
+    return perfilar(f"tarea_{getattr(tarea, '__qualname__', getattr(tarea, '__name__', 'tarea'))}")
+
+
+def _guardar(nombre: str, duracion_ms: float, extension: str, escribir) -> Optional[Path]:
+    if duracion_ms < UMBRAL_MIN_MS: return None
+    try:
+        DIR_PERFILES.mkdir(parents=True, exist_ok=True)
+        seguro = "".join(c if c.isalnum() or c in "-_." else "_" for c in nombre)[:80]
+        ruta = DIR_PERFILES / f"{datetime.now():%Y%m%d_%H%M%S_%f}_{seguro}_{duracion_ms:.0f}ms{extension}"
+        escribir(str(ruta))
+        for viejo in sorted(DIR_PERFILES.iterdir())[:-MAX_PERFILES]:
+            viejo.unlink(missing_ok=True)
+        logger.info(f"Perfil de '{nombre}' ({duracion_ms:.0f} ms): {ruta.name}")
+        return ruta
+    except Exception as e:
+        logger.warning(f"No se pudo guardar el perfil de '{nombre}': {e}")
+        return None
+
+
+class _Muestreador(threading.Thread):
+    """Toma la pila de un hilo a intervalos fijos (perfil 'sampled' de speedscope)."""
+
+    def __init__(self, id_hilo: int, intervalo: float = INTERVALO_MUESTREO_S):
+        super().__init__(name="perfilado-muestreo", daemon=True)
+        self.id_hilo, self.intervalo = id_hilo, intervalo
+        self._fin = threading.Event()
+        self.frames, self._indice = [], {}
+        self.muestras, self.pesos = [], []
+        self.duracion_ms = 0.0
+
+    def run(self):
+        inicio = anterior = time.perf_counter()
+        while not self._fin.wait(self.intervalo):
+            frame = sys._current_frames().get(self.id_hilo)
+            ahora = time.perf_counter()
+            if frame is not None:
+                pila = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    clave = (codigo.co_qualname if hasattr(codigo, "co_qualname") else codigo.co_name, codigo.co_filename, codigo.co_firstlineno)
+                    if clave not in self._indice:
+                        self._indice[clave] = len(self.frames)
+                        self.frames.append({"name": clave[0], "file": clave[1], "line": clave[2]})
+                    pila.append(self._indice[clave])
+                    frame = frame.f_back
+                pila.reverse()
+                self.muestras.append(pila); self.pesos.append(round((ahora - anterior) * 1000, 3))
+            anterior = ahora
+        self.duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    def detener(self):
+        self._fin.set(); self.join()
+
+    def escribir_speedscope(self, ruta: str, nombre: str):
+        datos = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": [{"type": "sampled", "name": nombre, "unit": "milliseconds", "startValue": 0,
+                          "endValue": round(self.duracion_ms, 3), "samples": self.muestras, "weights": self.pesos}],
+            "name": nombre, "exporter": "compra-agil perfilado",
+        }
+        Path(ruta).write_text(json.dumps(datos), encoding="utf-8")
@@ -19,7 +19,10 @@ DEFAULT_SETTINGS = {
     "auto_extract_time": "08:00", # Hora por defecto
     "auto_update_enabled": False,
     "auto_update_time": "09:00",  # Hora por defecto
-    "user_export_path": ""
+    "user_export_path": "",
+    "perfilado_habilitado": False,  # Ver src/utils/perfilado.py
+    "perfilado_modo": "cprofile",   # "cprofile" o "muestreo"
+    "niveles_log": ""               # p. ej. "src.scraper=INFO, sql_lenta=WARNING" (ver src/utils/logger.py)
 }
 
 class SettingsManager:
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Tiempos por etapa de una ejecución del ETL ("spans").
+
+Una ejecución abre un reporte con 'ejecucion(nombre)' y cada etapa se mide con
+'span(nombre)'. Los spans se anidan (la ruta queda como 'fase2/ficha/json') y,
+fuera de una ejecución, 'span' no hace nada, así los servicios se pueden
+instrumentar sin saber quién los llama. El reporte se guarda en JSON en
+DIR_REPORTES (data/logs/runs, fuera de git; otro con REPORTES_DIR) y su resumen (tabla por etapa) se escribe en el log. Cada
+ejecución es además una acción de metricas_sql: sus sentencias SQL quedan en
+datos["sql"].
+
+    with ejecucion("etl_live") as reporte:
+        with span("listado"):
+            with span("pagina", pagina=1): ...   # ruta 'listado/pagina'
+    print(formatear_resumen(reporte.a_dict()))
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.utils.logger import LOG_DIR, configurar_logger
+
+logger = configurar_logger(__name__)
+
+DIR_REPORTES = Path(os.getenv("REPORTES_DIR", str(LOG_DIR / "runs")))
+MAX_REPORTES = 50        # JSON que se conservan en DIR_REPORTES
+MAX_SPANS_DETALLE = 20_000  # spans individuales guardados; el resumen siempre los cuenta todos
+
+_reporte_actual: contextvars.ContextVar[Optional["ReporteEjecucion"]] = contextvars.ContextVar("reporte_ejecucion", default=None)
+_ruta_actual: contextvars.ContextVar[str] = contextvars.ContextVar("ruta_span", default="")
+_ultimo = threading.local()  # último reporte cerrado en este hilo (lo reenvía el proceso hijo del ETL)
+
+
+class ReporteEjecucion:
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        self.duracion_s: Optional[float] = None
+        self.error: Optional[str] = None
+        self.spans: List[Dict] = []
+        self.agregados: Dict[str, List[float]] = {}  # ruta -> [n, total_s, max_s, errores]
+        self.datos: Dict = {}  # métricas sueltas de la ejecución (contadores, etc.)
+        self._lock = threading.Lock()
+
+    def registrar(self, ruta: str, inicio: float, duracion: float, ok: bool, meta: Dict):
+        with self._lock:
+            n, total, maximo, errores = self.agregados.get(ruta, (0, 0.0, 0.0, 0))
+            self.agregados[ruta] = [n + 1, total + duracion, max(maximo, duracion), errores + (0 if ok else 1)]
+            if len(self.spans) < MAX_SPANS_DETALLE:
+                self.spans.append({"ruta": ruta, "inicio_s": round(inicio - self._t0, 4), "duracion_s": round(duracion, 4),
+                                   "ok": ok, **({"meta": meta} if meta else {})})
+
+    def cerrar(self, error: Optional[BaseException] = None):
+        self.duracion_s = time.perf_counter() - self._t0
+        if error is not None: self.error = f"{type(error).__name__}: {error}"
+
+    def a_dict(self) -> Dict:
+        with self._lock:
+            etapas = [{"ruta": ruta, "n": int(n), "total_s": round(total, 4), "media_ms": round(total / n * 1000, 2),
+                       "max_ms": round(maximo * 1000, 2), "errores": int(errores)}
+                      for ruta, (n, total, maximo, errores) in self.agregados.items()]
+            return {"nombre": self.nombre, "inicio": self.inicio.isoformat(timespec="seconds"),
+                    "duracion_s": round(self.duracion_s if self.duracion_s is not None else time.perf_counter() - self._t0, 3),
+                    "error": self.error, "datos": dict(self.datos), "etapas": sorted(etapas, key=lambda e: e["ruta"]),
+                    "spans": list(self.spans), "spans_omitidos": max(0, sum(int(a[0]) for a in self.agregados.values()) - len(self.spans))}
+
+
+def reporte_actual() -> Optional[ReporteEjecucion]:
+    return _reporte_actual.get()
+
+
+@contextmanager
+def span(nombre: str, **meta):
+    """Mide una etapa dentro de la ejecución en curso (no hace nada si no hay una)."""
+    reporte = _reporte_actual.get()
+    if reporte is None:
+        yield; return
+    ruta = f"{_ruta_actual.get()}/{nombre}" if _ruta_actual.get() else nombre
+    token = _ruta_actual.set(ruta)
+    inicio = time.perf_counter(); ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False; raise
+    finally:
+        _ruta_actual.reset(token)
+        reporte.registrar(ruta, inicio, time.perf_counter() - inicio, ok, meta)
+
+
+def ultimo_reporte() -> Optional[Dict]:
+    return getattr(_ultimo, "datos", None)
+
+
+def anotar(**datos):
+    """Agrega métricas sueltas (contadores, totales) al reporte en curso."""
+    reporte = _reporte_actual.get()
+    if reporte is not None:
+        with reporte._lock: reporte.datos.update(datos)
+
+
+@contextmanager
+def ejecucion(nombre: str, guardar: bool = True):
+    """
+    Abre un reporte para 'nombre'. Si ya hay uno en curso (p. ej. una ejecución que
+    llama a otra) se reutiliza como un span más en vez de abrir uno nuevo.
+    """
+    if _reporte_actual.get() is not None:
+        with span(nombre):
+            yield _reporte_actual.get()
+        return
+    from src.utils.metricas_sql import accion
+    reporte = ReporteEjecucion(nombre)
+    token = _reporte_actual.set(reporte)
+    error = None
+    try:
+        with accion(nombre):
+            yield reporte
+    except BaseException as e:
+        error = e; raise
+    finally:
+        _reporte_actual.reset(token)
+        reporte.cerrar(error)
+        datos = _ultimo.datos = reporte.a_dict()
+        logger.info(f"Tiempos de '{nombre}':\n{formatear_resumen(datos)}")
+        if guardar: guardar_reporte(datos)
+
+
+def con_reporte(nombre: str):
+    """Decorador: la función corre dentro de 'ejecucion(nombre)'."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with ejecucion(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def guardar_reporte(datos: Dict) -> Optional[str]:
+    try:
+        DIR_REPORTES.mkdir(parents=True, exist_ok=True)
+        ruta = DIR_REPORTES / f"{datetime.now():%Y%m%d_%H%M%S}_{datos['nombre']}.json"
+        ruta.write_text(json.dumps(datos, ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+        for viejo in sorted(DIR_REPORTES.glob("*.json"))[:-MAX_REPORTES]:
+            viejo.unlink(missing_ok=True)
+        return str(ruta)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el reporte de ejecución: {e}")
+        return None
+
+
+def formatear_resumen(datos: Dict) -> str:
+    """Tabla por etapa: veces, total, media, máximo y % del total de la ejecución."""
+    total = datos["duracion_s"] or 0.0
+    ancho = max([len(e["ruta"]) for e in datos["etapas"]] + [12])
+    lineas = [f"{'etapa':<{ancho}} {'n':>6} {'total s':>9} {'media ms':>9} {'max ms':>9} {'%':>6}"]
+    for e in datos["etapas"]:
+        pct = e["total_s"] / total * 100 if total else 0.0
+        errores = f"  ({e['errores']} con error)" if e["errores"] else ""
+        lineas.append(f"{e['ruta']:<{ancho}} {e['n']:>6} {e['total_s']:>9.2f} {e['media_ms']:>9.1f} {e['max_ms']:>9.1f} {pct:>5.1f}%{errores}")
+    # Lo que no cubre ninguna etapa de primer nivel (preparación, GUI, etc.)
+    medido = sum(e["total_s"] for e in datos["etapas"] if "/" not in e["ruta"])
+    lineas.append(f"{'(sin medir)':<{ancho}} {'':>6} {max(0.0, total - medido):>9.2f}")
+    lineas.append(f"{'TOTAL':<{ancho}} {'':>6} {total:>9.2f}" + (f"  ERROR: {datos['error']}" if datos.get("error") else ""))
+    return "\n".join(lineas)